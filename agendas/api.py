@@ -4,10 +4,11 @@ API for the agendas app
 from django.utils.timezone import datetime
 
 import tastypie.fields as fields
+from tastypie.exceptions import BadRequest
 from avatar.templatetags.avatar_tags import avatar_url
 from django.contrib.auth.models import User
 
-from models import Agenda, AgendaVote
+from models import Agenda, AgendaVote, NUM_SUGGESTED_VOTES
 from apis.resources.base import BaseResource
 from mks.models import Member, Party
 
@@ -48,8 +49,8 @@ class AgendaTodoResource(BaseResource):
     votes_by_controversy = fields.ListField()
     votes_by_agendas = fields.ListField()
 
-    # TODO: Make this a parameter or setting or something
-    NUM_SUGGESTIONS = 10
+    # the suggestions are precomputed, see SuggestedVoteManager.refresh
+    NUM_SUGGESTIONS = NUM_SUGGESTED_VOTES
 
     def dehydrate_votes_by_agendas(self, bundle):
         votes = bundle.obj.get_suggested_votes_by_agendas(
@@ -70,6 +71,42 @@ class AgendaTodoResource(BaseResource):
         return [dehydrate_vote(v) for v in votes]
 
 
+class AgendaMemberVotesResource(BaseResource):
+    ''' The votes of a public agenda a member took part in, with how the
+    member voted, newest first. Requires the agenda and member filters,
+    e.g. /api/v2/agenda-member-votes/?agenda=1&member=2&limit=20 '''
+
+    vote_id = fields.IntegerField(attribute='vote_id')
+    vote_title = fields.CharField()
+    vote_time = fields.DateTimeField()
+    vote_url = fields.CharField()
+    voteaction_type = fields.CharField(attribute='voteaction_type')
+
+    class Meta(BaseResource.Meta):
+        queryset = AgendaVote.objects.filter(agenda__is_public=True)
+        list_allowed_methods = ['get']
+        detail_allowed_methods = []
+        resource_name = 'agenda-member-votes'
+        fields = ['id', 'score', 'importance', 'reasoning']
+
+    def apply_filters(self, request, applicable_filters):
+        agenda = request.GET.get('agenda', '')
+        member = request.GET.get('member', '')
+        if not (agenda.isdigit() and member.isdigit()):
+            raise BadRequest('agenda and member ids are required')
+        agenda_votes = AgendaVote.objects.member_votes(int(member), int(agenda))
+        return agenda_votes.filter(agenda__is_public=True, **applicable_filters)
+
+    def dehydrate_vote_title(self, bundle):
+        return bundle.obj.vote.title
+
+    def dehydrate_vote_time(self, bundle):
+        return bundle.obj.vote.time
+
+    def dehydrate_vote_url(self, bundle):
+        return bundle.obj.vote.get_absolute_url()
+
+
 class AgendaResource(BaseResource):
     ''' Agenda API '''
 
@@ -0,0 +1,51 @@
+'''
+Generation counters for the cached agenda data.
+
+Each agenda has a generation, and so do all the agendas together. Cache keys
+made by agenda_cache_key and agendas_cache_key embed the current generation,
+so bumping it makes every key derived from it miss at once, without having
+to know which keys exist. That lets the agenda data be cached for days.
+'''
+from knesset.cache import cache
+from knesset.generations import get_generation, bump_generation
+
+AGENDAS_GENERATION_KEY = 'agendas_generation'
+AGENDA_GENERATION_KEY = 'agenda_%d_generation'
+
+
+def agendas_generation():
+    return get_generation(AGENDAS_GENERATION_KEY)
+
+
+def agenda_generation(agenda_id):
+    return get_generation(AGENDA_GENERATION_KEY % agenda_id)
+
+
+def agenda_generations(agenda_ids):
+    "{agenda_id: generation} of the agendas, fetched from the cache at once"
+    keys = dict((AGENDA_GENERATION_KEY % agenda_id, agenda_id)
+                for agenda_id in agenda_ids)
+    found = cache.get_many(keys.keys())
+    return dict((agenda_id, found.get(key) or get_generation(key))
+                for key, agenda_id in keys.items())
+
+
+def bump_agenda_generation(agenda_id):
+    "Invalidates the cached data of this agenda, and of all agendas"
+    bump_generation(AGENDA_GENERATION_KEY % agenda_id)
+    bump_generation(AGENDAS_GENERATION_KEY)
+
+
+def bump_agendas_generation():
+    "Invalidates the cached data of all agendas together"
+    bump_generation(AGENDAS_GENERATION_KEY)
+
+
+def agenda_cache_key(key, agenda_id):
+    "key for data of a single agenda, e.g. 'agenda_%d_mks_values'"
+    return '%s_g%d' % (key % agenda_id, agenda_generation(agenda_id))
+
+
+def agendas_cache_key(key):
+    "key for data computed over all agendas"
+    return '%s_g%d' % (key, agendas_generation())
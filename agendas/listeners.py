@@ -5,8 +5,12 @@ from django.contrib.contenttypes.models import ContentType
 from planet.models import Feed, Post
 from actstream import action
 from actstream.models import Follow
-from knesset.utils import cannonize, disable_for_loaddata
-from agendas.models import AgendaVote, AgendaMeeting, AgendaBill, Agenda
+from knesset.utils import cannonize, disable_for_loaddata, disable_for_raw_save,\
+    track_stored_fields
+from agendas.models import (AgendaVote, AgendaMeeting, AgendaBill, Agenda,
+                            SummaryAgenda, SuggestedVote)
+from laws.models import VoteAction, Vote
+from agendas.generations import bump_agenda_generation
 from links.models import Link, LinkType
 
 @disable_for_loaddata
@@ -97,3 +101,70 @@ def update_num_followers(sender, instance, **kwargs):
 
 post_delete.connect(update_num_followers, sender=Follow)
 post_save.connect(update_num_followers, sender=Follow)
+
+# what the summaries and suggestions counted the agenda votes, the vote
+# actions and the votes as
+track_stored_fields(AgendaVote, 'agenda', 'vote', 'score', 'importance')
+track_stored_fields(VoteAction, 'type')
+track_stored_fields(Vote, 'controversy')
+
+@disable_for_loaddata
+def update_agenda_vote_summaries(sender, instance, **kwargs):
+    instance.update_monthly_counters()
+post_save.connect(update_agenda_vote_summaries, sender=AgendaVote)
+
+@disable_for_loaddata
+def retract_agenda_vote_summaries(sender, instance, **kwargs):
+    instance.retract_monthly_counters()
+post_delete.connect(retract_agenda_vote_summaries, sender=AgendaVote)
+
+def stored_type(instance):
+    stored = getattr(instance, '_stored', None)
+    return stored['type'] if stored else None
+
+@disable_for_raw_save
+def update_vote_action_summaries(sender, instance, created, **kwargs):
+    old_type = stored_type(instance)
+    if old_type != instance.type:
+        SummaryAgenda.objects.apply_vote_action(instance.vote_id,
+                                                instance.member_id,
+                                                old_type, instance.type)
+post_save.connect(update_vote_action_summaries, sender=VoteAction)
+
+def retract_vote_action_summaries(sender, instance, **kwargs):
+    SummaryAgenda.objects.apply_vote_action(instance.vote_id,
+                                            instance.member_id,
+                                            stored_type(instance), None)
+post_delete.connect(retract_vote_action_summaries, sender=VoteAction)
+
+def bump_agenda_data_generation(sender, instance, **kwargs):
+    bump_agenda_generation(instance.agenda_id)
+for agenda_data_model in (AgendaVote, AgendaBill, AgendaMeeting, SummaryAgenda):
+    post_save.connect(bump_agenda_data_generation, sender=agenda_data_model)
+    post_delete.connect(bump_agenda_data_generation, sender=agenda_data_model)
+
+def bump_agenda(sender, instance, **kwargs):
+    "The cached agenda data includes the agenda's name, owner and publicity"
+    bump_agenda_generation(instance.id)
+post_save.connect(bump_agenda, sender=Agenda)
+post_delete.connect(bump_agenda, sender=Agenda)
+
+@disable_for_loaddata
+def suggest_votes_for_new_agenda(sender, created, instance, **kwargs):
+    if created:
+        SuggestedVote.objects.refresh([instance.id])
+post_save.connect(suggest_votes_for_new_agenda, sender=Agenda)
+
+@disable_for_loaddata
+def update_suggested_votes(sender, instance, **kwargs):
+    SuggestedVote.objects.agenda_vote_changed(instance.agenda_id,
+                                              instance.vote_id)
+post_save.connect(update_suggested_votes, sender=AgendaVote)
+post_delete.connect(update_suggested_votes, sender=AgendaVote)
+
+@disable_for_raw_save
+def update_controversy_suggestions(sender, instance, created, **kwargs):
+    stored = getattr(instance, '_stored', None)
+    if stored is None or stored['controversy'] != instance.controversy:
+        SuggestedVote.objects.vote_changed(instance.id, instance.controversy)
+post_save.connect(update_controversy_suggestions, sender=Vote)
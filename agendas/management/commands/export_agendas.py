@@ -1,47 +1,111 @@
 import os
 import csv
+import gzip
+from multiprocessing import Pool
+from optparse import make_option
+
 from django.core.management.base import NoArgsCommand
 from django.conf import settings
+from django.db import connection
 
 from mks.models import Member
+from laws.models import VoteAction
 from agendas.models import Agenda, AgendaVote
 
+# votes whose agenda votes and vote actions are held in memory at once
+CHUNK_SIZE = 500
+
+VOTE_VALUES = {'for': 1, 'against': -1}
+
+
+def export_agendas(agenda_ids, mks, compress=False, chunk_size=CHUNK_SIZE):
+    """Writes the csv files of agenda_ids in one pass over their votes.
+
+    The votes are read in chunks of chunk_size, each with its agenda votes
+    and its for/against vote actions, and every agenda vote is written to
+    its agenda's file, so memory doesn't grow with the number of votes.
+    Each file is written under a temporary name and renamed when complete.
+    """
+    mk_ids = [mk['id'] for mk in mks]
+    header = ['Vote id', 'Vote title', 'Vote time', 'Score', 'Importance']
+    header.extend('%s %d' % (mk['name'].encode('utf8'), mk['id'])
+                  for mk in mks)
+
+    files = {}
+    writers = {}
+    for agenda_id in agenda_ids:
+        filename = os.path.join(settings.DATA_ROOT, 'agenda_%d.csv' % agenda_id)
+        if compress:
+            filename += '.gz'
+            f = gzip.open(filename + '.tmp', 'wb')
+        else:
+            f = open(filename + '.tmp', 'wb')
+        files[filename] = f
+        writers[agenda_id] = csv.writer(f)
+        writers[agenda_id].writerow(header)
+
+    vote_ids = list(AgendaVote.objects.filter(agenda__in=agenda_ids).order_by(
+        'vote').values_list('vote', flat=True).distinct())
+    for i in range(0, len(vote_ids), chunk_size):
+        chunk = vote_ids[i:i + chunk_size]
+        voters = dict((vote_id, {}) for vote_id in chunk)
+        for vote_id, member_id, vote_type in VoteAction.objects.filter(
+                vote__in=chunk, type__in=VOTE_VALUES.keys()).values_list(
+                    'vote_id', 'member_id', 'type'):
+            voters[vote_id][member_id] = VOTE_VALUES[vote_type]
+
+        agenda_votes = AgendaVote.objects.filter(
+            agenda__in=agenda_ids, vote__in=chunk).order_by(
+                'vote', 'agenda').values_list(
+                    'agenda_id', 'vote_id', 'vote__title', 'vote__time',
+                    'score', 'importance')
+        for agenda_id, vote_id, title, time, score, importance in agenda_votes:
+            vote_voters = voters[vote_id]
+            row = [vote_id, title.encode('utf8'), time.isoformat(), score,
+                   importance]
+            row.extend(vote_voters.get(mk_id, 0) for mk_id in mk_ids)
+            writers[agenda_id].writerow(row)
+
+    for filename, f in files.items():
+        f.close()
+        os.rename(filename + '.tmp', filename)
+
+
+def _export_agendas_worker(args):
+    # each worker process needs its own db connection
+    connection.close()
+    export_agendas(*args)
+
 
 class Command(NoArgsCommand):
+    help = "Export the votes of every agenda, with how each mk voted, as csv"
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--workers', dest='workers', type='int', default=1,
+                    help='Split the agendas between this many processes'),
+        make_option('--gzip', dest='compress', action='store_true',
+                    default=False,
+                    help='Write gzip compressed agenda_<id>.csv.gz files'),
+        make_option('--chunk-size', dest='chunk_size', type='int',
+                    default=CHUNK_SIZE,
+                    help='Number of votes read from the db at once'),
+    )
 
     def handle_noargs(self, **options):
-        mks = Member.objects.exclude(current_party__isnull=True).order_by(
-            'current_party').values('id', 'name', 'current_party')
-        for agenda in Agenda.objects.all():
-            f = open(os.path.join(settings.DATA_ROOT, 'agenda_%d.csv' %
-                                  agenda.id), 'wt')
-            csv_writer = csv.writer(f)
-            header = []
-            header.append('Vote id')
-            header.append('Vote title')
-            header.append('Vote time')
-            header.append('Score')
-            header.append('Importance')
-            for mk in mks:
-                header.append('%s %d' % (mk['name'].encode('utf8'), mk['id']))
-            csv_writer.writerow(header)
-
-            for agenda_vote in AgendaVote.objects.filter(
-                    agenda=agenda).select_related('vote'):
-                row = []
-                row.append(agenda_vote.vote.id)
-                row.append(agenda_vote.vote.title.encode('utf8'))
-                row.append(agenda_vote.vote.time.isoformat())
-                row.append(agenda_vote.score)
-                row.append(agenda_vote.importance)
-                mks_for = agenda_vote.vote.get_voters_id('for')
-                mks_against = agenda_vote.vote.get_voters_id('against')
-                for mk in mks:
-                    if mk['id'] in mks_for:
-                        row.append(1)
-                    elif mk['id'] in mks_against:
-                        row.append(-1)
-                    else:
-                        row.append(0)
-                csv_writer.writerow(row)
-            f.close()
+        mks = list(Member.objects.exclude(current_party__isnull=True).order_by(
+            'current_party').values('id', 'name', 'current_party'))
+        agenda_ids = list(Agenda.objects.values_list('id', flat=True))
+        workers = max(1, min(options['workers'], len(agenda_ids)))
+        jobs = [(agenda_ids[i::workers], mks, options['compress'],
+                 options['chunk_size']) for i in range(workers)]
+        if workers == 1:
+            export_agendas(*jobs[0])
+            return
+        # don't share this connection with the forked workers
+        connection.close()
+        pool = Pool(workers)
+        try:
+            pool.map(_export_agendas_worker, jobs)
+        finally:
+            pool.close()
+            pool.join()
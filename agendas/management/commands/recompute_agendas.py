@@ -1,21 +1,42 @@
 from __future__ import division
+from datetime import datetime
+from optparse import make_option
 
-from django.core.management.base import NoArgsCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
 from agendas.models import SummaryAgenda,AgendaVote
 
-class Command(NoArgsCommand):
+class Command(BaseCommand):
+    help = "Recompute the agenda summaries, all of them or a bounded slice"
+
+    option_list = BaseCommand.option_list + (
+        make_option('--agenda', dest='agenda', type='int', default=None,
+                    help='Only recompute the summaries of this agenda id'),
+        make_option('--since', dest='since', default=None,
+                    help='Only recompute months starting at this month (YYYY-MM)'),
+    )
 
     @transaction.commit_manually
-    def handle_noargs(self, **options):
-        print('Deleting existing summary objects')
-        SummaryAgenda.objects.all().delete()
-        numAgendaVotes = AgendaVote.objects.count()
-        print('Summary agenda objects deleted, recalculating for %d votes' % \
-                    numAgendaVotes)
+    def handle(self, *args, **options):
+        agenda_id = options['agenda']
+        since = options['since']
+        if since:
+            try:
+                since = datetime.strptime(since, '%Y-%m')
+            except ValueError:
+                transaction.rollback()
+                raise CommandError('--since should be given as YYYY-MM')
+
+        agenda_votes = AgendaVote.objects.all()
+        if agenda_id:
+            agenda_votes = agenda_votes.filter(agenda=agenda_id)
+        if since:
+            agenda_votes = agenda_votes.filter(vote__time__gte=since)
+        print('Recalculating summary agenda objects for %d votes' % \
+                    agenda_votes.count())
         try:
-            AgendaVote.objects.compute_all()
+            SummaryAgenda.objects.recompute(agenda_id=agenda_id, since=since)
         except Exception as e:
             transaction.rollback()
             print(e)
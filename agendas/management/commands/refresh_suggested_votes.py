@@ -0,0 +1,25 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from agendas.models import SuggestedVote, SUGGESTION_STRATEGIES
+
+
+class Command(BaseCommand):
+    help = "Recompute the votes suggested to the agenda editors"
+
+    option_list = BaseCommand.option_list + (
+        make_option('--agenda', dest='agenda', type='int', default=None,
+                    help='Only refresh the suggestions of this agenda id'),
+        make_option('--strategy', dest='strategy', default=None,
+                    choices=[strategy for strategy, _ in SUGGESTION_STRATEGIES],
+                    help='Only refresh the suggestions of this strategy'),
+    )
+
+    @transaction.commit_on_success
+    def handle(self, *args, **options):
+        agenda_ids = [options['agenda']] if options['agenda'] else None
+        strategies = [options['strategy']] if options['strategy'] else None
+        SuggestedVote.objects.refresh(agenda_ids, strategies)
+        print('Refreshed %d suggested votes' % SuggestedVote.objects.count())
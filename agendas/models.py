@@ -1,12 +1,13 @@
 from __future__ import division
-from itertools import chain
+from itertools import chain, islice
 from operator import itemgetter, attrgetter
 from collections import defaultdict
 import math
+import datetime
 
 from django.db import connection
 from django.db import models
-from django.db.models import Sum, Q, Count, F
+from django.db.models import Sum, Q, Count, F, Min
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
@@ -18,6 +19,9 @@ from actstream.models import Follow
 from laws.models import VoteAction, Vote
 from mks.models import Party, Member, Knesset, Membership
 import queries
+from scores import shared_scores
+from generations import (agenda_cache_key, agendas_cache_key,
+                         bump_agenda_generation)
 
 from tagging.models import Tag
 
@@ -53,18 +57,47 @@ class AgendaVoteManager(models.Manager):
         'postgresql_psycopg2':{'monthfunc':"date_trunc('month'",'nowfunc':'now()'}
     }
 
-    def compute_all(self):
+    def member_votes(self, member, agenda=None):
+        """The agenda votes of the votes member took part in, of agenda or of
+        all agendas, newest vote first.
+
+        The member's vote action comes from the same joined query, as the
+        voteaction_id and voteaction_type of each agenda vote, see
+        AgendaVote.voteaction. Being a queryset it can be paginated.
+        """
+        agenda_votes = self.filter(vote__actions__member=member)
+        if agenda is not None:
+            agenda_votes = agenda_votes.filter(agenda=agenda)
+        voteaction_table = VoteAction._meta.db_table
+        return agenda_votes.select_related('vote').extra(select={
+            'voteaction_id': '%s.id' % voteaction_table,
+            'voteaction_type': '%s.type' % voteaction_table,
+        }).order_by('-vote__time', '-vote__id')
+
+    def compute_all(self, agenda_id=None, since=None):
+        """Insert summary rows for all agenda votes, or only for the slice
+        of one agenda and/or the votes held since the given month.
+
+        The caller is responsible for deleting the summaries being replaced.
+        """
         db_engine = settings.DATABASES['default']['ENGINE']
-        db_functions = self.db_month_trunc_functions[db_engine.split('.')[-1]]
-        agenda_query = queries.BASE_AGENDA_QUERY % db_functions
+        db_functions = dict(self.db_month_trunc_functions[db_engine.split('.')[-1]])
+        filters = ['1=1']
+        params = []
+        if agenda_id:
+            filters.append('a.agenda_id = %s')
+            params.append(agenda_id)
+        if since:
+            filters.append('v.time >= %s')
+            params.append(since)
+        db_functions['filters'] = ' AND '.join(filters)
+
         cursor = connection.cursor()
-        cursor.execute(agenda_query)
+        agenda_query = queries.BASE_AGENDA_QUERY % db_functions
+        cursor.execute(agenda_query, params)
 
         mk_query = queries.BASE_MK_QUERY % db_functions
-        cursor.execute(mk_query)
-        
-        party_query = queries.BASE_PARTY_QUERY % db_functions
-        cursor.execute(party_query)
+        cursor.execute(mk_query, params)
 
 
 class AgendaVote(models.Model):
@@ -79,6 +112,13 @@ class AgendaVote(models.Model):
     def detail_view_url(self):
         return reverse('agenda-vote-detail', args=[self.pk])
 
+    @property
+    def voteaction(self):
+        """The member's vote action, on agenda votes from
+        AgendaVoteManager.member_votes"""
+        return VoteAction(id=self.voteaction_id, type=self.voteaction_type,
+                          vote_id=self.vote_id)
+
     def get_score_header(self):
         return _('Position')
     def get_importance_header(self):
@@ -90,56 +130,37 @@ class AgendaVote(models.Model):
     def __unicode__(self):
         return u"%s %s" % (self.agenda,self.vote)
 
+    def _summary_state(self):
+        if self.pk is None or self.score in (None, ''):
+            return None
+        return (self.agenda_id, self.vote_id,
+                float(self.score) * float(self.importance))
+
+    def _stored_summary_state(self):
+        """What this agenda vote is counted as in the summaries, as it was
+        stored before it was saved or deleted (see agendas.listeners)"""
+        stored = getattr(self, '_stored', None)
+        if stored is None or stored['score'] in (None, ''):
+            return None
+        return (stored['agenda'], stored['vote'],
+                float(stored['score']) * float(stored['importance']))
+
     def update_monthly_counters(self):
-        agendaScore     = float(self.score) * float(self.importance)
-        objMonth        = dateMonthTruncate(self.vote.time)
-
-        summaryObjects  = list(SummaryAgenda.objects.filter( agenda=self.agenda,
-                                                            month=objMonth).all())
-
-        agendaSummary   = None
-        if not filter(lambda summary:summary.summary_type=='AG',summaryObjects):
-            agendaSummary   = SummaryAgenda(month=objMonth,
-                                            agenda=self.agenda,
-                                            summary_type='AG',
-                                            score=abs(agendaScore),
-                                            votes=1)
-        else:
-            existingAgenda = filter(lambda summary:summary.summary_type=='AG',summaryObjects)[0]
-            existingAgenda.votes += 1
-            existingAgenda.score += abs(agendaScore)
-            existingAgenda.save()
-
-        agendasByMk     = dict(map(lambda summary:(summary.mk_id,summary),
-                                   filter(lambda summary:summary.summary_type=='MK',
-                                          summaryObjects)))
-        newObjects = []
-        if agendaSummary:
-            newObjects.append(agendaSummary)
-        voters = defaultdict(list)
-        for vote_action in self.vote.actions.all():
-            mkSummary = agendasByMk.get(vote_action.member_id, None)
-            if not mkSummary:
-                mkSummary = SummaryAgenda(month=objMonth,
-                                          agenda=self.agenda,
-                                          summary_type='MK',
-                                          mk_id=vote_action.member_id,
-                                          votes=1,
-                                          score=agendaScore * (1 if vote_action.type == 'for' else -1),
-                                          for_votes=(1 if vote_action.type == 'for' else 0),
-                                          against_votes=(1 if vote_action.type == 'against' else 0))
-                newObjects.append(mkSummary)
-            else:
-                voters[vote_action.type].append(vote_action.member_id)
-
-        SummaryAgenda.objects.filter(agenda=self.agenda,mk_id__in=voters['for'],month=objMonth).update(votes=F('votes') + 1, score=F('score')+agendaScore, for_votes=F('for_votes') + 1)
-        SummaryAgenda.objects.filter(agenda=self.agenda,mk_id__in=voters['against'],month=objMonth).update(votes=F('votes') + 1, score=F('score')-agendaScore, against_votes=F('against_votes') + 1)
-        if newObjects:
-            SummaryAgenda.objects.bulk_create(newObjects)
-
-    def save(self,*args,**kwargs):
-        super(AgendaVote,self).save(*args,**kwargs)
-        self.update_monthly_counters()
+        """Apply the difference between what this agenda vote was counted as
+        in the monthly summaries and what it should be counted as now"""
+        counted = self._stored_summary_state()
+        state = self._summary_state()
+        if state == counted:
+            return
+        if counted:
+            SummaryAgenda.objects.apply_agenda_vote(*counted, sign=-1)
+        if state:
+            SummaryAgenda.objects.apply_agenda_vote(*state)
+
+    def retract_monthly_counters(self):
+        counted = self._stored_summary_state()
+        if counted:
+            SummaryAgenda.objects.apply_agenda_vote(*counted, sign=-1)
 
 class AgendaMeeting(models.Model):
     agenda = models.ForeignKey('Agenda', related_name='agendameetings')
@@ -218,8 +239,9 @@ class AgendaManager(models.Manager):
     def get_selected_for_instance(self, instance, user=None, top=3, bottom=3):
         # Returns interesting agendas for model instances such as: member, party
         agendas = list(self.get_relevant_for_user(user))
+        scores = self.scores_for_instances(agendas, [instance])
         for agenda in agendas:
-            agenda.score = agenda.__getattribute__('%s_score' % instance.__class__.__name__.lower())(instance)
+            agenda.score = scores[agenda.id][instance.id]
             agenda.significance = agenda.score * agenda.num_followers
         agendas.sort(key=attrgetter('significance'))
         agendas = get_top_bottom(agendas, top, bottom)
@@ -227,6 +249,74 @@ class AgendaManager(models.Manager):
         agendas['bottom'].sort(key=attrgetter('score'), reverse=True)
         return agendas
 
+    def scores_for_instances(self, agendas, instances):
+        """Returns {agenda_id: {instance_id: score}} for instances of a single
+        model: members, parties or candidate lists"""
+        model_name = instances[0].__class__.__name__.lower() if instances else None
+        if model_name == 'member':
+            return self.scores_for_members(agendas, instances)
+        if model_name == 'party':
+            return self.scores_for_parties(agendas, instances)
+        if model_name == 'candidatelist':
+            return self.scores_for_candidate_lists(agendas, instances)
+        return dict((agenda.id, {}) for agenda in agendas)
+
+    def scores_for_members(self, agendas, members):
+        "Scores of the members in the current knesset, like member_score"
+        scores = shared_scores()
+        start = dateMonthTruncate(Knesset.objects.current_knesset().start_date)
+        member_ids = [member.id for member in members]
+        return dict((agenda.id,
+                     dict((mk_id, values.score) for mk_id, values in
+                          scores.values(agenda.id, member_ids, start).items()))
+                    for agenda in agendas)
+
+    def scores_for_parties(self, agendas, parties):
+        party_members = defaultdict(list)
+        for party_id, member_id in Member.objects.filter(
+                current_party__in=parties).values_list('current_party_id', 'id'):
+            party_members[party_id].append(member_id)
+        return self._scores_for_member_groups(
+            agendas, dict((party.id, (party_members[party.id], party.number_of_seats))
+                          for party in parties))
+
+    def scores_for_candidate_lists(self, agendas, candidate_lists):
+        groups = {}
+        for candidate_list in candidate_lists:
+            member_ids = list(candidate_list.member_ids)
+            groups[candidate_list.id] = (member_ids, len(member_ids))
+        return self._scores_for_member_groups(agendas, groups)
+
+    def _scores_for_member_groups(self, agendas, groups):
+        """Scores groups of members on agendas with a single aggregation over
+        the agenda votes.
+
+        groups is {key: (member_ids, number_of_seats)}, the score of a group
+        is its members' votes relative to number_of_seats members voting with
+        the agenda on all of its votes. Returns {agenda_id: {key: score}}.
+        """
+        agenda_ids = [agenda.id for agenda in agendas]
+        values = queries.getAgendaMemberVoteValues(
+            agenda_ids, set(chain.from_iterable(
+                member_ids for member_ids, seats in groups.values())))
+        agenda_max_scores = defaultdict(float)
+        for agenda_id, score, importance in AgendaVote.objects.filter(
+                agenda__in=agenda_ids).values_list('agenda_id', 'score', 'importance'):
+            agenda_max_scores[agenda_id] += abs(score * importance)
+
+        scores = {}
+        for agenda_id in agenda_ids:
+            agenda_scores = scores[agenda_id] = {}
+            for key, (member_ids, seats) in groups.items():
+                max_score = agenda_max_scores[agenda_id] * (seats or 0)
+                if max_score > 0:
+                    value = sum(values.get((agenda_id, member_id), 0)
+                                for member_id in member_ids)
+                    agenda_scores[key] = value / max_score * 100
+                else:
+                    agenda_scores[key] = 0.0
+        return scores
+
     def get_relevant_for_mk(self, mk, agendaId):
         agendas = AgendaVote.objects.filter(agenda__id=agendaId,vote__votes__id=mk).distinct()
         return agendas
@@ -258,25 +348,20 @@ class AgendaManager(models.Manager):
         return agendas
 
     def get_mks_values(self):
-        mks_values = cache.get('agendas_mks_values')
+        cache_key = agendas_cache_key('agendas_mks_values')
+        mks_values = cache.get(cache_key)
         if not mks_values:
-            q = queries.agendas_mks_grade()
-            # outer join - add missing mks to agendas
-            newAgendaMkVotes = {}
-            # generates a set of all the current mk ids that have ever voted for any agenda
-            # its not perfect, but its better than creating another query to generate all known mkids
-            allMkIds = set(map(itemgetter(0),chain.from_iterable(q.values())))
-            for agendaId,agendaVotes in q.items():
-                # the newdict will have 0's for each mkid, the update will change the value for known mks
-                newDict = {}.fromkeys(allMkIds,(0,0,0))
-                newDict.update(dict(map(lambda (mkid,score,volume,numvotes):(mkid,(score,volume,numvotes)),agendaVotes)))
-                newAgendaMkVotes[agendaId]=newDict.items()
+            scores = shared_scores()
+            # every mk that has ever voted on any agenda gets a value in all
+            # agendas, with 0's where he never voted on it
             mks_values = {}
-            for agenda_id, scores in newAgendaMkVotes.items():
-                mks_values[agenda_id] = \
-                    map(lambda x: (x[1][0], dict(score=x[1][1][0], rank=x[0], volume=x[1][1][1], numvotes=x[1][1][2])),
-                        enumerate(sorted(scores,key=lambda x:x[1][0],reverse=True), 1))
-            cache.set('agendas_mks_values', mks_values, 1800)
+            for agenda_id, (ranked,) in scores.ranges_values([[None, None]]).items():
+                mks_values[agenda_id] = [
+                    (mk_id, dict(score=round(values.score, 2), rank=rank,
+                                 volume=round(values.volume, 2),
+                                 numvotes=values.numvotes))
+                    for rank, (mk_id, values) in enumerate(ranked, 1)]
+            cache.set(cache_key, mks_values, settings.AGENDA_CACHE_TIME)
         return mks_values
 
 
@@ -361,90 +446,29 @@ class Agenda(models.Model):
             return 0.0
 
     def party_score(self, party):
-        # Since we're already calculating python side, no need to do 2 queries
-        # with joins, select for and against, and calcualte the things
-        qs = AgendaVote.objects.filter(
-            agenda=self, vote__actions__member__in=party.members.all(),
-            vote__actions__type__in=['against', 'for']).extra(
-                select={'weighted_score': 'agendas_agendavote.score*agendas_agendavote.importance'}
-            ).values_list('weighted_score', 'vote__actions__type')
-
-        for_score = 0
-        against_score = 0
-
-        for score, action_type in qs:
-            if action_type == 'against':
-                against_score += score
-            else:
-                for_score += score
-
-        #max_score = sum([abs(x) for x in self.agendavotes.values_list('score', flat=True)]) * party.members.count()
-        # To save the queries, make sure to pass prefetch/select related
-        # Removed the values call, so that we can utilize the prefetched stuf
-        # This reduces the number of queries when called for example from
-        # AgendaResource.dehydrate
-        max_score = sum(abs(x.score * x.importance) for x in
-                        self.agendavotes.all()) * party.number_of_seats
-
-        if max_score > 0:
-            return (for_score - against_score) / max_score * 100
-        else:
-            return 0.0
+        return self.scores_for_parties([party])[party.id]
 
     def candidate_list_score(self, candidate_list):
-        # Since we're already calculating python side, no need to do 2 queries
-        # with joins, select for and against, and calcualte the things
-        qs = AgendaVote.objects.filter(
-            agenda=self, vote__actions__member__in=candidate_list.member_ids,
-            vote__actions__type__in=['against', 'for']).extra(
-                select={'weighted_score': 'agendas_agendavote.score*agendas_agendavote.importance'}
-            ).values_list('weighted_score', 'vote__actions__type')
-
-        for_score = 0
-        against_score = 0
-
-        for score, action_type in qs:
-            if action_type == 'against':
-                against_score += score
-            else:
-                for_score += score
-
-        #max_score = sum([abs(x) for x in self.agendavotes.values_list('score', flat=True)]) * party.members.count()
-        # To save the queries, make sure to pass prefetch/select related
-        # Removed the values call, so that we can utilize the prefetched stuf
-        # This reduces the number of queries when called for example from
-        # AgendaResource.dehydrate
-        max_score = sum(abs(x.score * x.importance) for x in
-                        self.agendavotes.all()) * len(candidate_list.member_ids)
-
-        if max_score > 0:
-            return (for_score - against_score) / max_score * 100
-        else:
-            return 0.0
+        return self.scores_for_candidate_lists([candidate_list])[candidate_list.id]
+
+    def scores_for_parties(self, parties):
+        "Returns {party_id: score} of the given parties on this agenda"
+        return Agenda.objects.scores_for_parties([self], parties)[self.id]
 
-    def related_mk_votes(self,member):
-        # Find all votes that
-        #   1) This agenda is ascribed to
-        #   2) the member participated in and either voted for or against
-        # for_votes      = AgendaVote.objects.filter(agenda=self,vote__voteaction__member=member,vote__voteaction__type="for").distinct()
-        #against_votes   = AgendaVote.objects.filter(agenda=self,vote__voteaction__member=member,vote__voteaction__type="against").distinct()
-        vote_actions = VoteAction.objects.filter(member=member,vote__agendavotes__agenda=self)
-        all_votes = AgendaVote.objects.filter(agenda=self,vote__actions__member=member).distinct()
-        # TODO: improve ugly code below
-        member_votes = list()
-        for member_vote in all_votes:
-            for vote_action in vote_actions:
-                if (vote_action.vote == member_vote.vote):
-                    member_votes.insert(0,member_vote)
-                    member_votes[0].voteaction = vote_action
-
-        return member_votes
-        #return AgendaVote.objects.filter(agenda=self,vote__voteaction__member=mk).distinct()
+    def scores_for_candidate_lists(self, candidate_lists):
+        "Returns {candidate_list_id: score} of the given lists on this agenda"
+        return Agenda.objects.scores_for_candidate_lists([self], candidate_lists)[self.id]
+
+    def related_mk_votes(self, member):
+        """The votes of this agenda member voted in, with the member's vote
+        action, newest first"""
+        return AgendaVote.objects.member_votes(member, agenda=self)
 
     def selected_instances(self, cls, top=3, bottom=3):
         instances = list(cls.objects.all())
+        scores = Agenda.objects.scores_for_instances([self], instances)[self.id]
         for instance in instances:
-            instance.score = self.__getattribute__('%s_score' % instance.__class__.__name__.lower())(instance)
+            instance.score = scores[instance.id]
         instances.sort(key=attrgetter('score'))
         instances = get_top_bottom(instances, top, bottom)
         instances['top'].sort(key=attrgetter('score'), reverse=True)
@@ -490,72 +514,41 @@ class Agenda(models.Model):
             ranges = [[dateMonthTruncate(Knesset.objects.current_knesset().start_date),None]]
         else:
             only_current_mks = False
-        mks_values = False
+        mk_results = None
         mk_ids = [mk.id for mk in mks] if mks else []
 
         fullRange = ranges == [[None,None]]
+        cache_key = agenda_cache_key('agenda_%d_mks_values', self.id)
         if fullRange:
-            mks_values = cache.get('agenda_%d_mks_values' % self.id)
-            if mks_values and mks:
-                mks_values = [(mk_id, values)
-                              for (mk_id, values) in mks_values
+            mk_results = cache.get(cache_key)
+            if mk_results and mks:
+                mk_results = [(mk_id, values)
+                              for (mk_id, values) in mk_results
                               if mk_id in mk_ids]
 
-        if not mks_values:
+        if not mk_results:
+            scores = shared_scores()
             # get list of mk ids
             mk_ids = mk_ids or Membership.objects.membership_in_range(ranges, only_current_mks=only_current_mks)
-
-            # generate summary query
-            filters_folded = self.generateSummaryFilters(ranges, 'month', 'month')
-
-            # query summary
-            baseQuerySet = SummaryAgenda.objects.filter(agenda=self)
-            if filters_folded:
-                baseQuerySet.filter(filters_folded)
-            summaries = list(baseQuerySet)
-            # group summaries for respective ranges
-            summariesForRanges = []
-            for r in ranges:
-                summariesForRange = defaultdict(list)
-                for s in summaries:
-                    if (not r[0] or s.month>=r[0]) and \
-                        (not r[1] or s.month<r[1]):
-                        summariesForRange[s.summary_type].append(s)
-                summariesForRanges.append(summariesForRange)
+            if mk_ids is None:
+                mk_ids = scores.mk_ids(self.id)
 
             # compute agenda measures, store results per MK
             mk_results = dict(map(lambda mk_id:(mk_id,[]),mk_ids))
-            for summaries in summariesForRanges:
-                agenda_data             = summaries['AG']
-                total_votes             = sum(map(attrgetter('votes'),agenda_data))
-                total_for_votes         = sum(map(attrgetter('for_votes'),agenda_data))
-                total_against_votes     = sum(map(attrgetter('against_votes'),agenda_data))                
-                total_score             = sum(map(attrgetter('score'),agenda_data))
-                current_mks_data        = indexby(summaries['MK'],attrgetter('mk_id'))
-                # calculate results per mk
-                rangeMkResults          = []
-                for mk_id in mk_results.keys():
-                    mk_data     = current_mks_data[mk_id]
-                    if mk_data:
-                        mk_votes            = sum(map(attrgetter('votes'),mk_data))
-                        mk_for_votes        = sum(map(attrgetter('for_votes'),mk_data))
-                        mk_against_votes    = sum(map(attrgetter('against_votes'),mk_data))
-                        mk_volume           = 100*mk_votes/total_votes
-                        mk_score            = 100*sum(map(attrgetter('score'),mk_data))/total_score if total_score != 0 else 0
-                        rangeMkResults.append((mk_id,mk_votes,mk_for_votes,mk_against_votes,mk_score,mk_volume))
-                    else:
-                        rangeMkResults.append(tuple([mk_id]+[0]*5))
-                # sort results by score descending
-                for rank,(mk_id,mk_votes,mk_for_votes,mk_against_votes,mk_score,mk_volume) in enumerate(sorted(rangeMkResults,key=itemgetter(4,0),reverse=True)):
-                    mk_range_data = dict(score=mk_score,rank=rank,volume=mk_volume,numvotes=mk_votes,numforvotes=mk_for_votes,numagainstvotes=mk_against_votes)
+            for start, end in ranges:
+                ranked = scores.ranked(self.id, mk_results.keys(), start, end)
+                for rank, (mk_id, values) in enumerate(ranked):
+                    mk_range_data = dict(score=values.score,rank=rank,volume=values.volume,
+                                         numvotes=values.numvotes,numforvotes=values.numforvotes,
+                                         numagainstvotes=values.numagainstvotes)
                     if len(ranges)==1:
                         mk_results[mk_id]=mk_range_data
                     else:
                         mk_results[mk_id].append(mk_range_data)
-            if fullRange:
-                cache.set('agenda_%d_mks_values' % self.id, mks_values, 1800)
-        if len(ranges)==1:
-            mk_results = sorted(mk_results.items(),key=lambda (k,v):v['rank'])
+            if len(ranges)==1:
+                mk_results = sorted(mk_results.items(),key=lambda (k,v):v['rank'])
+            if fullRange and not mks:
+                cache.set(cache_key, mk_results, settings.AGENDA_CACHE_TIME)
         return mk_results
 
 
@@ -586,10 +579,19 @@ class Agenda(models.Model):
     def get_all_party_values(self):
         return Agenda.objects.get_all_party_values()
 
+    def _get_suggested_votes(self, strategy, num):
+        """The precomputed suggestions of this strategy, as votes with a
+        score. At most NUM_SUGGESTED_VOTES are kept per strategy"""
+        suggestions = self.suggested_votes.filter(
+            strategy=strategy).select_related('vote')[:num]
+        votes = []
+        for suggestion in suggestions:
+            suggestion.vote.score = suggestion.score
+            votes.append(suggestion.vote)
+        return votes
+
     def get_suggested_votes_by_agendas(self, num):
-        votes = Vote.objects.filter(~Q(agendavotes__agenda=self))
-        votes = votes.annotate(score=Sum('agendavotes__importance'))
-        return votes.order_by('-score')[:num]
+        return self._get_suggested_votes('agendas', num)
 
     def get_suggested_votes_by_agenda_tags(self, num):
         # TODO: This is untested, agendas currently don't have tags
@@ -607,15 +609,114 @@ class Agenda(models.Model):
         return votes.order_by('-score')[:num]
 
     def get_suggested_votes_by_controversy(self, num):
-        votes = Vote.objects.filter(~Q(agendavotes__agenda=self))
-        votes = votes.extra(select=dict(score = 'controversy'))
-        return votes.order_by('-score')[:num]
+        return self._get_suggested_votes('controversy', num)
 
 SUMMARY_TYPES = (
     ('AG','Agenda Votes'),
     ('MK','MK Counter')
 )
 
+SUMMARY_VOTE_TYPES = ('for', 'against')
+
+
+class SummaryAgendaManager(models.Manager):
+
+    def apply_delta(self, agenda_id, month, weighted_score, voters, sign=1,
+                    count_agenda_vote=True):
+        """Add (sign=1) or retract (sign=-1) one agenda vote's contribution
+        to the monthly summaries of an agenda.
+
+        voters is an iterable of (member_id, vote_type) pairs, only 'for' and
+        'against' are counted, same as the full recompute does.
+        """
+        if count_agenda_vote:
+            updated = self.filter(agenda=agenda_id, month=month,
+                                  summary_type='AG').update(
+                votes=F('votes') + sign,
+                score=F('score') + sign * abs(weighted_score),
+                db_updated=datetime.datetime.now())
+            if not updated and sign > 0:
+                self.create(agenda_id=agenda_id, month=month,
+                            summary_type='AG', votes=1,
+                            score=abs(weighted_score))
+
+        voters_by_type = defaultdict(list)
+        for member_id, vote_type in voters:
+            if vote_type in SUMMARY_VOTE_TYPES:
+                voters_by_type[vote_type].append(member_id)
+
+        new_summaries = []
+        for vote_type, member_ids in voters_by_type.items():
+            score = weighted_score if vote_type == 'for' else -weighted_score
+            counter = '%s_votes' % vote_type
+            mk_summaries = self.filter(agenda=agenda_id, month=month,
+                                       summary_type='MK',
+                                       mk__in=member_ids)
+            existing = set(mk_summaries.values_list('mk_id', flat=True))
+            if existing:
+                mk_summaries.update(**{
+                    'votes': F('votes') + sign,
+                    'score': F('score') + sign * score,
+                    'db_updated': datetime.datetime.now(),
+                    counter: F(counter) + sign})
+            if sign > 0:
+                new_summaries.extend(
+                    SummaryAgenda(agenda_id=agenda_id, month=month,
+                                  summary_type='MK', mk_id=member_id,
+                                  votes=1, score=score, **{counter: 1})
+                    for member_id in member_ids if member_id not in existing)
+        if new_summaries:
+            self.bulk_create(new_summaries)
+        if sign < 0:
+            self.filter(agenda=agenda_id, month=month, votes__lte=0).delete()
+        bump_agenda_generation(agenda_id)
+
+    def apply_agenda_vote(self, agenda_id, vote_id, weighted_score, sign=1):
+        vote_time = Vote.objects.filter(pk=vote_id).values_list('time', flat=True)
+        if not vote_time:
+            return
+        voters = VoteAction.objects.filter(
+            vote=vote_id, type__in=SUMMARY_VOTE_TYPES).values_list(
+                'member_id', 'type')
+        self.apply_delta(agenda_id, dateMonthTruncate(vote_time[0]),
+                         weighted_score, voters, sign)
+
+    def apply_vote_action(self, vote_id, member_id, old_type, new_type):
+        """Move a member's ballot from old_type to new_type in the summaries
+        of every agenda the vote is ascribed to. Either type may be None."""
+        if old_type not in SUMMARY_VOTE_TYPES and \
+                new_type not in SUMMARY_VOTE_TYPES:
+            return
+        agenda_votes = list(AgendaVote.objects.filter(vote=vote_id).values_list(
+            'agenda_id', 'score', 'importance', 'vote__time'))
+        for agenda_id, score, importance, vote_time in agenda_votes:
+            month = dateMonthTruncate(vote_time)
+            if old_type:
+                self.apply_delta(agenda_id, month, score * importance,
+                                 [(member_id, old_type)], sign=-1,
+                                 count_agenda_vote=False)
+            if new_type:
+                self.apply_delta(agenda_id, month, score * importance,
+                                 [(member_id, new_type)],
+                                 count_agenda_vote=False)
+
+    def recompute(self, agenda_id=None, since=None):
+        """Rebuild the summaries, optionally bounded to one agenda and/or to
+        the months starting at since. Must be run inside a transaction."""
+        summaries = self.all()
+        if agenda_id:
+            summaries = summaries.filter(agenda=agenda_id)
+        if since:
+            since = dateMonthTruncate(since)
+            summaries = summaries.filter(month__gte=since)
+        summaries.delete()
+        AgendaVote.objects.compute_all(agenda_id=agenda_id, since=since)
+        recomputed = [agenda_id] if agenda_id else \
+            Agenda.objects.values_list('id', flat=True)
+        for recomputed_id in recomputed:
+            bump_agenda_generation(recomputed_id)
+
+
 class SummaryAgenda(models.Model):
     agenda          = models.ForeignKey(Agenda, related_name='score_summaries')
     month           = models.DateTimeField(db_index=True)
@@ -628,9 +729,141 @@ class SummaryAgenda(models.Model):
     db_created      = models.DateTimeField(auto_now_add=True)
     db_updated      = models.DateTimeField(auto_now=True)
 
+    objects = SummaryAgendaManager()
+
     def __unicode__(self):
         return "%s %s %s %s (%f,%d)" % (str(self.agenda_id),str(self.month),self.summary_type,str(self.mk_id) if self.mk else u'n/a',self.score,self.votes)
 
+SUGGESTION_STRATEGIES = (
+    ('agendas', _('Important in other agendas')),
+    ('controversy', _('Controversial')),
+)
+
+# how many votes are kept suggested per agenda and strategy
+NUM_SUGGESTED_VOTES = 10
+
+
+class SuggestedVoteManager(models.Manager):
+
+    def ranking(self, strategy, num):
+        """Returns up to num (vote_id, score) of all the votes, best first.
+
+        'agendas' scores a vote by its total importance in all agendas, and
+        'controversy' by its controversy. Votes with no score come last, the
+        most recent first.
+        """
+        if strategy == 'agendas':
+            scored = AgendaVote.objects.values_list('vote').annotate(
+                score=Sum('importance')).order_by('-score', 'vote')
+            unscored = Vote.objects.filter(agendavotes__isnull=True)
+        elif strategy == 'controversy':
+            scored = Vote.objects.filter(controversy__isnull=False).order_by(
+                '-controversy', 'id').values_list('id', 'controversy')
+            unscored = Vote.objects.filter(controversy__isnull=True)
+        else:
+            raise ValueError('unknown suggestion strategy %r' % strategy)
+        ranking = list(scored[:num])
+        if len(ranking) < num:
+            unscored = unscored.order_by('-time', '-id').values_list('id', flat=True)
+            ranking.extend((vote_id, None)
+                           for vote_id in unscored[:num - len(ranking)])
+        return ranking
+
+    def refresh(self, agenda_ids=None, strategies=None, num=NUM_SUGGESTED_VOTES):
+        """Recompute the suggestions of agenda_ids, or of all agendas.
+
+        Every agenda is ranked from one ranking of all the votes per
+        strategy, skipping the votes that are already in the agenda.
+        """
+        if strategies is None:
+            strategies = [strategy for strategy, _ in SUGGESTION_STRATEGIES]
+        agendas = Agenda.objects.all()
+        if agenda_ids is not None:
+            agendas = agendas.filter(id__in=list(agenda_ids))
+        agenda_ids = list(agendas.values_list('id', flat=True))
+        if not agenda_ids:
+            return
+
+        agenda_votes = defaultdict(set)
+        for agenda_id, vote_id in AgendaVote.objects.filter(
+                agenda__in=agenda_ids).values_list('agenda_id', 'vote_id'):
+            agenda_votes[agenda_id].add(vote_id)
+        longest = max([len(votes) for votes in agenda_votes.values()] or [0])
+
+        suggestions = []
+        for strategy in strategies:
+            ranking = self.ranking(strategy, num + longest)
+            for agenda_id in agenda_ids:
+                excluded = agenda_votes[agenda_id]
+                candidates = ((vote_id, score) for vote_id, score in ranking
+                              if vote_id not in excluded)
+                for rank, (vote_id, score) in enumerate(islice(candidates, num), 1):
+                    suggestions.append(self.model(agenda_id=agenda_id,
+                                                  vote_id=vote_id,
+                                                  strategy=strategy,
+                                                  score=score, rank=rank))
+        self.filter(agenda__in=agenda_ids, strategy__in=strategies).delete()
+        self.bulk_create(suggestions)
+
+    def _outranked_agendas(self, strategy, vote_id, score, num):
+        """Ids of the agendas whose suggestions may change if vote_id got
+        this score: those suggesting it, those with less than num
+        suggestions, and those suggesting a lower scored vote. Unscored
+        votes rank the lowest, so any vote may outrank them"""
+        suggestions = self.filter(strategy=strategy)
+        affected = set(suggestions.filter(vote=vote_id).values_list(
+            'agenda_id', flat=True))
+        counted = suggestions.values('agenda_id').annotate(
+            count=Count('id'), scored=Count('score'), lowest=Min('score'))
+        for row in counted:
+            if row['count'] < num:
+                affected.add(row['agenda_id'])
+            elif row['scored'] < row['count'] or (score is not None and
+                                                  row['lowest'] <= score):
+                affected.add(row['agenda_id'])
+        affected.update(Agenda.objects.exclude(
+            id__in=[row['agenda_id'] for row in counted]).values_list(
+                'id', flat=True))
+        return affected
+
+    def agenda_vote_changed(self, agenda_id, vote_id, num=NUM_SUGGESTED_VOTES):
+        """Update the suggestions after an agenda vote was added, changed or
+        removed: the agenda's own, and those of the agendas the vote's new
+        total importance may matter to"""
+        self.refresh([agenda_id], ['controversy'], num)
+        score = AgendaVote.objects.filter(vote=vote_id).aggregate(
+            score=Sum('importance'))['score']
+        affected = self._outranked_agendas('agendas', vote_id, score, num)
+        affected.add(agenda_id)
+        self.refresh(affected, ['agendas'], num)
+
+    def vote_changed(self, vote_id, controversy, num=NUM_SUGGESTED_VOTES):
+        "Update the suggestions after a vote was added or its controversy changed"
+        affected = self._outranked_agendas('controversy', vote_id,
+                                           controversy, num)
+        if affected:
+            self.refresh(affected, ['controversy'], num)
+
+
+class SuggestedVote(models.Model):
+    """A vote suggested to the editors of an agenda, precomputed by
+    SuggestedVoteManager.refresh"""
+    agenda = models.ForeignKey(Agenda, related_name='suggested_votes')
+    vote = models.ForeignKey('laws.Vote', related_name='suggested_for_agendas')
+    strategy = models.CharField(max_length=20, choices=SUGGESTION_STRATEGIES)
+    score = models.FloatField(null=True, blank=True)
+    rank = models.PositiveIntegerField()
+
+    objects = SuggestedVoteManager()
+
+    class Meta:
+        ordering = ('agenda', 'strategy', 'rank')
+        unique_together = ('agenda', 'strategy', 'vote')
+
+    def __unicode__(self):
+        return u"%s %s #%d: %s" % (self.agenda_id, self.strategy, self.rank,
+                                   self.vote_id)
+
 from listeners import *
 
 def dateMonthTruncate(dt):
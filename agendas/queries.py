@@ -118,67 +118,6 @@ FROM   (SELECT agid                   agendaid,
             AND a.partyid = v.partyid 
 ORDER BY agendaid,score desc"""
 
-def agendas_mks_grade():
-    cursor = connection.cursor()
-    cursor.execute(MK_QUERY)
-    results = dict(map(lambda (key,group):(key,map(lambda g:(g[1],float(g[2]),float(g[3]),int(g[4])),list(group))),
-                       groupby(cursor.fetchall(),key=itemgetter(0))))
-    return results
-
-MK_QUERY = """
-SELECT a.agendaid, 
-       v.memberid, 
-       Round(Coalesce(CAST(Coalesce(v.totalvotevalue, 0.0) / (case when a.totalscore = 0 then 1 else a.totalscore end) * 100.0 AS 
-                  NUMERIC),0.0), 2 
-       ) score,
-       Round(Coalesce(CAST(Coalesce(v.numvotes,0.0) / (case when a.numvotes = 0 then 1 else a.numvotes end) * 100.0 AS
-                  NUMERIC),0.0), 2
-       ) volume,
-       CAST(Coalesce(v.numvotes,0) AS NUMERIC) numvotes 
-FROM   (SELECT agenda_id                    agendaid, 
-               SUM(Abs(score * importance)) totalscore,
-               COUNT(*) numvotes
-        FROM   agendas_agendavote 
-        GROUP  BY agenda_id) a 
-       LEFT OUTER JOIN (SELECT agenda_id, 
-                               memberid, 
-                               SUM(forvotes) - SUM(againstvotes) totalvotevalue,
-                               SUM(numvotes) numvotes
-                        FROM   (SELECT a.agenda_id, 
-                                       p.memberid, 
-                                       CASE p.vtype 
-                                         WHEN 'for' THEN p.numvotes * a.VALUE 
-                                         ELSE 0 
-                                       END forvotes, 
-                                       CASE p.vtype 
-                                         WHEN 'against' THEN 
-                                         p.numvotes * a.VALUE 
-                                         ELSE 0 
-                                       END againstvotes, 
-                                       p.numvotes numvotes 
-                                FROM   (SELECT m.id      memberid, 
-                                               v.vote_id voteid, 
-                                               v.TYPE    vtype, 
-                                               COUNT(*)  numvotes 
-                                        FROM   laws_voteaction v 
-                                               INNER JOIN mks_member m 
-                                                 ON v.member_id = m.id 
-                                        WHERE  v.TYPE IN ( 'for', 'against' ) 
-                                        GROUP  BY m.id, 
-                                                  v.vote_id, 
-                                                  v.TYPE) p 
-                                       INNER JOIN (SELECT vote_id, 
-                                                          agenda_id, 
-                                                          score * importance AS 
-                                                          VALUE 
-                                                   FROM   agendas_agendavote) a 
-                                         ON p.voteid = a.vote_id) b 
-                        GROUP  BY agenda_id, 
-                                  memberid) v 
-         ON a.agendaid = v.agenda_id 
-ORDER  BY agendaid, 
-          score DESC""" 
-
 def getAgendaEditorIds():
     cursor = connection.cursor()
     cursor.execute("""SELECT agenda_id,user_id FROM agendas_agenda_editors ORDER BY agenda_id""")
@@ -186,6 +125,37 @@ def getAgendaEditorIds():
                        groupby(cursor.fetchall(),key=itemgetter(0))))
     return results
 
+def getAgendaMemberVoteValues(agenda_ids, member_ids):
+    """Returns {(agenda_id, member_id): value}, where value is the sum of the
+    weighted agenda votes the member voted for, minus those voted against"""
+    agenda_ids, member_ids = list(agenda_ids), list(member_ids)
+    if not agenda_ids or not member_ids:
+        return {}
+    cursor = connection.cursor()
+    cursor.execute(AGENDA_MEMBER_VOTES_QUERY % {
+        'agenda_ids': ','.join(['%s'] * len(agenda_ids)),
+        'member_ids': ','.join(['%s'] * len(member_ids))},
+        agenda_ids + member_ids)
+    results = dict(((agenda_id, member_id), float(value))
+                   for agenda_id, member_id, value in cursor.fetchall())
+    return results
+
+AGENDA_MEMBER_VOTES_QUERY = """
+SELECT av.agenda_id,
+       va.member_id,
+       SUM(CASE va.type
+             WHEN 'for' THEN av.score * av.importance
+             ELSE -av.score * av.importance
+           END) value
+FROM   agendas_agendavote av
+       INNER JOIN laws_voteaction va
+         ON va.vote_id = av.vote_id
+WHERE  va.type IN ( 'for', 'against' )
+       AND av.agenda_id IN (%(agenda_ids)s)
+       AND va.member_id IN (%(member_ids)s)
+GROUP  BY av.agenda_id,
+          va.member_id"""
+
 BASE_AGENDA_QUERY = """ 
 INSERT INTO agendas_summaryagenda (month,summary_type,agenda_id,score,votes,for_votes,against_votes,db_created,db_updated)
 SELECT  %(monthfunc)s,v.time) as month,
@@ -198,6 +168,7 @@ SELECT  %(monthfunc)s,v.time) as month,
         %(nowfunc)s,%(nowfunc)s
 FROM   agendas_agendavote a
 INNER JOIN laws_vote v ON a.vote_id = v.id
+WHERE  %(filters)s
 GROUP  BY %(monthfunc)s,v.time),a.agenda_id """
 
 BASE_MK_QUERY = """
@@ -251,6 +222,7 @@ FROM
              v.time as time
       FROM agendas_agendavote a
       JOIN laws_vote v ON a.vote_id = v.id
+      WHERE %(filters)s
 ) a ON p.voteid = a.vote_id) b
 GROUP BY agenda_id,
          memberid,
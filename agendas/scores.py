@@ -0,0 +1,207 @@
+'''
+Batched agenda scoring over the monthly agenda summaries.
+
+The SummaryAgenda rows are loaded once into compact per-agenda running totals
+by month, and the scores, volumes and vote counts of any set of agendas,
+members and month ranges are then computed from those without going back to
+the db. The writers of the summaries bump the agenda generations (see
+agendas.generations), which is how the loaded agendas are known to be stale.
+'''
+from __future__ import division
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import chain
+from threading import Lock
+
+from generations import agenda_generations, agendas_generation
+
+MkValues = namedtuple('MkValues',
+                      'score volume numvotes numforvotes numagainstvotes')
+NO_VALUES = MkValues(0, 0, 0, 0, 0)
+
+
+def month_key(dt):
+    "Returns the month of dt as a yyyymm integer, None stays None"
+    if dt is None:
+        return None
+    return dt.year * 100 + dt.month
+
+
+class SummarySeries(object):
+    """The monthly counters of an agenda, or of a member in an agenda, kept
+    as running totals by month, so that the totals of any month range are a
+    subtraction of two entries"""
+
+    __slots__ = ('months', 'score', 'votes', 'for_votes', 'against_votes')
+
+    def __init__(self):
+        self.months = array('l')
+        # entry i is the total of the first i months
+        self.score = array('d', [0])
+        self.votes = array('l', [0])
+        self.for_votes = array('l', [0])
+        self.against_votes = array('l', [0])
+
+    def append(self, month, score, votes, for_votes, against_votes):
+        "Adds a month's counters, months must be appended in order"
+        if self.months and self.months[-1] == month:
+            self.score[-1] += score
+            self.votes[-1] += votes
+            self.for_votes[-1] += for_votes
+            self.against_votes[-1] += against_votes
+            return
+        self.months.append(month)
+        self.score.append(self.score[-1] + score)
+        self.votes.append(self.votes[-1] + votes)
+        self.for_votes.append(self.for_votes[-1] + for_votes)
+        self.against_votes.append(self.against_votes[-1] + against_votes)
+
+    def totals(self, start=None, end=None):
+        """Returns (score, votes, for_votes, against_votes) summed over the
+        months in [start, end), given as yyyymm keys"""
+        lo = bisect_left(self.months, start) if start else 0
+        hi = bisect_left(self.months, end) if end else len(self.months)
+        return (self.score[hi] - self.score[lo],
+                self.votes[hi] - self.votes[lo],
+                self.for_votes[hi] - self.for_votes[lo],
+                self.against_votes[hi] - self.against_votes[lo])
+
+
+class AgendaScores(object):
+    """Agenda x member scores over any month range, indexed from the
+    summaries of all agendas.
+
+    refresh() brings the index up to date by reloading only the agendas
+    whose generation was bumped since they were loaded.
+    """
+
+    def __init__(self):
+        self.load()
+
+    @staticmethod
+    def _current_generations():
+        "The generation of all the agendas, and {agenda_id: generation}"
+        from agendas.models import Agenda
+        generation = agendas_generation()
+        return generation, agenda_generations(
+            Agenda.objects.values_list('id', flat=True))
+
+    def load(self, agenda_ids=None):
+        "Loads the summaries of agenda_ids, or of all agendas if None"
+        from agendas.models import SummaryAgenda
+
+        summaries = SummaryAgenda.objects.order_by('month')
+        if agenda_ids is None:
+            self._generation, self._agenda_generations = self._current_generations()
+            self.agendas = {}  # agenda_id -> SummarySeries
+            self.members = {}  # agenda_id -> {mk_id: SummarySeries}
+        else:
+            agenda_ids = list(agenda_ids)
+            for agenda_id in agenda_ids:
+                self.agendas.pop(agenda_id, None)
+                self.members.pop(agenda_id, None)
+            summaries = summaries.filter(agenda__in=agenda_ids)
+
+        rows = summaries.values_list('agenda_id', 'summary_type', 'mk_id',
+                                     'month', 'score', 'votes', 'for_votes',
+                                     'against_votes')
+        for agenda_id, summary_type, mk_id, month, score, votes, \
+                for_votes, against_votes in rows.iterator():
+            if summary_type == 'AG':
+                series = self.agendas.get(agenda_id)
+                if series is None:
+                    series = self.agendas[agenda_id] = SummarySeries()
+            elif summary_type == 'MK':
+                agenda_members = self.members.setdefault(agenda_id, {})
+                series = agenda_members.get(mk_id)
+                if series is None:
+                    series = agenda_members[mk_id] = SummarySeries()
+            else:
+                continue
+            series.append(month_key(month), score, votes, for_votes,
+                          against_votes)
+
+    def refresh(self):
+        "Reloads the agendas whose generation changed, a cache get if none did"
+        if agendas_generation() == self._generation:
+            return
+        self._generation, generations = self._current_generations()
+        changed = [agenda_id for agenda_id, generation in generations.items()
+                   if generation != self._agenda_generations.get(agenda_id)]
+        for agenda_id in set(self._agenda_generations) - set(generations):
+            # deleted agendas
+            self.agendas.pop(agenda_id, None)
+            self.members.pop(agenda_id, None)
+        self._agenda_generations = generations
+        if changed:
+            self.load(changed)
+
+    def agenda_ids(self):
+        return self.agendas.keys()
+
+    def mk_ids(self, agenda_id=None):
+        "Ids of the members with any summary in agenda_id, or in any agenda"
+        if agenda_id is not None:
+            return self.members.get(agenda_id, {}).keys()
+        return set(chain.from_iterable(self.members.values()))
+
+    def values(self, agenda_id, mk_ids, start=None, end=None):
+        """Returns {mk_id: MkValues} of agenda_id for the given members, over
+        the months in [start, end). start and end are dates or None"""
+        start, end = month_key(start), month_key(end)
+        agenda_series = self.agendas.get(agenda_id)
+        if agenda_series is not None:
+            total_score, total_votes = agenda_series.totals(start, end)[:2]
+        else:
+            total_score = total_votes = 0
+        members = self.members.get(agenda_id, {})
+
+        results = {}
+        for mk_id in mk_ids:
+            series = members.get(mk_id)
+            if series is None:
+                results[mk_id] = NO_VALUES
+                continue
+            score, votes, for_votes, against_votes = series.totals(start, end)
+            results[mk_id] = MkValues(
+                100 * score / total_score if total_score else 0,
+                100 * votes / total_votes if total_votes else 0,
+                votes, for_votes, against_votes)
+        return results
+
+    def ranked(self, agenda_id, mk_ids, start=None, end=None):
+        """values() as a list of (mk_id, MkValues), highest score first. Ties
+        are broken by the higher member id, like the agenda pages always did
+        """
+        values = self.values(agenda_id, mk_ids, start, end)
+        return sorted(values.items(), key=lambda (mk_id, v): (v.score, mk_id),
+                      reverse=True)
+
+    def ranges_values(self, ranges, mk_ids=None):
+        """Computes every loaded agenda over every range in one pass.
+
+        Returns {agenda_id: [ranked(agenda_id, ...) for each range]}, for
+        mk_ids or for all the members with any summary.
+        """
+        if mk_ids is None:
+            mk_ids = self.mk_ids()
+        return dict((agenda_id, [self.ranked(agenda_id, mk_ids, start, end)
+                                 for start, end in ranges])
+                    for agenda_id in self.agenda_ids())
+
+
+_shared_scores = None
+_shared_scores_lock = Lock()
+
+
+def shared_scores():
+    """The process wide AgendaScores, refreshed on each call from the
+    summaries of the agendas whose generation changed"""
+    global _shared_scores
+    with _shared_scores_lock:
+        if _shared_scores is None:
+            _shared_scores = AgendaScores()
+        else:
+            _shared_scores.refresh()
+        return _shared_scores
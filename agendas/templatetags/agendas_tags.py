@@ -1,4 +1,5 @@
 import json
+from operator import itemgetter
 
 from django import template
 from django.conf import settings
@@ -88,11 +89,12 @@ def agendas_for(user, obj, object_type):
 @register.inclusion_tag('agendas/agenda_list_item.html')
 def agenda_list_item(agenda, watched_agendas=None, agenda_votes_num=None, agenda_party_values=None, parties_lookup=None, editors_lookup=None, editor_ids=None):
 
-    #cached_context = cache.get('agenda_parties_%d' % agenda.id)
-    #if not cached_context:
-    #    selected_parties = agenda.selected_instances(Party, top=20,bottom=0)['top']
-    #    cached_context = {'selected_parties': selected_parties }
-    #    cache.set('agenda_parties_%d' % agenda.id, cached_context, 900)
+    if agenda_party_values is None:
+        # not precomputed by the view, score the current parties in one go
+        parties = Party.current_knesset.all()
+        parties_lookup = dict((party.id, party.name) for party in parties)
+        agenda_party_values = sorted(agenda.scores_for_parties(parties).items(),
+                                     key=itemgetter(1), reverse=True)
     party_scores = [(parties_lookup.get(val[0]), val[1]) for val in agenda_party_values]
     enumerated_party = [(idx+0.5, values[0]) for idx, values in enumerate(party_scores)]
     enumerated_score = [(idx, values[1]) for idx, values in enumerate(party_scores)]
@@ -1,14 +1,24 @@
+import csv
 import datetime
+import gzip
 import json
+import os
+import shutil
+import tempfile
 
 from django.test import TestCase
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
 from django.contrib.auth.models import User
 from django.contrib.sites.models import Site
 from django.utils import translation
 from django.conf import settings
+from django.test.utils import override_settings
 
-from models import Agenda, AgendaVote, AgendaBill, AgendaMeeting
+from models import (Agenda, AgendaVote, AgendaBill, AgendaMeeting,
+                    SummaryAgenda, SuggestedVote, NUM_SUGGESTED_VOTES)
+from scores import SummarySeries, shared_scores
+import generations
 from laws.models import Vote, VoteAction, Bill
 from mks.models import Party, Member, Membership, Knesset
 from committees.models import Committee, CommitteeMeeting
@@ -333,6 +343,24 @@ I have a deadline''')
         self.assertTemplateUsed(res, 'agendas/mk_agenda_detail.html')
         self.assertEqual(int(res.context['score']), -33)
         self.assertEqual(len(res.context['related_votes']), 2)
+        self.assertEqual([av.voteaction.type for av in res.context['related_votes']],
+                         ['for', 'for'])
+
+    def test_agenda_member_votes_api(self):
+        res = self.client.get('/api/v2/agenda-member-votes/?format=json'
+                              '&agenda=%d&member=%d&limit=1' %
+                              (self.agenda_1.id, self.mk_1.id))
+        self.assertEqual(res.status_code, 200)
+        data = json.loads(res.content)
+        self.assertEqual(data['meta']['total_count'], 2)
+        self.assertEqual(len(data['objects']), 1)
+        self.assertEqual(data['objects'][0]['voteaction_type'], 'for')
+        res = self.client.get('/api/v2/agenda-member-votes/?format=json'
+                              '&agenda=%d&member=%d' %
+                              (self.agenda_3.id, self.mk_2.id))
+        self.assertEqual(json.loads(res.content)['meta']['total_count'], 0)
+        res = self.client.get('/api/v2/agenda-member-votes/?format=json')
+        self.assertEqual(res.status_code, 400)
 
     def testAgendaDetailOptCacheFail(self):
         res = self.client.get(reverse('agenda-detail',
@@ -399,6 +427,186 @@ I have a deadline''')
         _validate_vote_list('votes_by_controversy')
         _validate_vote_list('votes_by_agendas')
 
+    def test_suggested_votes_follow_agenda_votes(self):
+        def suggestions():
+            return sorted(SuggestedVote.objects.values_list(
+                'agenda_id', 'strategy', 'vote_id', 'score', 'rank'))
+        AgendaVote.objects.create(agenda=self.agenda_2, vote=self.vote_1,
+                                  score=1, importance=0.5)
+        votes = self.agenda_2.get_suggested_votes_by_agendas(10)
+        self.assertEqual([v.id for v in votes], [self.vote_3.id])
+        votes = self.agenda_1.get_suggested_votes_by_agendas(10)
+        self.assertEqual([(v.id, v.score) for v in votes], [(self.vote_3.id, 1)])
+        incremental = suggestions()
+        SuggestedVote.objects.refresh()
+        self.assertEqual(suggestions(), incremental)
+
+    def test_new_unscored_vote_outranks_older_unscored_suggestions(self):
+        def suggestions():
+            return sorted(SuggestedVote.objects.values_list(
+                'agenda_id', 'strategy', 'vote_id', 'score', 'rank'))
+        for i in range(NUM_SUGGESTED_VOTES):
+            Vote.objects.create(title='old vote %d' % i,
+                                time=datetime.datetime(2000, 1, i + 1))
+        new_vote = Vote.objects.create(
+            title='new vote',
+            time=datetime.datetime.now() + datetime.timedelta(days=1))
+        votes = self.agenda_3.get_suggested_votes_by_controversy(NUM_SUGGESTED_VOTES)
+        self.assertIn(new_vote.id, [v.id for v in votes])
+        incremental = suggestions()
+        SuggestedVote.objects.refresh()
+        self.assertEqual(suggestions(), incremental)
+
+    def test_mks_values_for_ranges(self):
+        next_year = datetime.datetime(datetime.date.today().year + 1, 1, 1)
+        mks_values = self.agenda_1.get_mks_values(
+            ranges=[[None, None], [next_year, None]])
+        self.assertEqual(mks_values[self.mk_1.id][0]['numvotes'], 2)
+        self.assertEqual(round(mks_values[self.mk_1.id][0]['score'], 2), -33.33)
+        self.assertEqual(mks_values[self.mk_1.id][1]['numvotes'], 0)
+        self.assertEqual(mks_values[self.mk_1.id][1]['score'], 0)
+
+    def test_party_scores(self):
+        scores = Agenda.objects.scores_for_parties([self.agenda_1, self.agenda_2],
+                                                   [self.party_1])
+        self.assertEqual(round(scores[self.agenda_1.id][self.party_1.id], 2), -33.33)
+        self.assertEqual(scores[self.agenda_2.id][self.party_1.id], 100.0)
+        self.assertEqual(self.agenda_2.party_score(self.party_1), 100.0)
+        selected = self.agenda_1.selected_instances(Party, top=1, bottom=0)
+        self.assertEqual(map(just_id, selected['top']), [self.party_1.id])
+
+    def test_shared_scores_follow_summary_changes(self):
+        scores = shared_scores()
+        self.assertEqual(scores.values(self.agenda_1.id, [self.mk_1.id])[self.mk_1.id].numvotes, 2)
+        self.agendavote_3.delete()
+        self.assertEqual(shared_scores().values(self.agenda_1.id, [self.mk_1.id])[self.mk_1.id].numvotes, 1)
+
+    # the test settings use a dummy cache, which never keeps generations
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'agenda_scores'}})
+    def test_shared_scores_reload_only_bumped_agendas(self):
+        shared_scores()
+        with self.assertNumQueries(0):
+            shared_scores()
+        self.agendavote_3.delete()
+        scores = shared_scores()
+        self.assertEqual(scores.values(self.agenda_1.id, [self.mk_1.id])[self.mk_1.id].numvotes, 1)
+
+    def _mk_summary(self, agenda, member):
+        summary = SummaryAgenda.objects.get(agenda=agenda, summary_type='MK',
+                                            mk=member)
+        return (summary.votes, summary.for_votes, summary.against_votes,
+                summary.score)
+
+    def test_summaries_follow_agenda_vote_changes(self):
+        self.assertEqual(self._mk_summary(self.agenda_1, self.mk_1),
+                         (2, 2, 0, -0.5))
+        self.agendavote_1.score = 1
+        self.agendavote_1.save()
+        self.assertEqual(self._mk_summary(self.agenda_1, self.mk_1),
+                         (2, 2, 0, 1.5))
+        self.agendavote_3.delete()
+        self.assertEqual(self._mk_summary(self.agenda_1, self.mk_1),
+                         (1, 1, 0, 1.0))
+        agenda_summary = SummaryAgenda.objects.get(agenda=self.agenda_1,
+                                                   summary_type='AG')
+        self.assertEqual((agenda_summary.votes, agenda_summary.score), (1, 1.0))
+
+    def test_deferred_agenda_votes_and_vote_actions_load_in_one_query(self):
+        for model in (AgendaVote, VoteAction):
+            with self.assertNumQueries(1):
+                list(model.objects.only('id'))
+
+    def test_summaries_follow_vote_action_changes(self):
+        self.voteaction_1.type = 'against'
+        self.voteaction_1.save()
+        self.assertEqual(self._mk_summary(self.agenda_1, self.mk_1),
+                         (2, 1, 1, 1.5))
+        self.voteaction_2.delete()
+        self.assertEqual(self._mk_summary(self.agenda_1, self.mk_1),
+                         (1, 0, 1, 1.0))
+        self.assertFalse(SummaryAgenda.objects.filter(agenda=self.agenda_2,
+                                                      summary_type='MK'))
+
+    # the test settings use a dummy cache, which never keeps generations
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'agenda_cache_keys'}})
+    def test_agenda_cache_keys_follow_agenda_changes(self):
+        agenda_1_key = generations.agenda_cache_key('agenda_%d_x',
+                                                    self.agenda_1.id)
+        agenda_2_key = generations.agenda_cache_key('agenda_%d_x',
+                                                    self.agenda_2.id)
+        all_key = generations.agendas_cache_key('agendas_x')
+        self.assertEqual(agenda_1_key, generations.agenda_cache_key(
+            'agenda_%d_x', self.agenda_1.id))
+        self.agendavote_1.score = 1
+        self.agendavote_1.save()
+        self.assertNotEqual(agenda_1_key, generations.agenda_cache_key(
+            'agenda_%d_x', self.agenda_1.id))
+        self.assertEqual(agenda_2_key, generations.agenda_cache_key(
+            'agenda_%d_x', self.agenda_2.id))
+        self.assertNotEqual(all_key,
+                            generations.agendas_cache_key('agendas_x'))
+        agenda_2_key = generations.agenda_cache_key('agenda_%d_x',
+                                                    self.agenda_2.id)
+        self.agenda_2.is_public = False
+        self.agenda_2.save()
+        self.assertNotEqual(agenda_2_key, generations.agenda_cache_key(
+            'agenda_%d_x', self.agenda_2.id))
+
+    def test_bounded_recompute_matches_incremental(self):
+        def summaries():
+            return sorted(SummaryAgenda.objects.values_list(
+                'agenda_id', 'summary_type', 'mk_id', 'votes', 'score'))
+        expected = summaries()
+        SummaryAgenda.objects.recompute(agenda_id=self.agenda_1.id,
+                                        since=self.vote_1.time)
+        self.assertEqual(summaries(), expected)
+
+    def test_export_agendas(self):
+        VoteAction.objects.create(vote=self.vote_1, member=self.mk_2,
+                                  type='against', party=self.party_1)
+        mk_columns = ['mk_1 %d' % self.mk_1.id, 'mk_2 %d' % self.mk_2.id]
+        data_root = tempfile.mkdtemp()
+        try:
+            with self.settings(DATA_ROOT=data_root):
+                for compress, filename, opener in (
+                        (False, 'agenda_%d.csv', open),
+                        (True, 'agenda_%d.csv.gz', gzip.open)):
+                    call_command('export_agendas', compress=compress,
+                                 chunk_size=1)
+                    for agenda in (self.agenda_1, self.agenda_2,
+                                   self.agenda_3):
+                        self.assertIn(filename % agenda.id,
+                                      os.listdir(data_root))
+                    f = opener(os.path.join(data_root,
+                                            filename % self.agenda_1.id), 'rb')
+                    try:
+                        rows = list(csv.reader(f))
+                    finally:
+                        f.close()
+                    header = rows[0]
+                    self.assertEqual(header[:5], ['Vote id', 'Vote title',
+                                                  'Vote time', 'Score',
+                                                  'Importance'])
+                    self.assertEqual(sorted(header[5:]), mk_columns)
+                    rows = [dict(zip(header, row)) for row in rows[1:]]
+                    self.assertEqual(
+                        [(row['Vote id'], row['Vote title'], row['Vote time'],
+                          float(row['Score']), float(row['Importance']),
+                          row[mk_columns[0]], row[mk_columns[1]])
+                         for row in rows],
+                        [(str(self.vote_1.id), 'vote 1',
+                          self.vote_1.time.isoformat(), -1.0, 1.0, '1', '-1'),
+                         (str(self.vote_2.id), 'vote 2',
+                          self.vote_2.time.isoformat(), 0.5, 1.0, '1', '0')])
+            self.assertFalse([name for name in os.listdir(data_root)
+                              if name.endswith('.tmp')])
+        finally:
+            shutil.rmtree(data_root)
+
     def tearDown(self):
         self.party_1.delete()
         self.mk_1.delete()
@@ -410,3 +618,16 @@ I have a deadline''')
         self.agenda_1.delete()
         self.agenda_2.delete()
         self.agenda_3.delete()
+
+
+class SummarySeriesTestCase(TestCase):
+    def test_range_totals(self):
+        series = SummarySeries()
+        series.append(201001, 1.0, 1, 1, 0)
+        series.append(201003, -0.5, 2, 1, 1)
+        series.append(201003, 0.5, 1, 1, 0)
+        series.append(201101, 2.0, 2, 2, 0)
+        self.assertEqual(series.totals(), (3.0, 6, 5, 1))
+        self.assertEqual(series.totals(201002, 201101), (0.0, 3, 2, 1))
+        self.assertEqual(series.totals(201003, None), (2.0, 5, 4, 1))
+        self.assertEqual(series.totals(None, 201001), (0, 0, 0, 0))
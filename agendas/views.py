@@ -8,19 +8,23 @@ from django.contrib.auth.models import User
 from django.template import RequestContext
 from django.db.models import Count
 from django.http import (HttpResponseRedirect, HttpResponseNotAllowed,
-                         HttpResponseForbidden)
+                         HttpResponseForbidden, Http404)
 from django.shortcuts import get_object_or_404, render_to_response
 from django.core.urlresolvers import reverse
 from django.core.cache import cache
+from django.core.paginator import Paginator, InvalidPage
+from django.conf import settings
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
 
 from hashnav import DetailView, ListView
 from mks.models import Member, Party
+from mks.memberships import memberships_version
 
 from forms import (EditAgendaForm, AddAgendaForm, VoteLinkingFormSet,
                    MeetingLinkingFormSet)
 from models import Agenda, AgendaVote, AgendaMeeting, AgendaBill
+from generations import agenda_cache_key, agendas_cache_key
 
 import queries
 
@@ -28,6 +32,8 @@ from auxiliary.mixins import GetMoreView
 
 logger = logging.getLogger("open-knesset.agendas.views")
 
+PARTY_VOTES_CACHE_TIME = 1800
+
 
 class AgendaListView(ListView):
     def get_queryset(self):
@@ -45,7 +51,11 @@ class AgendaListView(ListView):
         parties_lookup = {party.id: party.name for
                           party in Party.current_knesset.all()}
 
-        allAgendaPartyVotes = cache.get('AllAgendaPartyVotes')
+        # the party votes follow the members' current parties too, which
+        # don't bump the agenda generations, so they're kept for a short time
+        party_votes_cache_key = agendas_cache_key(
+            'AllAgendaPartyVotes_m%s' % memberships_version())
+        allAgendaPartyVotes = cache.get(party_votes_cache_key)
 
         if not allAgendaPartyVotes:
             # filtering for current knesset is done here
@@ -56,7 +66,8 @@ class AgendaListView(ListView):
                 allAgendaPartyVotes[agenda_id] = [
                     x for x in party_votes if x[0] in parties_lookup]
 
-            cache.set('AllAgendaPartyVotes', allAgendaPartyVotes, 1800)
+            cache.set(party_votes_cache_key, allAgendaPartyVotes,
+                      PARTY_VOTES_CACHE_TIME)
 
         if self.request.user.is_authenticated():
             p = self.request.user.profiles.get()
@@ -138,12 +149,14 @@ class AgendaDetailView(DetailView):
         context['agendaTopParties'] = map(itemgetter(0),
                                           sorted(allAgendaPartyVotes[agenda.id], key=itemgetter(1), reverse=True)[:20])
 
-        agenda_votes = cache.get('agenda_votes_%d' % agenda.id)
+        agenda_votes_cache_key = agenda_cache_key('agenda_votes_%d', agenda.id)
+        agenda_votes = cache.get(agenda_votes_cache_key)
 
         if not agenda_votes:
             agenda_votes = agenda.agendavotes.order_by(
                 '-vote__time').select_related('vote')
-            cache.set('agenda_votes_%d' % agenda.id, agenda_votes, 900)
+            cache.set(agenda_votes_cache_key, agenda_votes,
+                      settings.AGENDA_CACHE_TIME)
 
         try:
             total_votes = agenda_votes.count()
@@ -180,12 +193,14 @@ class AgendaVotesMoreView(GetMoreView):
 
     def get_queryset(self):
         agenda = get_object_or_404(Agenda, pk=self.kwargs['pk'])
-        agenda_votes = cache.get('agenda_votes_%d' % agenda.id)
+        agenda_votes_cache_key = agenda_cache_key('agenda_votes_%d', agenda.id)
+        agenda_votes = cache.get(agenda_votes_cache_key)
 
         if not agenda_votes:
             agenda_votes = agenda.agendavotes.order_by(
                 '-vote__time').select_related('vote')
-            cache.set('agenda_votes_%d' % agenda.id, agenda_votes, 900)
+            cache.set(agenda_votes_cache_key, agenda_votes,
+                      settings.AGENDA_CACHE_TIME)
         return agenda_votes
 
     def get_context_data(self, *args, **kwargs):
@@ -279,6 +294,7 @@ class AgendaBillDetailView(DetailView):
 class AgendaMkDetailView(DetailView):
     model = Agenda
     template_name = 'agendas/mk_agenda_detail.html'
+    paginate_votes_by = 50
 
     def get_context_data(self, *args, **kwargs):
         context = super(AgendaMkDetailView, self).get_context_data(*args, **kwargs)
@@ -298,7 +314,12 @@ class AgendaMkDetailView(DetailView):
             logger.error(
                 'Attribute error trying to generate title for agenda %d member %d' % (self.object_id, self.member_id))
 
-        related_mk_votes = agenda.related_mk_votes(member)
+        paginator = Paginator(agenda.related_mk_votes(member),
+                              self.paginate_votes_by)
+        try:
+            page = paginator.page(self.request.GET.get('page', 1))
+        except InvalidPage:
+            raise Http404('Invalid page')
 
         if self.request.user.is_authenticated():
             p = self.request.user.profiles.get()
@@ -307,7 +328,9 @@ class AgendaMkDetailView(DetailView):
             watched = False
 
         context.update({'watched_object': watched})
-        context.update({'related_votes': related_mk_votes})
+        context.update({'related_votes': page.object_list,
+                        'paginator': paginator,
+                        'page_obj': page})
 
         return context
 
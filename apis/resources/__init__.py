@@ -7,7 +7,7 @@ from mks.api import MemberResource, PartyResource, MemberBillsResource, MemberAg
 from video.api import VideoResource
 from links.api import LinkResource
 from laws.api import BillResource, LawResource, VoteResource, VoteActionResource
-from agendas.api import AgendaResource, AgendaTodoResource
+from agendas.api import AgendaResource, AgendaTodoResource, AgendaMemberVotesResource
 from committees.api import CommitteeResource, CommitteeMeetingResource, ProtocolPartResource
 from auxiliary.api import PostResource, TagResource
 from events.api import EventResource
@@ -29,6 +29,7 @@ v2_api.register(VoteActionResource())
 v2_api.register(LawResource())
 v2_api.register(AgendaResource())
 v2_api.register(AgendaTodoResource())
+v2_api.register(AgendaMemberVotesResource())
 v2_api.register(CommitteeResource())
 v2_api.register(CommitteeMeetingResource())
 v2_api.register(ProtocolPartResource())
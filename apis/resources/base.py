@@ -1,14 +1,20 @@
 import csv
+from urllib import urlencode
 
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from tastypie.cache import SimpleCache
+from tastypie.exceptions import BadRequest, ImmediateHttpResponse
+from tastypie.paginator import Paginator
 from tastypie.resources import ModelResource, Resource
 from tastypie.throttle import CacheThrottle
 from tastypie.serializers import Serializer
+from tastypie.utils.mime import build_content_type
 
 import ujson
 
+from hashnav.keyset import KeysetPaginator, InvalidCursor, keyset_ordering
+
 # are we using DummyCache ?
 _cache = getattr(settings, 'CACHES', {})
 _cache_default = _cache.get('default')
@@ -65,6 +71,39 @@ class IterJSONAndCSVSerializer(Serializer):
                 "utf-8", "replace") for key in item.keys()])
         return response
 
+    def iter_json(self, objects, meta):
+        """Yields a list response of objects (bundles) in json, an object at a
+        time"""
+        yield '{"meta": %s, "objects": [' % ujson.dumps(meta)
+        for i, obj in enumerate(objects):
+            yield (',' if i else '') + ujson.dumps(self.to_simple(obj, {}))
+        yield ']}'
+
+    def iter_csv(self, objects):
+        """Yields the csv of objects (bundles) a row at a time, with the same
+        columns as to_csv"""
+        buf = _EchoBuffer()
+        writer = csv.writer(buf, dialect='excel')
+        yield u'\ufeff'.encode('utf8')  # BOM for excel
+        keys = None
+        for obj in objects:
+            item = self.to_simple(obj, {})
+            if keys is None:
+                keys = item.keys()
+                yield writer.writerow([unicode(key).encode("utf-8", "replace") for key in keys])
+            yield writer.writerow([unicode(item[key]).encode("utf-8", "replace") for key in keys])
+
+
+class _EchoBuffer(object):
+    "A file for csv.writer that returns what's written instead of keeping it"
+
+    def write(self, value):
+        return value
+
+
+# the formats of the lists that are streamed when all the objects are asked for
+STREAMED_FORMATS = ('application/json', 'text/csv')
+
 
 class BaseNonModelResource(Resource):
 
@@ -77,6 +116,88 @@ class BaseNonModelResource(Resource):
             formats=['json', 'jsonp', 'csv'])
 
 
+def _with_pk_last(ordering):
+    """Adds the pk to an ordering by a single field, in the same direction"""
+    if len(ordering) != 1 or ordering[0].lstrip('-') in ('pk', 'id'):
+        return ordering
+    return [ordering[0], '-pk' if ordering[0].startswith('-') else 'pk']
+
+
+def keyset_objects(objects, options, fallback=True):
+    """Returns a queryset ordered so that it can be paged by cursor: by its
+    sort field and then by pk, or by pk alone when its ordering can't be used
+    for that. Returns None if objects isn't a queryset, and raises BadRequest
+    if the ``order_by`` requested in options can't be paged by cursor.
+
+    Without fallback, returns None instead of reordering or raising when the
+    ordering can't be paged by cursor."""
+    query = getattr(objects, 'query', None)
+    if query is None:
+        return None
+    if query.order_by:
+        ordering = list(query.order_by)
+    elif query.default_ordering:
+        ordering = list(objects.model._meta.ordering)
+    else:
+        ordering = []
+    ordered = objects.order_by(*_with_pk_last(ordering))
+    try:
+        keyset_ordering(ordered)
+    except ValueError:
+        if not fallback:
+            return None
+        if 'order_by' in options:
+            raise BadRequest("Can't page by cursor when ordering by '%s'." % ','.join(ordering))
+        ordered = objects.order_by('pk')
+    return ordered
+
+
+class CursorPaginator(Paginator):
+    """Pages through the objects after the ``after`` cursor of the request,
+    instead of by ``offset``, so that deep pages cost as much as the first
+    one. The objects should be ordered by keyset_objects.
+
+    There's no ``total_count``, and a ``limit`` of 0 or over ``max_limit``
+    gets ``max_limit`` objects.
+    """
+
+    def get_limit(self):
+        limit = super(CursorPaginator, self).get_limit()
+        max_limit = self.max_limit or getattr(settings, 'API_LIMIT_PER_PAGE', 20)
+        return min(limit or max_limit, max_limit)
+
+    def get_next_uri(self, limit, after):
+        if self.resource_uri is None:
+            return None
+        request_params = self.request_data.copy()
+        for key in ('limit', 'offset', 'after'):
+            request_params.pop(key, None)
+        request_params['limit'] = limit
+        request_params['after'] = after
+        try:
+            encoded_params = request_params.urlencode()
+        except AttributeError:
+            encoded_params = urlencode(request_params)
+        return '%s?%s' % (self.resource_uri, encoded_params)
+
+    def page(self):
+        limit = self.get_limit()
+        after = self.request_data.get('after') or None
+        try:
+            page = KeysetPaginator(self.objects, limit).page(after)
+        except InvalidCursor:
+            raise BadRequest("Invalid cursor '%s' provided." % after)
+        meta = {
+            'limit': limit,
+            'after': after,
+            'next': self.get_next_uri(limit, page.next_cursor) if page.has_next() else None,
+        }
+        return {
+            self.collection_name: page.object_list,
+            'meta': meta,
+        }
+
+
 class BaseResource(ModelResource):
 
     """Adds to Meta the following options:
@@ -88,6 +209,13 @@ class BaseResource(ModelResource):
     specified in ``list_fields``. e.g:
 
         GET /api/v2/some_resource/?extra_fields=img_url,number_of_children
+
+    Lists may be paged by cursor instead of offset, by passing ``after`` - empty
+    for the first page, and then the cursor in the ``next`` link of the
+    previous page. See CursorPaginator.
+
+    Other lists with ``limit=0`` in json or csv are streamed, fetching
+    ``max_limit`` objects at a time.
     """
 
     class Meta(BaseNonModelResource.Meta):
@@ -138,11 +266,24 @@ class BaseResource(ModelResource):
         objects = self.obj_get_list(bundle=base_bundle, **self.remove_api_resource_names(kwargs))
         sorted_objects = self.apply_sorting(objects, options=request.GET)
 
-        paginator = self._meta.paginator_class(request.GET, sorted_objects, resource_uri=self.get_resource_uri(), limit=self._meta.limit, max_limit=self._meta.max_limit, collection_name=self._meta.collection_name)
-        to_be_serialized = paginator.page()
-
         fields = self._get_list_fields(request)
 
+        if request.GET.get('limit') == '0' and 'after' not in request.GET and \
+                self.determine_format(request) in STREAMED_FORMATS:
+            self.log_throttled_access(request)
+            # tastypie replaces responses that aren't an HttpResponse
+            raise ImmediateHttpResponse(
+                response=self.get_streamed_list(request, sorted_objects, fields))
+
+        paginator_class = self._meta.paginator_class
+        if 'after' in request.GET:
+            keyset = keyset_objects(sorted_objects, request.GET)
+            if keyset is not None:
+                sorted_objects, paginator_class = keyset, CursorPaginator
+
+        paginator = paginator_class(request.GET, sorted_objects, resource_uri=self.get_resource_uri(), limit=self._meta.limit, max_limit=self._meta.max_limit, collection_name=self._meta.collection_name)
+        to_be_serialized = paginator.page()
+
         # Dehydrate the bundles in preparation for serialization.
         bundles = []
 
@@ -154,6 +295,49 @@ class BaseResource(ModelResource):
         to_be_serialized = self.alter_list_data_to_serialize(request, to_be_serialized)
         return self.create_response(request, to_be_serialized)
 
+    def _iter_objects(self, objects, options):
+        """Iterates over objects, a chunk of max_limit at a time by cursor
+        when they're a queryset ordered by something a cursor can follow"""
+        chunk_size = self._meta.max_limit or getattr(settings, 'API_LIMIT_PER_PAGE', 20)
+        keyset = keyset_objects(objects, options, fallback=False)
+        if keyset is None:
+            return objects.iterator() if hasattr(objects, 'iterator') else iter(objects)
+        return self._iter_keyset(KeysetPaginator(keyset, chunk_size))
+
+    def _iter_keyset(self, paginator):
+        cursor = None
+        while True:
+            page = paginator.page(cursor)
+            for obj in page.object_list:
+                yield obj
+            if not page.has_next():
+                return
+            cursor = page.next_cursor
+
+    def get_streamed_list(self, request, objects, fields):
+        """
+        Returns a streamed list of all the objects, serialized as they're
+        fetched, for ``limit=0`` requests.
+        """
+        desired_format = self.determine_format(request)
+        serializer = self._meta.serializer
+        bundles = (self.full_dehydrate(self.build_bundle(obj=obj, request=request), fields=fields)
+                   for obj in self._iter_objects(objects, request.GET))
+        if desired_format == 'text/csv':
+            content = serializer.iter_csv(bundles)
+        else:
+            # only the json meta has the count, which csv exports don't pay for
+            try:
+                count = objects.count()
+            except (AttributeError, TypeError):
+                count = len(objects)
+            meta = {'limit': 0, 'offset': 0, 'previous': None, 'next': None, 'total_count': count}
+            content = serializer.iter_json(bundles, meta)
+        response = StreamingHttpResponse(content, content_type=build_content_type(desired_format))
+        if desired_format == 'text/csv':
+            response['Content-Disposition'] = 'attachment; filename=data.csv'
+        return response
+
     def full_dehydrate(self, bundle, for_list=False, fields=None):
         """
         Given a bundle with an object instance, extract the information from it
@@ -0,0 +1,138 @@
+'''
+In-memory autocomplete, for the typeahead widgets of the members, bills and
+votes.
+
+Each Autocomplete keeps a process wide index of the normalized names or
+titles of its objects (see mks.name_index.normalize_name), with the positions
+of the texts that contain each character trigram. A query is matched against
+the texts of its rarest trigram only, and the matches are ranked - texts
+starting with the query first, then texts with a word starting with it, then
+the rest - keeping the order of the objects within each group. Recent results
+are kept per query.
+
+The index is rebuilt when it's reset by the listeners of its objects, which
+other processes notice through a version kept in the cache, and when it gets
+older than MAX_AGE, to catch changes made without signals (e.g. by updates).
+'''
+from array import array
+from collections import defaultdict, OrderedDict
+from threading import Lock
+
+from knesset.cache import VersionedSingleton, bump_version
+from mks.name_index import normalize_name
+
+AUTOCOMPLETE_VERSION_KEY = 'autocomplete_%s_version'
+
+MAX_AGE = 60 * 60
+# queries whose results are kept, per autocomplete
+RESULTS_CACHE_SIZE = 1000
+SUGGESTIONS_LIMIT = 30
+
+
+def _trigrams(text):
+    return set(text[i:i + 3] for i in xrange(len(text) - 2))
+
+
+class AutocompleteIndex(object):
+
+    def __init__(self, entries):
+        """entries is an iterable of (object id, texts, data), best first,
+        where data is what's suggested for the object"""
+        self.objects = []
+        self.data = {}
+        # normalized texts, each with a leading space to find word starts
+        self.texts = []
+        self.text_objects = array('i')
+        postings = defaultdict(lambda: array('i'))
+        for object_id, texts, data in entries:
+            number = len(self.objects)
+            self.objects.append((object_id, data))
+            self.data[object_id] = data
+            for normalized in set(filter(None, map(normalize_name, texts))):
+                position = len(self.texts)
+                self.texts.append(u' ' + normalized)
+                self.text_objects.append(number)
+                for gram in _trigrams(normalized):
+                    postings[gram].append(position)
+        self.postings = dict(postings)
+
+    def search(self, query, limit=SUGGESTIONS_LIMIT):
+        "Returns up to limit (object id, data) of the objects matching query"
+        query = normalize_name(query)
+        positions = xrange(len(self.texts))
+        if len(query) >= 3:
+            candidates = [self.postings.get(gram, ()) for gram in _trigrams(query)]
+            positions = min(candidates, key=len)
+        prefix = u' ' + query
+        ranks = {}
+        for position in positions:
+            text = self.texts[position]
+            if text.startswith(prefix):
+                rank = 0
+            elif prefix in text:
+                rank = 1
+            elif query in text:
+                rank = 2
+            else:
+                continue
+            number = self.text_objects[position]
+            ranks[number] = min(rank, ranks.get(number, rank))
+        numbers = sorted(ranks, key=lambda number: (ranks[number], number))
+        return [self.objects[number] for number in numbers[:limit]]
+
+
+_autocompletes = {}
+
+
+class Autocomplete(object):
+    """The process wide index of objects to suggest. entries is a function
+    returning the entries of the AutocompleteIndex"""
+
+    def __init__(self, name, entries, max_age=MAX_AGE):
+        self.name = name
+        self.entries = entries
+        self.version_key = AUTOCOMPLETE_VERSION_KEY % name
+        self._index = VersionedSingleton(self.version_key, self._build, max_age)
+        # the recent results of _results_index
+        self._results_index = None
+        self._results = OrderedDict()
+        self._lock = Lock()
+        _autocompletes[name] = self
+
+    def _build(self):
+        return AutocompleteIndex(self.entries())
+
+    def index(self):
+        "The index, rebuilt if it was reset or got too old"
+        return self._index.get()
+
+    def suggest(self, query, limit=SUGGESTIONS_LIMIT):
+        "Returns up to limit (object id, data) of the objects matching query"
+        index = self.index()
+        key = (normalize_name(query), limit)
+        with self._lock:
+            if index is not self._results_index:
+                self._results_index = index
+                self._results.clear()
+            elif key in self._results:
+                return self._results[key]
+        results = index.search(query, limit)
+        with self._lock:
+            if index is self._results_index:
+                self._results[key] = results
+                if len(self._results) > RESULTS_CACHE_SIZE:
+                    self._results.popitem(last=False)
+        return results
+
+    def reset(self):
+        self._index.reset()
+
+
+def reset_autocomplete(name):
+    """Make sure the named autocomplete is rebuilt, in this process and the
+    others"""
+    autocomplete = _autocompletes.get(name)
+    if autocomplete is not None:
+        autocomplete.reset()
+    else:
+        bump_version(AUTOCOMPLETE_VERSION_KEY % name)
@@ -8,6 +8,7 @@ from actstream.models import Action, Follow
 from annotatetext.models import Annotation
 from knesset.utils import disable_for_loaddata
 from mks.models import Member
+from mks.sections import bump_shared_generation
 from models import CommitteeMeeting, Topic
 
 cm_ct = None
@@ -55,6 +56,12 @@ def record_committee_presence(**kwargs):
             action.send(m, verb='attended', target=meeting, description='committee meeting', timestamp=meeting.date)
 m2m_changed.connect(record_committee_presence, sender=CommitteeMeeting.mks_attended.through)
 
+def bump_committees(sender, **kwargs):
+    "The member page shows the presence of the member in its committees"
+    bump_shared_generation('committees')
+post_save.connect(bump_committees, sender=CommitteeMeeting)
+m2m_changed.connect(bump_committees, sender=CommitteeMeeting.mks_attended.through)
+
 @disable_for_loaddata
 def handle_annotation_save(sender, created, instance, **kwargs):
     if created:
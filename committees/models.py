@@ -23,6 +23,7 @@ from events.models import Event
 from links.models import Link
 from plenum.create_protocol_parts import create_plenum_protocol_parts
 from mks.models import Knesset
+from mks.memberships import membership_index
 from lobbyists.models import LobbyistHistory, LobbyistCorporation
 from itertools import groupby
 from hebrew_numbers import gematria_to_int
@@ -424,9 +425,10 @@ class CommitteeMeeting(models.Model):
         try:
             with KnessetDataCommitteeMeetingProtocol.get_from_text(self.protocol_text) as protocol:
                 attended_mk_names = protocol.find_attending_members(mk_names)
+                memberships = membership_index()
                 for name in attended_mk_names:
                     i = mk_names.index(name)
-                    if not mks[i].party_at(self.date):  # not a member at time of this meeting?
+                    if not memberships.party_id_at(mks[i].id, self.date):  # not a member at time of this meeting?
                         continue  # then don't search for this MK.
                     self.mks_attended.add(mks[i])
         except Exception:
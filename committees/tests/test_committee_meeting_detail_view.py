@@ -183,6 +183,16 @@ I have a deadline''')
         self.assertEqual(res.status_code, 302)
         self._verify_mk_has_meeting(meeting, mk_1)
 
+    def test_post_adding_an_unknown_mk_is_a_form_error(self):
+        self.assertTrue(self.client.login(username='jacob', password='JKM'))
+        res = self.client.post(reverse('committee-meeting',
+                                       kwargs={'pk': self.meeting_1.id}),
+                               {'user_input_type': 'mk',
+                                'mk_name': 'no such member'})
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.context['mk_form'].errors)
+        self._verify_mk_has_meeting(self.meeting_1, self.mk_1)
+
     def test_post_adds_bill_to_committee_meeting(self):
         bill_1 = self.bill_1
         meeting = self.meeting_1
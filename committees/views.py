@@ -3,7 +3,6 @@ import json
 import re
 
 import colorsys
-import difflib
 import logging
 
 import tagging
@@ -32,6 +31,7 @@ from hashnav import method_decorator as hashnav_method_decorator
 from knesset.utils import clean_string
 from laws.models import Bill, PrivateProposal
 from links.models import Link
+from mks.forms import MemberNameForm
 from mks.models import Member
 from mks.utils import get_all_mk_names
 from mmm.models import Document
@@ -174,9 +174,9 @@ class MeetingDetailView(DetailView):
         user_input_type = request.POST.get('user_input_type')
 
         handler = self._resolve_handler_by_user_input_type(user_input_type=user_input_type)
-        handler(cm, request)
+        response = handler(cm, request)
 
-        return HttpResponseRedirect(".")
+        return response or HttpResponseRedirect(".")
 
     def _handle_protocol(self, cm, request):
         if not cm.protocol_text:  # don't override existing protocols
@@ -196,12 +196,17 @@ class MeetingDetailView(DetailView):
             'lobbyist_name'))
         cm.lobbyists_mentioned.add(l)
 
+    def _invalid_mk_form(self, cm, form):
+        self.object = cm
+        return self.render_to_response(self.get_context_data(object=cm,
+                                                             mk_form=form))
+
     def _handle_remove_mk(self, cm, request):
         if not request.POST.get('mk_id'):
-            mk_names = Member.objects.values_list('name', flat=True)
-            mk_name = difflib.get_close_matches(request.POST.get('mk_name_to_remove'),
-                                                mk_names)[0]
-            mk = Member.objects.get(name=mk_name)
+            form = MemberNameForm(request.POST, name_field='mk_name_to_remove')
+            if not form.is_valid():
+                return self._invalid_mk_form(cm, form)
+            mk = form.cleaned_data['member']
         else:
             mk = Member.objects.get(id=request.POST.get('mk_id'))
         cm.mks_attended.remove(mk)
@@ -214,10 +219,10 @@ class MeetingDetailView(DetailView):
 
     def _handle_add_mk(self, cm, request):
         if not request.POST.get('mk_id'):
-            mk_names = Member.objects.values_list('name', flat=True)
-            mk_name = difflib.get_close_matches(request.POST.get('mk_name'),
-                                                mk_names)[0]
-            mk = Member.objects.get(name=mk_name)
+            form = MemberNameForm(request.POST)
+            if not form.is_valid():
+                return self._invalid_mk_form(cm, form)
+            mk = form.cleaned_data['member']
         else:
             mk = Member.objects.get(id=request.POST.get('mk_id'))
         cm.mks_attended.add(mk)
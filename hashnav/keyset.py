@@ -0,0 +1,181 @@
+'''
+Keyset (cursor) pagination.
+
+Instead of skipping the rows of the previous pages with an OFFSET, each page
+starts after a cursor - the sort key of the last row of the previous page -
+so with an index on (sort field, id) deep pages cost as much as the first.
+
+The pages before a cursor are read the same way, in the reverse order.
+
+The queryset should be ordered by a field of its model and then by id, or by
+id alone. Rows whose sort field is NULL come last, ordered by id.
+'''
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models.fields import FieldDoesNotExist
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def keyset_ordering(queryset):
+    """Returns (sort field, id field) of the ordering of a queryset, as
+    ordering strings, with a sort field of None when it's ordered by id
+    alone. Raises ValueError if the queryset isn't ordered that way"""
+    opts = queryset.model._meta
+    if queryset.query.order_by:
+        ordering = list(queryset.query.order_by)
+    elif queryset.query.default_ordering:
+        ordering = list(opts.ordering)
+    else:
+        ordering = []
+    if not ordering or ordering[-1].lstrip('-') not in ('id', 'pk', opts.pk.name):
+        raise ValueError('%r is not ordered by id last' % ordering)
+    if len(ordering) == 1:
+        return None, ordering[0]
+    if len(ordering) > 2:
+        raise ValueError('%r has more than one sort field' % ordering)
+    try:
+        field = opts.get_field(ordering[0].lstrip('-'))
+    except FieldDoesNotExist:
+        raise ValueError('%s is not a field of %s' % (ordering[0], opts.object_name))
+    if field.rel:
+        raise ValueError('%s is a relation' % ordering[0])
+    return ordering[0], ordering[-1]
+
+
+def _reverse(ordering):
+    return ordering[1:] if ordering.startswith('-') else '-' + ordering
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class KeysetPage(object):
+    def __init__(self, object_list, cursor, next_cursor, previous_cursor=None):
+        self.object_list = object_list
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.cursor is not None
+
+
+class KeysetPaginator(object):
+    """Paginates a queryset by cursors. Unlike django's Paginator it never
+    counts the rows, so there are no page numbers - only the first page, the
+    next one and the previous one"""
+    keyset = True
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.sort, self.id_sort = sort, id_sort = keyset_ordering(queryset)
+        self.id_lookup = 'pk__lt' if id_sort.startswith('-') else 'pk__gt'
+        self.reverse_id_lookup = 'pk__gt' if id_sort.startswith('-') else 'pk__lt'
+        self.field = None
+        if sort is not None:
+            self.field = queryset.model._meta.get_field(sort.lstrip('-'))
+            self.lookup = self.field.name + ('__lt' if sort.startswith('-') else '__gt')
+            self.reverse_lookup = self.field.name + ('__gt' if sort.startswith('-') else '__lt')
+            self.nulls = self.queryset.filter(**{self.field.name + '__isnull': True}).order_by(id_sort)
+
+    def encode_cursor(self, obj):
+        key = [obj.pk]
+        if self.field is not None:
+            key.insert(0, _json_value(getattr(obj, self.field.attname)))
+        return base64.urlsafe_b64encode(json.dumps(key))
+
+    def decode_cursor(self, cursor):
+        "Returns the (sort value, id) in the cursor"
+        try:
+            key = json.loads(base64.urlsafe_b64decode(str(cursor)))
+            if self.field is None:
+                (pk,) = key
+                value = None
+            else:
+                value, pk = key
+                if value is not None:
+                    value = self.field.to_python(value)
+            return value, int(pk)
+        except (TypeError, ValueError, ValidationError, UnicodeEncodeError):
+            raise InvalidCursor(cursor)
+
+    def _after(self, cursor):
+        """Returns the querysets of the rows after the cursor - the rows with a
+        sort value, and then the rows without one"""
+        if cursor is None:
+            if self.field is None or not self.field.null:
+                return self.queryset, None
+            return self.queryset.filter(**{self.field.name + '__isnull': False}), self.nulls
+        value, pk = self.decode_cursor(cursor)
+        if self.field is None:
+            return self.queryset.filter(**{self.id_lookup: pk}), None
+        if value is None:
+            return self.nulls.filter(**{self.id_lookup: pk}), None
+        rows = self.queryset.filter(Q(**{self.lookup: value}) |
+                                    Q(**{self.field.name: value, self.id_lookup: pk}))
+        return rows, self.nulls if self.field.null else None
+
+    def _before(self, cursor):
+        """Returns the querysets of the rows before the cursor, nearest first -
+        the rows without a sort value, and then the rows with one"""
+        value, pk = self.decode_cursor(cursor)
+        if self.field is None:
+            return self.queryset.filter(**{self.reverse_id_lookup: pk}).order_by(
+                _reverse(self.id_sort)), None
+        reverse_order = (_reverse(self.sort), _reverse(self.id_sort))
+        if value is None:
+            return (self.nulls.filter(**{self.reverse_id_lookup: pk}).order_by(
+                        _reverse(self.id_sort)),
+                    self.queryset.filter(**{self.field.name + '__isnull': False}).order_by(
+                        *reverse_order))
+        rows = self.queryset.filter(Q(**{self.reverse_lookup: value}) |
+                                    Q(**{self.field.name: value,
+                                         self.reverse_id_lookup: pk}))
+        return rows.order_by(*reverse_order), None
+
+    def _rows(self, rows, more_rows):
+        "Returns up to per_page + 1 of rows, and then of more_rows"
+        object_list = list(rows[:self.per_page + 1])
+        if more_rows is not None and len(object_list) <= self.per_page:
+            object_list.extend(more_rows[:self.per_page + 1 - len(object_list)])
+        return object_list
+
+    def page(self, cursor=None, before=None):
+        """Returns the page after the cursor, or if before is given, the page
+        that ends before it"""
+        if before is not None:
+            object_list = self._rows(*self._before(before))
+            if len(object_list) <= self.per_page:
+                # there's no whole page before it, so that's the first page
+                return self.page()
+            start = self.encode_cursor(object_list[self.per_page])
+            object_list = object_list[self.per_page - 1::-1]
+            return KeysetPage(object_list, start,
+                              self.encode_cursor(object_list[-1]),
+                              self.encode_cursor(object_list[0]))
+        object_list = self._rows(*self._after(cursor))
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_cursor = self.encode_cursor(object_list[-1])
+        previous_cursor = None
+        if cursor is not None and object_list:
+            previous_cursor = self.encode_cursor(object_list[0])
+        return KeysetPage(object_list, cursor, next_cursor, previous_cursor)
@@ -3,6 +3,7 @@ from django.core.exceptions import ImproperlyConfigured
 from django.http import Http404
 from django.utils.encoding import smart_str
 from base import View
+from keyset import KeysetPaginator, InvalidCursor
 
 class ListView(View):
     """
@@ -17,6 +18,7 @@ class ListView(View):
             template_object_name = 'object',
             queryset = None,
             itemsset = None,
+            keyset = False,
         )
         super(ListView, self).__init__(**kwargs)
 
@@ -69,9 +71,13 @@ class ListView(View):
             self.page = None
             self.items = self.items
         else:
-            paginator = Paginator(self.items, paginate_by, allow_empty_first_page=allow_empty)
             # page_descriptor can be either a page number or 'last'
-            page_descriptor = getattr(self, 'page', self.request.GET.get('page', 1))
+            page_descriptor = getattr(self, 'page', self.request.GET.get('page'))
+            if page_descriptor is None:
+                if self.keyset and self.paginate_items_by_keyset(paginate_by):
+                    return
+                page_descriptor = 1
+            paginator = Paginator(self.items, paginate_by, allow_empty_first_page=allow_empty)
             try:
                 page_number = int(page_descriptor)
             except ValueError:
@@ -87,6 +93,28 @@ class ListView(View):
             except InvalidPage:
                 raise Http404('Invalid page (%s)' % page_number)
 
+    def paginate_items_by_keyset(self, paginate_by):
+        """
+        Paginate self.items from the cursor in the request - the page after
+        ``cursor`` or the one before ``before`` - instead of by page number. Returns ``False`` if the items can't be paginated by
+        keyset, that is if they aren't a queryset ordered by a field and id.
+        """
+        try:
+            paginator = KeysetPaginator(self.items, paginate_by)
+        except (AttributeError, ValueError):
+            return False
+        cursor = self.request.GET.get('cursor')
+        before = self.request.GET.get('before')
+        try:
+            self.page = paginator.page(cursor, before)
+        except InvalidCursor as e:
+            raise Http404('Invalid cursor (%s)' % e)
+        if not self.page.has_previous() and not self.page.object_list and not self.get_allow_empty():
+            raise Http404("Empty list and '%s.allow_empty' is False." % self.__class__.__name__)
+        self.paginator = paginator
+        self.items = self.page.object_list
+        return True
+
     def get_template_names(self, suffix='list'):
         """
         Return a list of template names to be used for the request. Must return
@@ -0,0 +1,86 @@
+'''
+Aho-Corasick keyword matching.
+
+A KeywordAutomaton is built once over many keywords, and then finds which of
+them appear in a text in a single pass over the text, instead of a
+text.find() per keyword.
+'''
+from collections import deque
+
+
+class KeywordAutomaton(object):
+    """Maps keywords to values, and finds the values of the keywords that
+    appear in texts.
+
+    Keywords are added with add(), and the automaton is compiled on the
+    first search after the last add. An empty keyword appears in every text,
+    like ''.find() would have it.
+    """
+
+    def __init__(self, keywords=()):
+        # the trie: the transitions, failure link and values of each state
+        self._goto = [{}]
+        self._fail = [0]
+        self._values = [[]]
+        self._compiled = False
+        for keyword, value in keywords:
+            self.add(keyword, value)
+
+    def __len__(self):
+        return len(self._goto)
+
+    def add(self, keyword, value):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._values.append([])
+            state = next_state
+        self._values[state].append(value)
+        self._compiled = False
+
+    def _compile(self):
+        """Sets the failure link of each state to the state of its longest
+        proper suffix in the trie, and adds the values found through the
+        failure links to each state's values"""
+        self._outputs = [list(values) for values in self._values]
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                if fail:  # the root's values were yielded once, up front
+                    self._outputs[next_state].extend(self._outputs[fail])
+        self._compiled = True
+
+    def finditer(self, text):
+        "Yields (end position, value) of each keyword occurrence in text"
+        if not self._compiled:
+            self._compile()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        for value in outputs[0]:
+            yield 0, value
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if state:
+                for value in outputs[state]:
+                    yield i + 1, value
+
+    def search(self, text):
+        "Returns the set of the values of the keywords that appear in text"
+        return set(value for _, value in self.finditer(text))
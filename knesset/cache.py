@@ -0,0 +1,83 @@
+'''
+The default cache, looked up when it's used.
+
+django.core.cache.cache is created once, when it's imported, so overriding
+the CACHES setting (e.g. with override_settings in the tests) doesn't change
+it. This cache is recreated from the setting when it changes.
+
+VersionedSingleton keeps an object built from the database for the whole
+process, until it's reset in any of the processes.
+'''
+import time
+from threading import Lock
+
+from django.core import cache as django_cache
+from django.test.signals import setting_changed
+
+_cache = django_cache.cache
+
+
+def current_cache():
+    "The default cache of the current CACHES setting"
+    global _cache
+    if _cache is None:
+        _cache = django_cache.get_cache(django_cache.DEFAULT_CACHE_ALIAS)
+    return _cache
+
+
+def reset_current_cache(setting, **kwargs):
+    global _cache
+    if setting == 'CACHES':
+        _cache = None
+setting_changed.connect(reset_current_cache)
+
+
+class CurrentCache(object):
+    "Forwards to current_cache(), for modules that import a cache object"
+
+    def __getattr__(self, name):
+        return getattr(current_cache(), name)
+
+
+cache = CurrentCache()
+
+
+def bump_version(version_key):
+    "Sets a new version in version_key, for the processes that check it"
+    cache.set(version_key, int(time.time() * 1000), None)
+
+
+class VersionedSingleton(object):
+    """A process wide object, made by build() when it's first needed. It's
+    made again after it's reset, in this process or another - which they
+    notice through the version kept in version_key - and when it's older
+    than max_age seconds, if given, to catch changes made without signals"""
+
+    def __init__(self, version_key, build, max_age=None):
+        self.version_key = version_key
+        self.build = build
+        self.max_age = max_age
+        self._object = None
+        self._version = None
+        self._built = 0
+        self._lock = Lock()
+
+    def get(self):
+        version = self.version()
+        with self._lock:
+            if (self._object is None or version != self._version or
+                    self.max_age is not None and
+                    time.time() - self._built > self.max_age):
+                self._object = self.build()
+                self._version = version
+                self._built = time.time()
+            return self._object
+
+    def reset(self):
+        with self._lock:
+            self._object = None
+        bump_version(self.version_key)
+
+    def version(self):
+        "The version of the object, which changes when it's reset"
+        return cache.get(self.version_key)
@@ -0,0 +1,32 @@
+'''
+Generation counters kept in the cache, for cache keys that embed them.
+
+Bumping a generation makes every key derived from it miss at once, without
+having to know which keys exist. See agendas.generations and mks.sections.
+'''
+import time
+
+from knesset.cache import cache
+
+# generations are recreated from the clock if evicted, so they never go back
+GENERATION_CACHE_TIME = 30 * 24 * 3600
+
+
+def _new_generation():
+    return int(time.time() * 1000)
+
+
+def get_generation(key):
+    generation = cache.get(key)
+    if generation is None:
+        generation = _new_generation()
+        if not cache.add(key, generation, GENERATION_CACHE_TIME):
+            generation = cache.get(key) or generation
+    return generation
+
+
+def bump_generation(key):
+    try:
+        cache.incr(key)
+    except ValueError:  # not in the cache
+        cache.set(key, _new_generation(), GENERATION_CACHE_TIME)
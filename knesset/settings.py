@@ -48,6 +48,12 @@ PROJECT_ROOT = os.path.abspath(os.path.join(
 
 DATA_ROOT = os.path.join(PROJECT_ROOT, 'data', '')
 
+# the members' ballots in all votes, see laws.ballots
+BALLOT_MATRIX_PATH = os.path.join(DATA_ROOT, 'ballots.bin')
+
+# what syncdata already looked for proposals in, see laws.proposal_matching
+PROPOSAL_MATCHING_STATE_PATH = os.path.join(DATA_ROOT, 'proposal_matching.json')
+
 # Absolute path to the directory that holds media.
 # Example: "/home/media/media.lawrence.com/"
 MEDIA_ROOT = os.path.join(PROJECT_ROOT, 'media', '')
@@ -259,6 +265,9 @@ CACHES = {
 
 LONG_CACHE_TIME = 18000  # 5 hours
 
+# agenda data is cached under versioned keys, see agendas.generations
+AGENDA_CACHE_TIME = 3 * 24 * 3600  # 3 days
+
 ANNOTATETEXT_FLAGS = (
     gettext('Statement'),
     gettext('Funny :-)'),
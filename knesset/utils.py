@@ -1,7 +1,8 @@
-from datetime import datetime
+from datetime import datetime, time
 import re
 from django.utils.translation import ugettext as _
 from django.db import models
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete
 from django.contrib.comments.views.comments import post_comment
 from django.http import HttpResponse
 from django.test import Client
@@ -13,6 +14,7 @@ from django.shortcuts import get_object_or_404
 import django.contrib.comments.views.moderation as moderation
 from django.utils.encoding import smart_str, smart_unicode
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from mailer import send_html_mail
 from actstream.models import Action
 
@@ -81,6 +83,7 @@ try:
 except ImportError:
     from django.utils.functional import wraps
 import inspect
+import sys
 
 def disable_for_loaddata(signal_handler):
     @wraps(signal_handler)
@@ -92,6 +95,90 @@ def disable_for_loaddata(signal_handler):
     return wrapper
 
 
+LOADDATA_COMMANDS = ('loaddata', 'sync_dev')
+
+
+def disable_for_raw_save(signal_handler):
+    """A cheaper disable_for_loaddata, for the signals of models the scrapers
+    save in bulk. Skips raw saves, which is how fixtures are loaded, and the
+    whole process when it runs one of the LOADDATA_COMMANDS, instead of
+    inspecting the stack on each call"""
+    loading = len(sys.argv) > 1 and sys.argv[1] in LOADDATA_COMMANDS
+
+    @wraps(signal_handler)
+    def wrapper(*args, **kwargs):
+        if loading or kwargs.get('raw'):
+            return
+        signal_handler(*args, **kwargs)
+    return wrapper
+
+
+# the value of a field that was deferred when its instance was loaded
+_DEFERRED = object()
+
+# model -> the tracked (field name, attribute name)
+_stored_fields = {}
+
+
+def _field_values(instance, fields):
+    return dict((name, instance.__dict__.get(attname, _DEFERRED))
+                for name, attname in fields)
+
+
+def track_stored_fields(model, *names):
+    """Keeps the fields of model's instances as they're stored before they're
+    saved or deleted in instance._stored, for the post_save and post_delete
+    listeners that act only on their changes. None for new instances and raw
+    saves.
+
+    The values are taken when an instance is loaded and after it's saved, so
+    it costs no query, except for the fields that were deferred when it was
+    loaded, which are read when it's saved or deleted."""
+    if model in _stored_fields:
+        fields = _stored_fields[model]
+        fields.extend((name, model._meta.get_field(name).attname)
+                      for name in names if name not in dict(fields))
+        return
+    fields = _stored_fields[model] = [(name, model._meta.get_field(name).attname)
+                                      for name in names]
+
+    def load(sender, instance, **kwargs):
+        instance._loaded = None
+        if instance.pk is not None:
+            instance._loaded = _field_values(instance, fields)
+
+    def resolve(sender, instance, raw=False, **kwargs):
+        instance._stored = None
+        if raw or instance.pk is None:
+            return
+        loaded = getattr(instance, '_loaded', None)
+        if loaded is None or instance._state.adding:
+            # e.g. made with the pk of an object that may exist
+            loaded = {}
+        stored = {}
+        deferred = []
+        for name, _ in fields:
+            value = loaded.get(name, _DEFERRED)
+            if value is _DEFERRED:
+                deferred.append(name)
+            else:
+                stored[name] = value
+        if deferred:
+            row = model.objects.filter(pk=instance.pk).values(*deferred).first()
+            if row is None:
+                return
+            stored.update(row)
+        instance._stored = stored
+
+    def saved(sender, instance, **kwargs):
+        instance._loaded = _field_values(instance, fields)
+
+    post_init.connect(load, sender=model, weak=False)
+    pre_save.connect(resolve, sender=model, weak=False)
+    pre_delete.connect(resolve, sender=model, weak=False)
+    post_save.connect(saved, sender=model, weak=False)
+
+
 class RequestFactory(Client):
     """
     Class that lets you create mock Request objects for use in testing.
@@ -142,3 +229,46 @@ def main_actions():
     return Action.objects.filter(verb__in=['comment-added','annotated'])\
                          .order_by('-timestamp')\
                          .prefetch_related('target')
+
+
+def sync_actor_stream(actor, actions):
+    """
+    Makes the activity stream of actor hold exactly the given actions,
+    (verb, target, timestamp, description) tuples.
+
+    Existing actions are matched by (verb, target, timestamp) and kept, with
+    their description updated if it changed, so their ids stay valid. Only
+    the actions that are no longer wanted are deleted, and the new ones are
+    bulk created. Returns (number created, number deleted).
+    """
+    wanted = {}
+    for verb, target, timestamp, description in actions:
+        if not isinstance(timestamp, datetime):
+            timestamp = datetime.combine(timestamp, time())
+        key = (unicode(verb), ContentType.objects.get_for_model(target).id,
+               unicode(target.pk), timestamp)
+        wanted[key] = None if description is None else unicode(description)
+
+    stale = []
+    for action in Action.objects.stream_for_actor(actor).values(
+            'id', 'verb', 'target_content_type', 'target_object_id',
+            'timestamp', 'description'):
+        key = (action['verb'], action['target_content_type'],
+               action['target_object_id'], action['timestamp'])
+        if key not in wanted:  # not wanted, or a duplicate
+            stale.append(action['id'])
+            continue
+        description = wanted.pop(key)
+        if action['description'] != description:
+            Action.objects.filter(id=action['id']).update(description=description)
+    if stale:
+        Action.objects.filter(id__in=stale).delete()
+
+    actor_ct = ContentType.objects.get_for_model(actor)
+    Action.objects.bulk_create([
+        Action(actor_content_type=actor_ct, actor_object_id=actor.pk,
+               verb=verb, target_content_type_id=target_ct_id,
+               target_object_id=target_id, timestamp=timestamp,
+               description=description)
+        for (verb, target_ct_id, target_id, timestamp), description in wanted.items()])
+    return len(wanted), len(stale)
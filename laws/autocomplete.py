@@ -0,0 +1,28 @@
+'''
+Autocomplete of the bills by their full titles and of the votes by their
+titles, the most recent first. See auxiliary.autocomplete
+'''
+from auxiliary.autocomplete import Autocomplete
+
+
+def vote_data(title, time):
+    "What's suggested for a vote, its title with its date"
+    return u'{0} - {1}'.format(time.date().strftime('%d/%m/%Y'), title)
+
+
+def bill_entries():
+    from laws.models import Bill
+
+    for bill_id, full_title in Bill.objects.values_list('id', 'full_title').iterator():
+        yield bill_id, [full_title], full_title
+
+
+def vote_entries():
+    from laws.models import Vote
+
+    for vote_id, title, time in Vote.objects.values_list('id', 'title', 'time').iterator():
+        yield vote_id, [title], vote_data(title, time)
+
+
+bill_autocomplete = Autocomplete('bills', bill_entries)
+vote_autocomplete = Autocomplete('votes', vote_entries)
@@ -0,0 +1,234 @@
+'''
+A compact store of how every member voted in every vote.
+
+The ballots are kept in a single file as a votes x members matrix of signed
+bytes, one row per vote, so that the whole voting history takes a few MB and
+can be memory mapped by every process that analyses it:
+
+    header   magic, version, number of members, number of votes
+    members  the member ids, in column order, as int32
+    rows     per vote: vote id (int32), vote time (int64 seconds), and a
+             ballot byte per member
+
+Rows are appended as votes are scraped and are not kept in time order,
+BallotMatrix keeps a time index over them.
+'''
+import calendar
+import datetime
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+from django.conf import settings
+
+from laws.models import Vote, VoteAction
+
+MAGIC = 'OKBALLOT'
+VERSION = 1
+HEADER = struct.Struct('<8sIII')
+ROW_HEADER = struct.Struct('<iq')
+
+NO_BALLOT = 0
+BALLOTS = {'for': 1, 'against': -1, 'abstain': 2, 'no-vote': 3}
+
+# votes whose vote actions are read from the db at once
+CHUNK_SIZE = 500
+
+
+def _timestamp(dt):
+    if dt is None:
+        return 0
+    if not isinstance(dt, datetime.datetime):
+        dt = datetime.datetime(dt.year, dt.month, dt.day)
+    return calendar.timegm(dt.timetuple())
+
+
+def default_path():
+    return settings.BALLOT_MATRIX_PATH
+
+
+class BallotMatrix(object):
+    """Read access to a ballot matrix file.
+
+    Columns are the members in member_ids order, and ballots are NO_BALLOT
+    or one of the BALLOTS values.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        with open(self.path, 'rb') as f:
+            self.mtime = os.fstat(f.fileno()).st_mtime
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_members, n_votes = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('%s is not a ballot matrix' % self.path)
+
+        offset = HEADER.size
+        self.member_ids = list(array('i', self._map[offset:offset + 4 * n_members]))
+        self.member_index = dict((member_id, i)
+                                 for i, member_id in enumerate(self.member_ids))
+        self._rows_offset = offset + 4 * n_members
+        self._row_size = ROW_HEADER.size + n_members
+
+        self.vote_ids = []
+        self.vote_times = []
+        for row in xrange(n_votes):
+            vote_id, timestamp = ROW_HEADER.unpack_from(self._map, self._row_offset(row))
+            self.vote_ids.append(vote_id)
+            self.vote_times.append(timestamp)
+        self.vote_index = dict((vote_id, row)
+                               for row, vote_id in enumerate(self.vote_ids))
+        # the rows in time order, with their times to bisect
+        self._time_order = sorted(xrange(n_votes),
+                                  key=lambda row: (self.vote_times[row], self.vote_ids[row]))
+        self._sorted_times = [self.vote_times[row] for row in self._time_order]
+
+    def close(self):
+        self._map.close()
+
+    def __len__(self):
+        return len(self.vote_ids)
+
+    def _row_offset(self, row):
+        return self._rows_offset + row * self._row_size
+
+    def row(self, row):
+        "The ballots of the row-th vote, as an array of signed bytes"
+        start = self._row_offset(row) + ROW_HEADER.size
+        return array('b', self._map[start:start + len(self.member_ids)])
+
+    def vote_ballots(self, vote_id):
+        """Returns {member_id: ballot} of the members that took part in the
+        vote, or None if the vote isn't in the matrix"""
+        row = self.vote_index.get(vote_id)
+        if row is None:
+            return None
+        return dict((self.member_ids[i], ballot)
+                    for i, ballot in enumerate(self.row(row)) if ballot)
+
+    def ballot(self, vote_id, member_id):
+        row = self.vote_index.get(vote_id)
+        column = self.member_index.get(member_id)
+        if row is None or column is None:
+            return NO_BALLOT
+        return struct.unpack_from('b', self._map, self._row_offset(row) +
+                                  ROW_HEADER.size + column)[0]
+
+    def rows_between(self, start=None, end=None):
+        """The rows of the votes held in [start, end), in time order. start
+        and end are dates, datetimes or None"""
+        lo = bisect_left(self._sorted_times, _timestamp(start)) if start else 0
+        hi = bisect_left(self._sorted_times, _timestamp(end)) if end else len(self)
+        return self._time_order[lo:hi]
+
+    def votes_between(self, start=None, end=None):
+        return [self.vote_ids[row] for row in self.rows_between(start, end)]
+
+    def member_ballots(self, member_id, start=None, end=None):
+        """Returns [(vote_id, ballot)] of the member in the votes held in
+        [start, end), in time order, including the votes without a ballot
+        of the member"""
+        column = self.member_index.get(member_id)
+        rows = self.rows_between(start, end)
+        if column is None:
+            return [(self.vote_ids[row], NO_BALLOT) for row in rows]
+        offset = ROW_HEADER.size + column
+        return [(self.vote_ids[row],
+                 struct.unpack_from('b', self._map, self._row_offset(row) + offset)[0])
+                for row in rows]
+
+
+def _vote_rows(votes, member_index):
+    """Yields (vote_id, timestamp, ballots bytes) for the votes, reading
+    their vote actions a chunk at a time"""
+    for i in range(0, len(votes), CHUNK_SIZE):
+        chunk = votes[i:i + CHUNK_SIZE]
+        ballots = defaultdict(lambda: array('b', [NO_BALLOT]) * len(member_index))
+        for vote_id, member_id, vote_type in VoteAction.objects.filter(
+                vote__in=[vote_id for vote_id, _ in chunk]).values_list(
+                    'vote_id', 'member_id', 'type'):
+            ballots[vote_id][member_index[member_id]] = BALLOTS.get(vote_type, NO_BALLOT)
+        for vote_id, time in chunk:
+            yield vote_id, _timestamp(time), ballots[vote_id].tostring()
+
+
+def build_ballot_matrix(path=None):
+    """Writes the ballots of all the votes to a new matrix file, replacing
+    the file only once it is complete. Returns the number of votes"""
+    path = path or default_path()
+    member_ids = sorted(VoteAction.objects.values_list(
+        'member_id', flat=True).distinct())
+    member_index = dict((member_id, i) for i, member_id in enumerate(member_ids))
+    votes = list(Vote.objects.order_by('time', 'id').values_list('id', 'time'))
+
+    with open(path + '.tmp', 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(member_ids), len(votes)))
+        f.write(array('i', member_ids).tostring())
+        for vote_id, timestamp, ballots in _vote_rows(votes, member_index):
+            f.write(ROW_HEADER.pack(vote_id, timestamp))
+            f.write(ballots)
+    os.rename(path + '.tmp', path)
+    return len(votes)
+
+
+def update_ballot_matrix(votes, path=None):
+    """Writes the ballots of the given votes, replacing their rows or
+    appending new ones. The matrix is rebuilt if it doesn't exist yet, or
+    if one of the votes has a member that has no column"""
+    path = path or default_path()
+    votes = [(vote.id, vote.time) for vote in votes]
+    if not votes:
+        return
+    if not os.path.exists(path):
+        build_ballot_matrix(path)
+        return
+    matrix = BallotMatrix(path)
+    try:
+        member_index = matrix.member_index
+        vote_index = matrix.vote_index
+        n_votes = len(matrix)
+        rows_offset, row_size = matrix._rows_offset, matrix._row_size
+    finally:
+        matrix.close()
+    new_member_ids = set(VoteAction.objects.filter(
+        vote__in=[vote_id for vote_id, _ in votes]).values_list(
+            'member_id', flat=True)).difference(member_index)
+    if new_member_ids:
+        build_ballot_matrix(path)
+        return
+
+    with open(path, 'r+b') as f:
+        for vote_id, timestamp, ballots in _vote_rows(votes, member_index):
+            row = vote_index.get(vote_id)
+            if row is None:
+                row = vote_index[vote_id] = n_votes
+                n_votes += 1
+            f.seek(rows_offset + row * row_size)
+            f.write(ROW_HEADER.pack(vote_id, timestamp))
+            f.write(ballots)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, len(member_index), n_votes))
+
+
+_shared_matrix = None
+_shared_matrix_lock = Lock()
+
+
+def shared_ballot_matrix(path=None):
+    """The process wide BallotMatrix, reopened when the file changed.
+    Returns None if the matrix wasn't built yet"""
+    global _shared_matrix
+    path = path or default_path()
+    with _shared_matrix_lock:
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        if _shared_matrix is None or _shared_matrix.path != path or \
+                _shared_matrix.mtime != mtime:
+            _shared_matrix = BallotMatrix(path)
+        return _shared_matrix
@@ -0,0 +1,200 @@
+'''
+Batch computation of the bills' stages.
+
+A bill's stage follows from its votes, committee meetings and proposals.
+recompute_bill_stages loads these for a set of bills with a query per
+relation, runs Bill.update_stage's state machine over them in memory, and
+writes the stages that changed with bulk UPDATEs. BillStageQueue collects
+the bills a sync run touches, so each is recomputed once at its end.
+'''
+from collections import defaultdict
+import logging
+
+from django.db import transaction
+
+from laws.constants import FIRST_KNESSET_START
+from laws.enums import BillStages
+from laws.models import (Bill, PrivateProposal, KnessetProposal, GovProposal,
+                         CONVERT_TO_DISCUSSION_HEADERS)
+from mks.models import Member
+
+logger = logging.getLogger(__name__)
+
+# bills computed, and written, at once
+CHUNK_SIZE = 500
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def vote_outcome(vote):
+    "(date, passed) of a vote, or None"
+    if vote is None:
+        return None
+    return vote.time.date(), vote.for_votes_count > vote.against_votes_count
+
+
+class BillRelations(object):
+    "What the stage of a bill is computed from"
+
+    def __init__(self):
+        self.approval_vote = None  # (date, passed)
+        self.first_vote = None
+        self.second_committee_meetings = []  # dates
+        self.first_committee_meetings = []
+        self.pre_votes = []  # (date, title, passed), in the votes' order
+        self.proposals = []  # dates
+        self.knesset_proposal = None  # date
+        self.gov_proposal = None
+
+
+def load_relations(bill_ids):
+    "Returns {bill_id: BillRelations}, loading each relation in one query"
+    relations = defaultdict(BillRelations)
+    for bill_id in bill_ids:
+        relations[bill_id]
+
+    for field in ('approval_vote', 'first_vote'):
+        for bill_id, time, for_votes, against_votes in Bill.objects.filter(
+                id__in=bill_ids, **{field + '__isnull': False}).values_list(
+                    'id', field + '__time', field + '__for_votes_count',
+                    field + '__against_votes_count'):
+            setattr(relations[bill_id], field,
+                    (time.date(), for_votes > against_votes))
+
+    for field in ('first_committee_meetings', 'second_committee_meetings'):
+        for bill_id, date in getattr(Bill, field).through.objects.filter(
+                bill__in=bill_ids).values_list('bill_id', 'committeemeeting__date'):
+            getattr(relations[bill_id], field).append(date)
+
+    # in the order of bill.pre_votes.all(), which decides between votes of
+    # the same day
+    for bill_id, time, title, for_votes, against_votes in \
+            Bill.pre_votes.through.objects.filter(bill__in=bill_ids).order_by(
+                '-vote__time', '-vote__id').values_list(
+                    'bill_id', 'vote__time', 'vote__title',
+                    'vote__for_votes_count', 'vote__against_votes_count'):
+        relations[bill_id].pre_votes.append(
+            (time.date(), title, for_votes > against_votes))
+
+    for bill_id, date in PrivateProposal.objects.filter(
+            bill__in=bill_ids).values_list('bill_id', 'date'):
+        relations[bill_id].proposals.append(date)
+    for model, field in ((KnessetProposal, 'knesset_proposal'),
+                         (GovProposal, 'gov_proposal')):
+        for bill_id, date in model.objects.filter(
+                bill__in=bill_ids).values_list('bill_id', 'date'):
+            setattr(relations[bill_id], field, date)
+    return relations
+
+
+def compute_stage(stage, stage_date, relations, force_update=False):
+    """Runs the stage state machine of a bill.
+
+    Returns (stage, stage_date, complete), where complete is False when the
+    stage was decided by one of the votes or the committee corrections,
+    before the bill's proposals and pre votes were looked at.
+    """
+    if not stage_date or force_update:  # might be empty if bill is new
+        stage_date = FIRST_KNESSET_START
+    if relations.approval_vote:
+        date, passed = relations.approval_vote
+        return (BillStages.APPROVED if passed else BillStages.FAILED_APPROVAL,
+                date, False)
+    for date in relations.second_committee_meetings:
+        if not stage_date or stage_date < date:
+            stage = BillStages.COMMITTEE_CORRECTIONS
+            stage_date = date
+    if stage == BillStages.COMMITTEE_CORRECTIONS:
+        return stage, stage_date, False
+    if relations.first_vote:
+        date, passed = relations.first_vote
+        return (BillStages.FIRST_VOTE if passed else BillStages.FAILED_FIRST_VOTE,
+                date, False)
+    for date in (relations.knesset_proposal, relations.gov_proposal):
+        if date is not None and (not stage_date or stage_date < date):
+            stage = BillStages.IN_COMMITTEE
+            stage_date = date
+    for date in relations.first_committee_meetings:
+        if not stage_date or stage_date < date:
+            # if it was converted to discussion, seeing it in
+            # a cm doesn't mean much.
+            if stage != BillStages.CONVERTED_TO_DISCUSSION:
+                stage = BillStages.IN_COMMITTEE
+                stage_date = date
+    for date, title, passed in relations.pre_votes:
+        if not stage_date or stage_date < date:
+            if any(title.find(h) >= 0 for h in CONVERT_TO_DISCUSSION_HEADERS):
+                stage = BillStages.CONVERTED_TO_DISCUSSION
+                stage_date = date
+    for date, title, passed in relations.pre_votes:
+        if not stage_date or stage_date < date:
+            stage = BillStages.PRE_APPROVED if passed else BillStages.FAILED_PRE_APPROVAL
+            stage_date = date
+    for date in relations.proposals:
+        if not stage_date or stage_date < date:
+            stage = BillStages.PROPOSED
+            stage_date = date
+    return stage, stage_date, True
+
+
+def recompute_bill_stages(bill_ids, force_update=False):
+    """Recomputes the stages of the bills, and writes those that changed.
+
+    Like Bill.update_stage, the proposers' bill statistics are recalculated
+    and the activity stream is regenerated for bills whose stage was
+    computed from their proposals and pre votes. Returns the ids of the
+    bills whose stage changed.
+    """
+    changed = []
+    complete = []
+    for bill_ids_chunk in chunks(sorted(set(bill_ids)), CHUNK_SIZE):
+        relations = load_relations(bill_ids_chunk)
+        by_stage = defaultdict(list)
+        for bill_id, stage, stage_date in Bill.objects.filter(
+                id__in=bill_ids_chunk).values_list('id', 'stage', 'stage_date'):
+            new_stage, new_stage_date, bill_complete = compute_stage(
+                stage, stage_date, relations[bill_id], force_update)
+            if (new_stage, new_stage_date) != (stage, stage_date):
+                by_stage[(new_stage, new_stage_date)].append(bill_id)
+                changed.append(bill_id)
+            if bill_complete:
+                complete.append(bill_id)
+        with transaction.commit_on_success():
+            for (stage, stage_date), ids in by_stage.items():
+                Bill.objects.filter(id__in=ids).update(stage=stage,
+                                                       stage_date=stage_date)
+
+    if changed:
+        member_ids = set(Bill.proposers.through.objects.filter(
+            bill__in=changed).values_list('member_id', flat=True))
+        for member in Member.objects.filter(id__in=member_ids):
+            member.recalc_bill_statistics()
+    for bill_ids_chunk in chunks(complete, CHUNK_SIZE):
+        for bill in Bill.objects.filter(id__in=bill_ids_chunk):
+            bill.generate_activity_stream()
+    return changed
+
+
+class BillStageQueue(object):
+    "Collects the bills whose stage should be recomputed, to do it once"
+
+    def __init__(self):
+        self.bill_ids = set()
+
+    def request(self, bill):
+        self.bill_ids.add(bill.id)
+
+    def request_ids(self, bill_ids):
+        self.bill_ids.update(bill_ids)
+
+    def flush(self):
+        bill_ids, self.bill_ids = self.bill_ids, set()
+        if not bill_ids:
+            return []
+        changed = recompute_bill_stages(bill_ids)
+        logger.info('recomputed the stages of %d bills, %d changed' % (
+            len(bill_ids), len(changed)))
+        return changed
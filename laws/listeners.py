@@ -1,14 +1,18 @@
 #encoding: utf-8
-from django.db.models.signals import m2m_changed, post_save
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.contrib.contenttypes.models import ContentType
 from actstream import action
 from actstream.models import Action
 
-from knesset.utils import cannonize, disable_for_loaddata
+from knesset.utils import cannonize, disable_for_loaddata, disable_for_raw_save,\
+    track_stored_fields
 from mks.models import Member, Party
 from laws.models import PrivateProposal, VoteAction, MemberVotingStatistics,\
-    PartyVotingStatistics, CandidateListVotingStatistics
+    PartyVotingStatistics, CandidateListVotingStatistics, Bill, Vote,\
+    vote_action_counters
+from laws.autocomplete import bill_autocomplete, vote_autocomplete
 from polyorg.models import CandidateList
+from mks.sections import bump_member_generation
 
 def record_bill_proposal(**kwargs):
     if kwargs['action'] != "post_add":
@@ -39,6 +43,47 @@ def record_vote_action(sender, created, instance, **kwargs):
 post_save.connect(record_vote_action, sender=VoteAction, 
     dispatch_uid='vote_action_record_member' )
 
+# what a vote action was counted as by the voting statistics
+track_stored_fields(VoteAction, 'type', 'against_party', 'against_coalition',
+                    'against_opposition')
+
+
+def stored_counters(instance):
+    stored = getattr(instance, '_stored', None)
+    if stored is None:
+        return (0,) * 4
+    return vote_action_counters(stored['type'], stored['against_party'],
+                                stored['against_coalition'],
+                                stored['against_opposition'])
+
+@disable_for_raw_save
+def count_vote_action(sender, instance, **kwargs):
+    MemberVotingStatistics.objects.apply_vote_action(
+        instance.member_id, instance.vote.time, stored_counters(instance),
+        instance.voting_counters())
+post_save.connect(count_vote_action, sender=VoteAction)
+
+def uncount_vote_action(sender, instance, **kwargs):
+    MemberVotingStatistics.objects.apply_vote_action(
+        instance.member_id, instance.vote.time, stored_counters(instance),
+        (0,) * 4)
+post_delete.connect(uncount_vote_action, sender=VoteAction)
+
+@disable_for_raw_save
+def bump_member_votes(sender, instance, **kwargs):
+    "The member page shows the member's votes against the party etc."
+    bump_member_generation(instance.member_id, 'votes')
+post_save.connect(bump_member_votes, sender=VoteAction)
+post_delete.connect(bump_member_votes, sender=VoteAction)
+
+def move_member_party_statistics(sender, instance, created, **kwargs):
+    "The parties count the votes of their current members"
+    stored = getattr(instance, '_stored', None)
+    if stored is not None:
+        MemberVotingStatistics.objects.move_member_party(
+            instance.id, stored['current_party'], instance.current_party_id)
+post_save.connect(move_member_party_statistics, sender=Member)
+
 @disable_for_loaddata
 def handle_candiate_list_save(sender, created, instance, **kwargs):
     if instance._state.db=='default':
@@ -57,3 +102,26 @@ def handle_mk_save(sender, created, instance, **kwargs):
         MemberVotingStatistics.objects.get_or_create(member=instance)
 post_save.connect(handle_mk_save, sender=Member)
 
+
+# the autocompletes are rebuilt when what they suggest changes. The scrapers
+# save bills and votes often without changing their titles
+AUTOCOMPLETE_FIELDS = {
+    Bill: ('full_title',),
+    Vote: ('title', 'time'),
+}
+
+
+def reset_autocomplete(sender, instance, **kwargs):
+    stored = getattr(instance, '_stored', None)
+    if stored is None or any(stored[field] != getattr(instance, field)
+                             for field in AUTOCOMPLETE_FIELDS[sender]):
+        {Bill: bill_autocomplete, Vote: vote_autocomplete}[sender].reset()
+for autocomplete_model, fields in AUTOCOMPLETE_FIELDS.items():
+    track_stored_fields(autocomplete_model, *fields)
+    post_save.connect(reset_autocomplete, sender=autocomplete_model)
+
+
+def reset_deleted_autocomplete(sender, instance, **kwargs):
+    {Bill: bill_autocomplete, Vote: vote_autocomplete}[sender].reset()
+post_delete.connect(reset_deleted_autocomplete, sender=Bill)
+post_delete.connect(reset_deleted_autocomplete, sender=Vote)
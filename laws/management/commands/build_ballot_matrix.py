@@ -0,0 +1,11 @@
+from django.core.management.base import NoArgsCommand
+
+from laws.ballots import build_ballot_matrix, default_path
+
+
+class Command(NoArgsCommand):
+    help = "Build the matrix of the members' ballots in all votes"
+
+    def handle_noargs(self, **options):
+        votes = build_ballot_matrix()
+        print('Wrote the ballots of %d votes to %s' % (votes, default_path()))
@@ -0,0 +1,10 @@
+from django.core.management.base import NoArgsCommand
+
+from laws.models import MemberVotingStatistics
+
+
+class Command(NoArgsCommand):
+    help = "Recount the voting statistics counters of the members and parties"
+
+    def handle_noargs(self, **options):
+        MemberVotingStatistics.objects.rebuild()
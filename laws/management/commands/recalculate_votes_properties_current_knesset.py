@@ -1,15 +1,28 @@
 from __future__ import print_function
 
-from django.core.management.base import BaseCommand
+from datetime import datetime
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 from optparse import make_option
 
+from agendas.models import SuggestedVote
 from laws.models import Vote
+from laws.vote_properties import VotePropertiesEngine
 from mks.models import Knesset
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _update_votes_worker(vote_ids):
+    # each worker process needs its own db connection
+    connection.close()
+    return VotePropertiesEngine().update_votes(
+        Vote.objects.filter(id__in=vote_ids))
+
+
 class Command(BaseCommand):
     help = "Recalculate vote properties for current knesset"
 
@@ -18,19 +31,64 @@ class Command(BaseCommand):
             '-n', action='store_true', dest="dryrun", default=False,
             help='Dry run, changes nothing in the db, just display results'
         ),
+        make_option(
+            '--since', dest='since', default=None,
+            help='Recalculate the votes since this date (YYYY-MM-DD) instead '
+                 'of since the start of the current knesset'
+        ),
+        make_option(
+            '--vote-ids', dest='vote_ids', default=None,
+            help='Recalculate only these votes, comma separated'
+        ),
+        make_option(
+            '--workers', dest='workers', type='int', default=1,
+            help='Split the votes between this many processes'
+        ),
     )
 
     def handle(self, *args, **options):
-
-        start_date = Knesset.objects.current_knesset().start_date
-
-        votes_to_update = Vote.objects.filter(time__gte=start_date)
-        logger.info('Found {0} votes to update since {1}'.format(votes_to_update.count(), start_date))
+        if options['vote_ids']:
+            try:
+                vote_ids = [int(x) for x in options['vote_ids'].split(',')]
+            except ValueError:
+                raise CommandError('--vote-ids should be comma separated ids')
+            votes_to_update = Vote.objects.filter(id__in=vote_ids)
+            logger.info('Found {0} votes to update'.format(votes_to_update.count()))
+        else:
+            if options['since']:
+                try:
+                    start_date = datetime.strptime(options['since'], '%Y-%m-%d')
+                except ValueError:
+                    raise CommandError('--since should be given as YYYY-MM-DD')
+            else:
+                start_date = Knesset.objects.current_knesset().start_date
+            votes_to_update = Vote.objects.filter(time__gte=start_date)
+            logger.info('Found {0} votes to update since {1}'.format(votes_to_update.count(), start_date))
         if options['dryrun']:
             logger.info("Not updating the db, dry run was specified")
             return
 
-        for vote in votes_to_update:
+        workers = max(1, options['workers'])
+        if workers == 1:
+            changed, failed = VotePropertiesEngine().update_votes(votes_to_update)
+        else:
+            vote_ids = list(votes_to_update.order_by('id').values_list('id', flat=True))
+            # don't share this connection with the forked workers
+            connection.close()
+            pool = Pool(workers)
+            try:
+                results = pool.map(_update_votes_worker,
+                                   [vote_ids[i::workers] for i in range(workers)])
+            finally:
+                pool.close()
+                pool.join()
+            changed = [vote_id for c, f in results for vote_id in c]
+            failed = [vote_id for c, f in results for vote_id in f]
 
-            vote.update_vote_properties()
-            logger.info(u'Recalculated vote properties for {0}'.format(vote))
+        logger.info(u'Recalculated vote properties, {0} votes changed'.format(len(changed)))
+        if changed:
+            # the votes were bulk updated, without the save signals
+            SuggestedVote.objects.refresh(strategies=['controversy'])
+        if failed:
+            logger.error(u'Could not recalculate votes {0}'.format(
+                ', '.join(str(vote_id) for vote_id in failed)))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from optparse import make_option
+
+from laws.bill_stages import recompute_bill_stages
+from laws.models import Bill
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Recompute the stages of the bills"
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--force', action='store_true', dest='force', default=False,
+            help='Assume the current stages are wrong, and recompute them '
+                 'from scratch'
+        ),
+        make_option(
+            '--bill-ids', dest='bill_ids', default=None,
+            help='Recompute only these bills, comma separated'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if options['bill_ids']:
+            try:
+                bill_ids = [int(x) for x in options['bill_ids'].split(',')]
+            except ValueError:
+                raise CommandError('--bill-ids should be comma separated ids')
+        else:
+            bill_ids = list(Bill.objects.values_list('id', flat=True))
+        changed = recompute_bill_stages(bill_ids, force_update=options['force'])
+        logger.info(u'Recomputed the stages of {0} bills, {1} changed'.format(
+            len(bill_ids), len(changed)))
@@ -2,6 +2,7 @@
 from knesset_data.dataservice.votes import Vote as DataserviceVote, VoteMember as DataserviceVoteMember
 from knesset_data.html_scrapers.votes import HtmlVote
 from laws.models import Vote, VoteAction
+from laws.ballots import update_ballot_matrix
 from simple.scrapers import hebrew_strftime
 from simple.scrapers.management import BaseKnessetDataserviceCollectionCommand
 from mks.models import Member
@@ -50,6 +51,27 @@ class Command(BaseKnessetDataserviceCollectionCommand):
 
     help = "Scrape votes data from the knesset"
 
+    def __init__(self, *args, **kwargs):
+        super(Command, self).__init__(*args, **kwargs)
+        # the ballot matrix is updated once with all the scraped votes, since
+        # each update reads the index of the whole matrix
+        self._scraped_votes = []
+
+    def _handle_noargs(self, **options):
+        try:
+            super(Command, self)._handle_noargs(**options)
+        finally:
+            self._update_ballot_matrix()
+
+    def _update_ballot_matrix(self):
+        votes, self._scraped_votes = self._scraped_votes, []
+        if not votes:
+            return
+        try:
+            update_ballot_matrix(votes)
+        except Exception, e:
+            self._log_warn(u'failed to update the ballot matrix with %s votes: %s' % (len(votes), e))
+
     def _update_or_create_vote(self, dataservice_vote, oknesset_vote=None):
         vote_kwargs = self._get_dataservice_model_kwargs(dataservice_vote)
         if oknesset_vote:
@@ -59,6 +81,7 @@ class Command(BaseKnessetDataserviceCollectionCommand):
             oknesset_vote = Vote.objects.create(**vote_kwargs)
         self._add_vote_actions(dataservice_vote, oknesset_vote)
         oknesset_vote.update_vote_properties()
+        self._scraped_votes.append(oknesset_vote)
         SyncdataCommand().find_synced_protocol(oknesset_vote)
         Link.objects.create(
                 title=u'ההצבעה באתר הכנסת',
@@ -108,6 +131,7 @@ class Command(BaseKnessetDataserviceCollectionCommand):
             VoteAction.objects.filter(vote=oknesset_vote).delete()
             Link.objects.filter(content_type=ContentType.objects.get_for_model(oknesset_vote), object_pk=oknesset_vote.id).delete()
             recreated_votes.append(self._update_or_create_vote(dataservice_vote, oknesset_vote))
+        self._update_ballot_matrix()
         return recreated_votes
 
     def _get_validate_header_row(self):
@@ -3,7 +3,7 @@ import re, logging, random, sys, traceback
 from datetime import date, timedelta
 
 from django.contrib.comments import Comment
-from django.db import models, IntegrityError
+from django.db import models, IntegrityError, transaction
 from django.contrib.contenttypes import generic
 from django import forms
 from django.utils.translation import ugettext_lazy as _
@@ -17,19 +17,18 @@ from tagging.models import Tag, TaggedItem
 from tagging.forms import TagField
 import voting
 from tagging.utils import get_tag
-from actstream import Action
 from actstream.models import Follow
 
-from laws import constants
 from laws.constants import FIRST_KNESSET_START
 from laws.enums import BillStages
 from mks.models import Party, Knesset
+from mks.memberships import membership_index
 from tagvotes.models import TagVote
-from knesset.utils import slugify_name
+from knesset.utils import slugify_name, sync_actor_stream
 from laws.vote_choices import (TYPE_CHOICES, BILL_STAGE_CHOICES,
                                BILL_AGRR_STAGES, BILL_STAGES)
 
-from ok_tag.models import add_tags_to_related_objects
+from ok_tag.models import bill_tag_propagation
 from django.db.models.signals import post_save
 
 logger = logging.getLogger("open-knesset.laws.models")
@@ -43,14 +42,44 @@ VOTE_ACTION_TYPE_CHOICES = (
 CONVERT_TO_DISCUSSION_HEADERS = ('להעביר את הנושא'.decode('utf8'), 'העברת הנושא'.decode('utf8'))
 
 
+VOTING_COUNTERS = ('total_votes', 'votes_against_party',
+                   'votes_against_coalition', 'votes_against_opposition')
+
+
+def vote_action_counters(vote_type, against_party, against_coalition,
+                         against_opposition):
+    "What a vote action adds to each of the VOTING_COUNTERS"
+    return (int(vote_type is not None and vote_type != 'no-vote'),
+            int(bool(against_party)), int(bool(against_coalition)),
+            int(bool(against_opposition)))
+
+
+class VotingCounters(models.Model):
+    """Materialized counts of vote actions, kept up to date by the VoteAction
+    listeners and the vote properties engine, and rebuilt by the
+    rebuild_voting_statistics command"""
+    total_votes = models.IntegerField(default=0)
+    votes_against_party = models.IntegerField(default=0)
+    votes_against_coalition = models.IntegerField(default=0)
+    votes_against_opposition = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
 class CandidateListVotingStatistics(models.Model):
     candidates_list = models.OneToOneField('polyorg.CandidateList', related_name='voting_statistics')
 
+    def _members_counter(self, counter):
+        return MemberVotingStatistics.objects.filter(
+            member__id__in=self.candidates_list.member_ids).aggregate(
+                count=models.Sum(counter))['count'] or 0
+
     def votes_against_party_count(self):
-        return VoteAction.objects.filter(member__id__in=self.candidates_list.member_ids, against_party=True).count()
+        return self._members_counter('votes_against_party')
 
     def votes_count(self):
-        return VoteAction.objects.filter(member__id__in=self.candidates_list.member_ids).exclude(type='no-vote').count()
+        return self._members_counter('total_votes')
 
     def votes_per_seat(self):
         return round(float(self.votes_count()) / len(self.candidates_list.member_ids))
@@ -63,21 +92,16 @@ class CandidateListVotingStatistics(models.Model):
         return _('N/A')
 
 
-class PartyVotingStatistics(models.Model):
+class PartyVotingStatistics(VotingCounters):
+    """The counters are of the votes of the party's current members in the
+    current knesset"""
     party = models.OneToOneField('mks.Party', related_name='voting_statistics')
 
     def votes_against_party_count(self):
-        d = Knesset.objects.current_knesset().start_date
-        return VoteAction.objects.filter(
-            vote__time__gt=d,
-            member__current_party=self.party,
-            against_party=True).count()
+        return self.votes_against_party
 
     def votes_count(self):
-        d = Knesset.objects.current_knesset().start_date
-        return VoteAction.objects.filter(
-            member__current_party=self.party,
-            vote__time__gt=d).exclude(type='no-vote').count()
+        return self.total_votes
 
     def votes_per_seat(self):
         return round(float(self.votes_count()) / self.party.number_of_seats, 1)
@@ -92,19 +116,12 @@ class PartyVotingStatistics(models.Model):
 
     def coalition_discipline(self):  # if party is in opposition this actually
         # returns opposition_discipline
-        d = Knesset.objects.current_knesset().start_date
         total_votes = self.votes_count()
         if total_votes:
             if self.party.is_coalition:
-                votes_against_coalition = VoteAction.objects.filter(
-                    vote__time__gt=d,
-                    member__current_party=self.party,
-                    against_coalition=True).count()
+                votes_against_coalition = self.votes_against_coalition
             else:
-                votes_against_coalition = VoteAction.objects.filter(
-                    vote__time__gt=d,
-                    member__current_party=self.party,
-                    against_opposition=True).count()
+                votes_against_coalition = self.votes_against_opposition
             return round(100.0 * (total_votes - votes_against_coalition) /
                          total_votes, 1)
         return _('N/A')
@@ -113,23 +130,150 @@ class PartyVotingStatistics(models.Model):
         return "{}".format(self.party.name)
 
 
-class MemberVotingStatistics(models.Model):
+class MemberVotingStatisticsManager(models.Manager):
+
+    def apply_deltas(self, deltas):
+        """Adds {(member_id, vote date): VOTING_COUNTERS deltas} to the
+        counters of the members, of their knesset terms, and of their
+        current parties for votes in the current knesset"""
+        current_knesset = Knesset.objects.current_knesset()
+        member_deltas = {}
+        knesset_deltas = {}
+        for (member_id, date), delta in deltas.items():
+            knesset_id = Knesset.objects.knesset_at(date)
+            for key, totals in ((member_id, member_deltas),
+                                ((member_id, knesset_id), knesset_deltas)):
+                totals[key] = [a + b for a, b in zip(totals.get(key, (0,) * 4), delta)]
+
+        def updates(delta):
+            return dict((counter, models.F(counter) + d)
+                        for counter, d in zip(VOTING_COUNTERS, delta) if d)
+
+        for member_id, delta in member_deltas.items():
+            if any(delta):
+                self.filter(member=member_id).update(**updates(delta))
+        for (member_id, knesset_id), delta in knesset_deltas.items():
+            if not any(delta) or knesset_id is None:
+                continue
+            if not MemberKnessetVotingStatistics.objects.filter(
+                    member=member_id, knesset=knesset_id).update(**updates(delta)):
+                MemberKnessetVotingStatistics.objects.create(
+                    member_id=member_id, knesset_id=knesset_id,
+                    **dict(zip(VOTING_COUNTERS, delta)))
+            if current_knesset and knesset_id == current_knesset.number:
+                PartyVotingStatistics.objects.filter(
+                    party__members=member_id).update(**updates(delta))
+
+    def move_member_party(self, member_id, old_party_id, new_party_id):
+        """Moves the member's counters of the current knesset from the old
+        current party's counters to the new one's"""
+        current_knesset = Knesset.objects.current_knesset()
+        if current_knesset is None or old_party_id == new_party_id:
+            return
+        counts = MemberKnessetVotingStatistics.objects.filter(
+            member=member_id, knesset=current_knesset).values_list(*VOTING_COUNTERS).first()
+        if not counts or not any(counts):
+            return
+        for party_id, sign in ((old_party_id, -1), (new_party_id, 1)):
+            if party_id is not None:
+                PartyVotingStatistics.objects.filter(party=party_id).update(
+                    **dict((counter, models.F(counter) + sign * count)
+                           for counter, count in zip(VOTING_COUNTERS, counts) if count))
+
+    def apply_vote_action(self, member_id, date, old_counters, new_counters):
+        if old_counters != new_counters:
+            self.apply_deltas({(member_id, date): [
+                new - old for old, new in zip(old_counters, new_counters)]})
+
+    def _count_actions(self, actions):
+        "Returns {member_id: VOTING_COUNTERS} of a VoteAction queryset"
+        counts = {}
+        for i, (counter, filters) in enumerate((
+                ('total_votes', {}),
+                ('votes_against_party', {'against_party': True}),
+                ('votes_against_coalition', {'against_coalition': True}),
+                ('votes_against_opposition', {'against_opposition': True}))):
+            qs = actions.filter(**filters)
+            if counter == 'total_votes':
+                qs = qs.exclude(type='no-vote')
+            for row in qs.values('member_id').annotate(count=models.Count('id')):
+                counts.setdefault(row['member_id'], [0] * 4)[i] = row['count']
+        return counts
+
+    def rebuild(self):
+        """Recounts all the counters from the vote actions, with grouped
+        counts per knesset term"""
+        knessets = list(Knesset.objects.filter(
+            start_date__isnull=False).order_by('start_date'))
+        knesset_rows = []
+        for knesset, next_knesset in zip(knessets, knessets[1:] + [None]):
+            actions = VoteAction.objects.filter(vote__time__gte=knesset.start_date)
+            if next_knesset:
+                actions = actions.filter(vote__time__lt=next_knesset.start_date)
+            for member_id, counts in self._count_actions(actions).items():
+                knesset_rows.append(MemberKnessetVotingStatistics(
+                    member_id=member_id, knesset=knesset,
+                    **dict(zip(VOTING_COUNTERS, counts))))
+        member_counts = self._count_actions(VoteAction.objects.all())
+
+        with transaction.commit_on_success():
+            MemberKnessetVotingStatistics.objects.all().delete()
+            MemberKnessetVotingStatistics.objects.bulk_create(knesset_rows)
+            for statistics in self.all():
+                counts = member_counts.get(statistics.member_id, [0] * 4)
+                self.filter(id=statistics.id).update(
+                    **dict(zip(VOTING_COUNTERS, counts)))
+            self._rebuild_parties()
+
+    def _rebuild_parties(self):
+        party_counts = {}
+        current_knesset = Knesset.objects.current_knesset()
+        if current_knesset:
+            for row in MemberKnessetVotingStatistics.objects.filter(
+                    knesset=current_knesset,
+                    member__current_party__isnull=False).values(
+                        'member__current_party').annotate(
+                            *[models.Sum(counter) for counter in VOTING_COUNTERS]):
+                party_counts[row['member__current_party']] = [
+                    row[counter + '__sum'] for counter in VOTING_COUNTERS]
+        for statistics in PartyVotingStatistics.objects.all():
+            counts = party_counts.get(statistics.party_id, [0] * 4)
+            PartyVotingStatistics.objects.filter(id=statistics.id).update(
+                **dict(zip(VOTING_COUNTERS, counts)))
+
+
+class MemberVotingStatistics(VotingCounters):
+    """The counters are of all the member's votes, and the member's
+    knesset_voting_statistics of each knesset term"""
     member = models.OneToOneField('mks.Member', related_name='voting_statistics')
 
+    objects = MemberVotingStatisticsManager()
+
+    def _counters(self, from_date):
+        """The materialized counters of the votes since from_date, or None
+        if there are none for it"""
+        if not from_date:
+            return self
+        knesset = Knesset.objects.current_knesset()
+        if knesset and from_date == knesset.start_date:
+            try:
+                return self.member.knesset_voting_statistics.get(knesset=knesset)
+            except MemberKnessetVotingStatistics.DoesNotExist:
+                return MemberKnessetVotingStatistics(member=self.member, knesset=knesset)
+        return None
+
     def votes_against_party_count(self, from_date=None):
-        if from_date:
-            return VoteAction.objects.filter(member=self.member, against_party=True, vote__time__gt=from_date).count()
-        return VoteAction.objects.filter(member=self.member, against_party=True).count()
+        counters = self._counters(from_date)
+        if counters is not None:
+            return counters.votes_against_party
+        return VoteAction.objects.filter(member=self.member, against_party=True, vote__time__gt=from_date).count()
 
     def votes_count(self, from_date=None):
-        if from_date:
-            return VoteAction.objects.filter(member=self.member, vote__time__gt=from_date).exclude(
-                type='no-vote').count()
-        vc = cache.get('votes_count_%d' % self.member.id)
-        if not vc:
-            vc = VoteAction.objects.filter(member=self.member).exclude(type='no-vote').count()
-            cache.set('votes_count_%d' % self.member.id, vc, settings.LONG_CACHE_TIME)
-        return vc
+        counters = self._counters(from_date)
+        if counters is not None:
+            return counters.total_votes
+        return VoteAction.objects.filter(member=self.member, vote__time__gt=from_date).exclude(
+            type='no-vote').count()
 
     def average_votes_per_month(self):
         if hasattr(self, '_average_votes_per_month'):
@@ -150,19 +294,35 @@ class MemberVotingStatistics(models.Model):
         total_votes = self.votes_count(from_date)
         if total_votes <= 3:  # not enough data
             return None
-        if self.member.current_party.is_coalition:
-            v = VoteAction.objects.filter(member=self.member, against_coalition=True)
+        is_coalition = self.member.current_party.is_coalition
+        counters = self._counters(from_date)
+        if counters is not None:
+            votes_against_coalition = counters.votes_against_coalition if is_coalition \
+                else counters.votes_against_opposition
         else:
-            v = VoteAction.objects.filter(member=self.member, against_opposition=True)
-        if from_date:
-            v = v.filter(vote__time__gt=from_date)
-        votes_against_coalition = v.count()
+            if is_coalition:
+                v = VoteAction.objects.filter(member=self.member, against_coalition=True)
+            else:
+                v = VoteAction.objects.filter(member=self.member, against_opposition=True)
+            votes_against_coalition = v.filter(vote__time__gt=from_date).count()
         return round(100.0 * (total_votes - votes_against_coalition) / total_votes, 1)
 
     def __unicode__(self):
         return "{}".format(self.member.name)
 
 
+class MemberKnessetVotingStatistics(VotingCounters):
+    "The counters of a member's votes in one knesset term"
+    member = models.ForeignKey('mks.Member', related_name='knesset_voting_statistics')
+    knesset = models.ForeignKey('mks.Knesset', related_name='members_voting_statistics')
+
+    class Meta:
+        unique_together = ('member', 'knesset')
+
+    def __unicode__(self):
+        return u"{} {}".format(self.member.name, self.knesset.number)
+
+
 class VoteAction(models.Model):
     type = models.CharField(max_length=10, choices=VOTE_ACTION_TYPE_CHOICES)
     member = models.ForeignKey('mks.Member')
@@ -176,11 +336,15 @@ class VoteAction(models.Model):
     def __unicode__(self):
         return u"{} {} {}".format(self.member.name, self.type, self.vote.title)
 
+    def voting_counters(self):
+        return vote_action_counters(self.type, self.against_party,
+                                    self.against_coalition,
+                                    self.against_opposition)
+
     def save(self, **kwargs):
         if not self.party_id:
-            party = self.member.party_at(self.vote.time.date())
-            if party:
-                self.party_id = party.id
+            self.party_id = membership_index().party_id_at(
+                self.member_id, self.vote.time.date())
         super(VoteAction, self).save(**kwargs)
 
 
@@ -195,7 +359,7 @@ class VoteManager(models.Manager):
         qs = self.all()
         filter_kwargs = {}
         if kwargs.get('vtype') and kwargs['vtype'] != 'all':
-            filter_kwargs['title__startswith'] = self.VOTE_TYPES[kwargs['vtype']]
+            filter_kwargs['vote_type'] = kwargs['vtype']
 
         if filter_kwargs:
             qs = qs.filter(**filter_kwargs)
@@ -222,13 +386,15 @@ class VoteManager(models.Manager):
             qs = qs.exclude(id__in=AgendaVote.objects.filter(
                 agenda__in=exclude_agendas).values('vote__id'))
 
+        # every order ends with the id, so the lists can be paginated by keyset
+        # (see hashnav.keyset) on the matching index_together of Vote
         if 'order' in kwargs:
             if kwargs['order'] == 'controversy':
-                qs = qs.order_by('-controversy')
+                qs = qs.order_by('-controversy', '-id')
             if kwargs['order'] == 'against-party':
-                qs = qs.order_by('-against_party')
+                qs = qs.order_by('-against_party', '-id')
             if kwargs['order'] == 'votes':
-                qs = qs.order_by('-votes_count')
+                qs = qs.order_by('-votes_count', '-id')
 
         if kwargs.get('exclude_ascribed', False):  # exclude votes ascribed to
             # any bill.
@@ -272,10 +438,20 @@ class Vote(models.Model):
         ordering = ('-time', '-id')
         verbose_name = _('Vote')
         verbose_name_plural = _('Votes')
+        index_together = (('time', 'id'), ('vote_type', 'time', 'id'),
+                          ('controversy', 'id'), ('against_party', 'id'),
+                          ('votes_count', 'id'))
 
     def __unicode__(self):
         return "%s (%s)" % (self.title, self.time_string)
 
+    def save(self, **kwargs):
+        # the vote type is otherwise only set with the vote properties, and
+        # the vote lists filter by it
+        if not self.vote_type:
+            self.vote_type = self._vote_type()
+        super(Vote, self).save(**kwargs)
+
     @property
     def passed(self):
         return self.for_votes_count > self.against_votes_count
@@ -365,102 +541,13 @@ class Vote(models.Model):
         return tf
 
     def update_vote_properties(self):
-        # TODO: this can be heavily optimized. somewhere sometimes..
-        party_ids = Party.objects.values_list('id', flat=True)
-        d = self.time.date()
-        party_is_coalition = dict(zip(
-            party_ids,
-            [x.is_coalition_at(self.time.date())
-             for x in Party.objects.all()]
-        ))
-
-        def party_at_or_error(member, vote_date):
-            party = member.party_at(vote_date)
-            if party:
-                return party
-            else:
-                raise Exception(
-                    'could not find which party member %s belonged to during vote %s' % (member.pk, self.pk))
-
-        for_party_ids = [party_at_or_error(va.member, vote_date=d).id for va in self.for_votes()]
-        party_for_votes = [sum([x == party_id for x in for_party_ids]) for party_id in party_ids]
-
-        against_party_ids = [party_at_or_error(va.member, vote_date=d).id for va in self.against_votes()]
-        party_against_votes = [sum([x == party_id for x in against_party_ids]) for party_id in party_ids]
-
-        party_stands_for = [float(fv) > constants.STANDS_FOR_THRESHOLD * (fv + av) for (fv, av) in
-                            zip(party_for_votes, party_against_votes)]
-        party_stands_against = [float(av) > constants.STANDS_FOR_THRESHOLD * (fv + av) for (fv, av) in
-                                zip(party_for_votes, party_against_votes)]
-
-        party_stands_for = dict(zip(party_ids, party_stands_for))
-        party_stands_against = dict(zip(party_ids, party_stands_against))
-
-        coalition_for_votes = sum([x for (x, y) in zip(party_for_votes, party_ids) if party_is_coalition[y]])
-        coalition_against_votes = sum([x for (x, y) in zip(party_against_votes, party_ids) if party_is_coalition[y]])
-        opposition_for_votes = sum([x for (x, y) in zip(party_for_votes, party_ids) if not party_is_coalition[y]])
-        opposition_against_votes = sum(
-            [x for (x, y) in zip(party_against_votes, party_ids) if not party_is_coalition[y]])
-
-        coalition_total_votes = coalition_for_votes + coalition_against_votes
-        coalition_stands_for = (
-            float(coalition_for_votes) > constants.STANDS_FOR_THRESHOLD * (coalition_total_votes))
-        coalition_stands_against = float(coalition_against_votes) > constants.STANDS_FOR_THRESHOLD * (
-            coalition_total_votes)
-        opposition_total_votes = opposition_for_votes + opposition_against_votes
-        opposition_stands_for = float(opposition_for_votes) > constants.STANDS_FOR_THRESHOLD * opposition_total_votes
-        opposition_stands_against = float(
-            opposition_against_votes) > constants.STANDS_FOR_THRESHOLD * opposition_total_votes
-
-        # a set of all MKs that proposed bills this vote is about.
-        proposers = [set(b.proposers.all()) for b in self.bills()]
-        if proposers:
-            proposers = reduce(lambda x, y: set.union(x, y), proposers)
-
-        against_party_count = 0
-        against_coalition_count = 0
-        against_opposition_count = 0
-        against_own_bill_count = 0
-        for va in VoteAction.objects.filter(vote=self):
-            va.against_party = False
-            va.against_coalition = False
-            va.against_opposition = False
-            va.against_own_bill = False
-            voting_member_party_at_vote = party_at_or_error(va.member, vote_date=d)
-            vote_action_member_party_id = voting_member_party_at_vote.id
-            if party_stands_for[vote_action_member_party_id] and va.type == 'against':
-                va.against_party = True
-                against_party_count += 1
-            if party_stands_against[vote_action_member_party_id] and va.type == 'for':
-                va.against_party = True
-                against_party_count += 1
-            if voting_member_party_at_vote.is_coalition_at(self.time.date()):
-                if (coalition_stands_for and va.type == 'against') or (coalition_stands_against and va.type == 'for'):
-                    va.against_coalition = True
-                    against_coalition_count += 1
-            else:
-                if (opposition_stands_for and va.type == 'against') or (opposition_stands_against and va.type == 'for'):
-                    va.against_opposition = True
-                    against_opposition_count += 1
-
-            if va.member in proposers and va.type == 'against':
-                va.against_own_bill = True
-                against_own_bill_count += 1
-
-            va.save()
-
-        self.against_party = against_party_count
-        self.against_coalition = against_coalition_count
-        self.against_opposition = against_opposition_count
-        self.against_own_bill = against_own_bill_count
-        self.votes_count = VoteAction.objects.filter(vote=self).count()
-        self.for_votes_count = VoteAction.objects.filter(vote=self, type='for').count()
-        self.against_votes_count = VoteAction.objects.filter(vote=self, type='against').count()
-        self.abstain_votes_count = VoteAction.objects.filter(vote=self, type='abstain').count()
-        self.controversy = min(self.for_votes_count or 0,
-                               self.against_votes_count or 0)
-        self.vote_type = self._vote_type()
-        self.save()
+        """Computes the vote counts and which members voted against their
+        party, the coalition, the opposition or their own bill.
+
+        To update many votes use VotePropertiesEngine.update_votes.
+        """
+        from laws.vote_properties import VotePropertiesEngine
+        VotePropertiesEngine().update_vote(self)
 
     def redownload_votes_page(self):
         from simple.management.commands.syncdata import Command as SyncdataCommand
@@ -667,6 +754,7 @@ class Bill(models.Model):
 
     class Meta:
         ordering = ('-stage_date', '-id')
+        index_together = (('stage_date', 'id'),)
         verbose_name = _('Bill')
         verbose_name_plural = _('Bills')
 
@@ -781,7 +869,10 @@ class Bill(models.Model):
         another_bill.delete()
         self.update_stage()
 
-    def update_votes(self):
+    def update_votes(self, recompute_stage=True):
+        """Matches the votes of the bill's proposals to its approval, first
+        and pre votes. With recompute_stage=False the stage is left for the
+        caller to recompute, e.g. with a BillStageQueue"""
         used_votes = []  # ids of votes already assigned 'roles', so we won't match a vote in 2 places
         gp = GovProposal.objects.filter(bill=self)
         if gp:
@@ -811,7 +902,10 @@ class Bill(models.Model):
                 for this_v in pp.votes.all():
                     if this_v.id not in used_votes:
                         self.pre_votes.add(this_v)
-        self.update_stage()
+        if recompute_stage:
+            self.update_stage()
+        else:
+            self.save()
 
     def update_stage(self, force_update=False):
         """
@@ -820,76 +914,22 @@ class Bill(models.Model):
         recalculation. default is False, so we assume current status is OK,
         and only look for updates.
         """
-        if not self.stage_date or force_update:  # might be empty if bill is new
-            self.stage_date = FIRST_KNESSET_START
-        if self.approval_vote:
-            if self.approval_vote.for_votes_count > self.approval_vote.against_votes_count:
-                self.stage = BillStages.APPROVED
-            else:
-                self.stage = BillStages.FAILED_APPROVAL
-            self.stage_date = self.approval_vote.time.date()
-            self.save()
-            return
-        for cm in self.second_committee_meetings.all():
-            if not (self.stage_date) or self.stage_date < cm.date:
-                self.stage = BillStages.COMMITTEE_CORRECTIONS
-                self.stage_date = cm.date
-        if self.stage == BillStages.COMMITTEE_CORRECTIONS:
-            self.save()
-            return
-        if self.first_vote:
-            if self.first_vote.for_votes_count > self.first_vote.against_votes_count:
-                self.stage = BillStages.FIRST_VOTE
-            else:
-                self.stage = BillStages.FAILED_FIRST_VOTE
-            self.stage_date = self.first_vote.time.date()
-            self.save()
-            return
-        try:
-            kp = self.knesset_proposal
-            if not (self.stage_date) or self.stage_date < kp.date:
-                self.stage = BillStages.IN_COMMITTEE
-                self.stage_date = kp.date
-        except KnessetProposal.DoesNotExist:
-            pass
-        try:
-            gp = self.gov_proposal
-            if not (self.stage_date) or self.stage_date < gp.date:
-                self.stage = BillStages.IN_COMMITTEE
-                self.stage_date = gp.date
-        except GovProposal.DoesNotExist:
-            pass
-        for cm in self.first_committee_meetings.all():
-            if not (self.stage_date) or self.stage_date < cm.date:
-                # if it was converted to discussion, seeing it in
-                # a cm doesn't mean much.
-                if self.stage != BillStages.CONVERTED_TO_DISCUSSION:
-                    self.stage = BillStages.IN_COMMITTEE
-                    self.stage_date = cm.date
-        for v in self.pre_votes.all():
-            if not (self.stage_date) or self.stage_date < v.time.date():
-                for h in CONVERT_TO_DISCUSSION_HEADERS:
-                    if v.title.find(h) >= 0:
-                        self.stage = BillStages.CONVERTED_TO_DISCUSSION  # converted to discussion
-                        self.stage_date = v.time.date()
-        for v in self.pre_votes.all():
-            if not (self.stage_date) or self.stage_date < v.time.date():
-                if v.for_votes_count > v.against_votes_count:
-                    self.stage = BillStages.PRE_APPROVED
-                else:
-                    self.stage = BillStages.FAILED_PRE_APPROVAL
-                self.stage_date = v.time.date()
-        for pp in self.proposals.all():
-            if not (self.stage_date) or self.stage_date < pp.date:
-                self.stage = BillStages.PROPOSED
-                self.stage_date = pp.date
+        from laws.bill_stages import load_relations, compute_stage, vote_outcome
+
+        relations = load_relations([self.id])[self.id]
+        # the votes may have been set on this instance without saving it
+        relations.approval_vote = vote_outcome(self.approval_vote)
+        relations.first_vote = vote_outcome(self.first_vote)
+        self.stage, self.stage_date, complete = compute_stage(
+            self.stage, self.stage_date, relations, force_update)
         self.save()
-        self.generate_activity_stream()
+        if complete:
+            self.generate_activity_stream()
 
-    def generate_activity_stream(self):
-        ''' create an activity stream based on the data stored in self '''
-
-        Action.objects.stream_for_actor(self).delete()
+    def activity_stream_actions(self):
+        """Returns the (verb, target, timestamp, description) of the actions
+        the bill's activity stream should have"""
+        actions = []
         ps = list(self.proposals.all())
         try:
             ps.append(self.gov_proposal)
@@ -897,13 +937,11 @@ class Bill(models.Model):
             pass
 
         for p in ps:
-            action.send(self, verb='was-proposed', target=p,
-                        timestamp=p.date, description=p.title)
+            actions.append(('was-proposed', p, p.date, p.title))
 
         try:
             p = self.knesset_proposal
-            action.send(self, verb='was-knesset-proposed', target=p,
-                        timestamp=p.date, description=p.title)
+            actions.append(('was-knesset-proposed', p, p.date, p.title))
         except KnessetProposal.DoesNotExist:
             pass
 
@@ -913,31 +951,32 @@ class Bill(models.Model):
                 if v.title.find(h) >= 0:  # converted to discussion
                     discussion = True
             if discussion:
-                action.send(self, verb='was-converted-to-discussion', target=v,
-                            timestamp=v.time)
+                actions.append(('was-converted-to-discussion', v, v.time, None))
             else:
-                action.send(self, verb='was-pre-voted', target=v,
-                            timestamp=v.time, description=v.passed)
+                actions.append(('was-pre-voted', v, v.time, v.passed))
 
         if self.first_vote:
-            action.send(self, verb='was-first-voted', target=self.first_vote,
-                        timestamp=self.first_vote.time, description=self.first_vote.passed)
+            actions.append(('was-first-voted', self.first_vote,
+                            self.first_vote.time, self.first_vote.passed))
 
         if self.approval_vote:
-            action.send(self, verb='was-approval-voted', target=self.approval_vote,
-                        timestamp=self.approval_vote.time, description=self.approval_vote.passed)
+            actions.append(('was-approval-voted', self.approval_vote,
+                            self.approval_vote.time, self.approval_vote.passed))
 
-        for cm in self.first_committee_meetings.all():
-            action.send(self, verb='was-discussed-1', target=cm,
-                        timestamp=cm.date, description=cm.committee.name)
+        for cm in self.first_committee_meetings.select_related('committee'):
+            actions.append(('was-discussed-1', cm, cm.date, cm.committee.name))
 
-        for cm in self.second_committee_meetings.all():
-            action.send(self, verb='was-discussed-2', target=cm,
-                        timestamp=cm.date, description=cm.committee.name)
+        for cm in self.second_committee_meetings.select_related('committee'):
+            actions.append(('was-discussed-2', cm, cm.date, cm.committee.name))
 
         for g in self.gov_decisions.all():
-            action.send(self, verb='was-voted-on-gov', target=g,
-                        timestamp=g.date, description=str(g.stand))
+            actions.append(('was-voted-on-gov', g, g.date, str(g.stand)))
+        return actions
+
+    def generate_activity_stream(self):
+        """ update the activity stream based on the data stored in self,
+        adding and removing only the actions that changed """
+        sync_actor_stream(self, self.activity_stream_actions())
 
     @property
     def frozen(self):
@@ -967,8 +1006,9 @@ class Bill(models.Model):
 
 def add_tags_to_bill_related_objects(sender, instance, **kwargs):
     bill_ct = ContentType.objects.get_for_model(instance)
-    for ti in TaggedItem.objects.filter(content_type=bill_ct, object_id=instance.id):
-        add_tags_to_related_objects(sender, ti, **kwargs)
+    bill_tag_propagation.add(
+        (tag_id, instance.id) for tag_id in TaggedItem.objects.filter(
+            content_type=bill_ct, object_id=instance.id).values_list('tag', flat=True))
 
 
 post_save.connect(add_tags_to_bill_related_objects, sender=Bill)
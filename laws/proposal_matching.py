@@ -0,0 +1,196 @@
+# encoding: utf-8
+'''
+Finds the bill proposals mentioned in committee meeting protocols and votes.
+
+The canonical names (see knesset.utils.cannonize) of all the gov, knesset
+and private proposals are compiled into keyword automatons, so each protocol
+and vote title is scanned once for all of them. The links found are written
+with bulk inserts of the missing many to many rows.
+
+Incremental runs remember, in PROPOSAL_MATCHING_STATE_PATH, the last
+meeting, vote and proposals looked at: new meetings and votes are scanned
+for all the proposals, and the older ones only for the new proposals.
+'''
+import datetime
+import json
+import logging
+import os
+
+from django.conf import settings
+
+from committees.models import CommitteeMeeting
+from knesset.automaton import KeywordAutomaton
+from knesset.utils import cannonize
+from laws.models import Bill, Vote, GovProposal, KnessetProposal, PrivateProposal
+
+logger = logging.getLogger(__name__)
+
+PROPOSAL_MODELS = (('gov', GovProposal),
+                   ('knesset', KnessetProposal),
+                   ('private', PrivateProposal))
+
+# only look through cms of the last MEETINGS_DAYS days
+MEETINGS_DAYS = 60
+
+NEW_LAW_TITLE = 'חוק חדש'.decode('utf8')
+LAW_TITLE = 'חוק'
+
+
+def canonical_names(kind, model):
+    """Returns the proposals of model as dicts of id, bill and their two
+    canonical names, c1 and c2"""
+    names = []
+    for p in model.objects.values('id', 'bill', 'title', 'law__title'):
+        if kind == 'private' and p['title'] == NEW_LAW_TITLE:
+            p['c1'] = cannonize(p['law__title'])
+        else:
+            p['c1'] = cannonize(p['law__title'] + p['title'])
+        p['c2'] = cannonize(p['title'] + p['law__title'])
+        names.append(p)
+    return names
+
+
+class ProposalMatcher(object):
+    """Finds proposals in protocols, by either of their canonical names,
+    and in vote titles, by their first canonical name"""
+
+    def __init__(self, proposals):
+        "proposals - {kind: canonical_names of the proposals of that kind}"
+        self.protocols = KeywordAutomaton()
+        self.votes = KeywordAutomaton()
+        self.bills = {}
+        for kind, names in proposals.items():
+            for p in names:
+                self.protocols.add(p['c1'], (kind, p['id']))
+                self.protocols.add(p['c2'], (kind, p['id']))
+                self.votes.add(p['c1'], (kind, p['id']))
+                self.bills[(kind, p['id'])] = p['bill']
+
+    def __nonzero__(self):
+        return bool(self.bills)
+
+    def match_meetings(self, meetings):
+        "Returns (kind, proposal id, meeting id) of the proposals in meetings"
+        matches = set()
+        for meeting_id, protocol_text in meetings.values_list(
+                'id', 'protocol_text').iterator():
+            for kind, proposal_id in self.protocols.search(cannonize(protocol_text)):
+                matches.add((kind, proposal_id, meeting_id))
+        return matches
+
+    def match_votes(self, votes):
+        "Returns (kind, proposal id, vote id) of the proposals in votes"
+        matches = set()
+        for vote_id, title in votes.values_list('id', 'title').iterator():
+            for kind, proposal_id in self.votes.search(cannonize(title)):
+                matches.add((kind, proposal_id, vote_id))
+        return matches
+
+
+def add_m2m_links(model, field_name, pairs):
+    """Inserts the (object id, related id) pairs of a many to many field
+    that aren't linked yet, and returns them"""
+    pairs = set(pairs)
+    if not pairs:
+        return set()
+    field = model._meta.get_field(field_name)
+    through = field.rel.through
+    source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+    existing = set(through.objects.filter(**{
+        source + '__in': set(a for a, _ in pairs),
+        target + '__in': set(b for _, b in pairs)}).values_list(source, target))
+    new = pairs - existing
+    through.objects.bulk_create([through(**{source + '_id': a, target + '_id': b})
+                                 for a, b in new])
+    return new
+
+
+def link_meetings(matches, bills, bill_stages):
+    """Links the proposals found in meetings to them, and their bills too.
+    bills maps (kind, proposal id) to the proposal's bill id"""
+    for kind, model in PROPOSAL_MODELS:
+        new = add_m2m_links(model, 'committee_meetings',
+                            [(p, m) for k, p, m in matches if k == kind])
+        for proposal_id, meeting_id in new:
+            logger.debug('%s proposal %d found in cm %d' % (kind, proposal_id, meeting_id))
+        # private proposals are discussed before the first vote
+        bill_field = 'first_committee_meetings' if kind == 'private' \
+            else 'second_committee_meetings'
+        bill_pairs = set((bills[(kind, p)], m) for p, m in new if bills.get((kind, p)))
+        add_m2m_links(Bill, bill_field, bill_pairs)
+        bill_stages.request_ids(bill_id for bill_id, _ in bill_pairs)
+
+
+def link_votes(matches, bills, bill_stages):
+    """Links the proposals found in votes to them, and rematches the votes
+    of their bills"""
+    bill_ids = set()
+    for kind, model in PROPOSAL_MODELS:
+        new = add_m2m_links(model, 'votes',
+                            [(p, v) for k, p, v in matches if k == kind])
+        bill_ids.update(bills[(kind, p)] for p, _ in new if bills.get((kind, p)))
+    for bill in Bill.objects.filter(id__in=bill_ids):
+        bill.update_votes(recompute_stage=False)
+    bill_stages.request_ids(bill_ids)
+
+
+def load_state(path=None):
+    path = path or settings.PROPOSAL_MATCHING_STATE_PATH
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state, path=None):
+    path = path or settings.PROPOSAL_MATCHING_STATE_PATH
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.rename(path + '.tmp', path)
+
+
+def _max_id(qs):
+    return qs.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def find_proposals(bill_stages, incremental=False, state_path=None):
+    """Finds the proposals in the recent committee meetings and in the law
+    votes, links them, and requests the stages of their bills from the
+    bill_stages BillStageQueue. With incremental, only what wasn't looked at
+    by the last run is scanned"""
+    today = datetime.date.today()
+    meetings = CommitteeMeeting.objects.filter(
+        date__gt=today - datetime.timedelta(MEETINGS_DAYS),
+        committee__type='committee').exclude(protocol_text=None)
+    votes = Vote.objects.filter(title__contains=LAW_TITLE)
+    proposals = dict((kind, canonical_names(kind, model))
+                     for kind, model in PROPOSAL_MODELS)
+    new_state = {'meeting': _max_id(CommitteeMeeting.objects.all()),
+                 'vote': _max_id(Vote.objects.all()),
+                 'date': today.isoformat(),
+                 'proposals': dict((kind, max([p['id'] for p in names] or [0]))
+                                   for kind, names in proposals.items())}
+    matcher = ProposalMatcher(proposals)
+
+    state = load_state(state_path) if incremental else None
+    if state is None:
+        meeting_matches = matcher.match_meetings(meetings)
+        vote_matches = matcher.match_votes(votes)
+    else:
+        updated_meetings = meetings.filter(id__gt=state['meeting']) | meetings.filter(
+            protocol_text_update_date__gte=state['date'])
+        meeting_matches = matcher.match_meetings(updated_meetings)
+        vote_matches = matcher.match_votes(votes.filter(id__gt=state['vote']))
+        new_matcher = ProposalMatcher(dict(
+            (kind, [p for p in names if p['id'] > state['proposals'].get(kind, 0)])
+            for kind, names in proposals.items()))
+        if new_matcher:
+            meeting_matches.update(new_matcher.match_meetings(meetings.exclude(
+                id__in=updated_meetings.values_list('id', flat=True))))
+            vote_matches.update(new_matcher.match_votes(
+                votes.filter(id__lte=state['vote'])))
+
+    link_meetings(meeting_matches, matcher.bills, bill_stages)
+    link_votes(vote_matches, matcher.bills, bill_stages)
+    save_state(new_state, state_path)
+    return meeting_matches, vote_matches
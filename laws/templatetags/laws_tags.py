@@ -114,6 +114,17 @@ def selection(page_obj, paginator, request):
 @register.inclusion_tag('laws/_paginator.html')
 def pagination(page_obj, paginator, request):
     """ includes links to previous/next page, and other pages if needed """
+    if getattr(paginator, 'keyset', False):
+        # pages by cursor have no numbers, only the first, the previous and
+        # the next one
+        base_link = '&'.join(["%s=%s" % (k, v) for (k, v) in request.GET.items()
+                              if k not in ('page', 'cursor', 'before')])
+        first_link = "?%s" % base_link
+        if page_obj.previous_cursor:
+            previous_link = "?%s&before=%s" % (base_link, page_obj.previous_cursor)
+        if page_obj.has_next():
+            next_link = "?%s&cursor=%s" % (base_link, page_obj.next_cursor)
+        return locals()
     base_link = '&'.join(["%s=%s" % (k, v) for (k, v) in request.GET.items() if k != 'page'])
     if paginator.num_pages <= 10:
         show_pages = [[x, "?%s&page=%d" % (base_link, x), False] for x in range(1, paginator.num_pages + 1)]
@@ -143,6 +143,34 @@ class APIv2Test(TestCase):
         self.assertEqual(data['meta']['total_count'], 2)
         self.assertEqual(len(data['objects']), 2)
 
+    def test_vote_list_by_cursor(self):
+        uri = reverse('api_dispatch_list', kwargs={'resource_name': 'vote',
+                                                   'api_name': 'v2'})
+        res = self.client.get(uri, dict(after='', limit=1, format='json'))
+        self.assertEqual(res.status_code, 200)
+        data = json.loads(res.content)
+        self.assertNotIn('total_count', data['meta'])
+        self.assertEqual([v['resource_uri'] for v in data['objects']],
+                         ['%s%s/' % (uri, self.vote_2.id)])
+        res = self.client.get(data['meta']['next'])
+        data = json.loads(res.content)
+        self.assertEqual([v['resource_uri'] for v in data['objects']],
+                         ['%s%s/' % (uri, self.vote_1.id)])
+        self.assertIsNone(data['meta']['next'])
+
+        res = self.client.get(uri, dict(after='nonsense', format='json'))
+        self.assertEqual(res.status_code, 400)
+
+    def test_vote_list_streamed(self):
+        uri = reverse('api_dispatch_list', kwargs={'resource_name': 'vote',
+                                                   'api_name': 'v2'})
+        res = self.client.get(uri, dict(limit=0, format='json'))
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        data = json.loads(''.join(res.streaming_content))
+        self.assertEqual(data['meta']['total_count'], 2)
+        self.assertEqual(len(data['objects']), 2)
+
     def test_bill_list_for_proposer(self):
         uri = reverse('api_dispatch_list', kwargs={'resource_name': 'bill',
                                                    'api_name': 'v2'})
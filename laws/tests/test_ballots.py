@@ -0,0 +1,68 @@
+# encoding: utf-8
+#
+import os
+import shutil
+import tempfile
+from datetime import date, datetime
+
+from django.test import TestCase
+
+from laws.ballots import (BallotMatrix, build_ballot_matrix,
+                          update_ballot_matrix, NO_BALLOT, BALLOTS)
+from laws.models import Vote, VoteAction
+from mks.models import Member
+
+
+class BallotMatrixTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'ballots.bin')
+        self.mk_1 = Member.objects.create(name='mk 1')
+        self.mk_2 = Member.objects.create(name='mk 2')
+        self.vote_1 = Vote.objects.create(title='vote 1', time=datetime(2012, 1, 1))
+        self.vote_2 = Vote.objects.create(title='vote 2', time=datetime(2011, 1, 1))
+        VoteAction.objects.create(vote=self.vote_1, member=self.mk_1, type='for')
+        VoteAction.objects.create(vote=self.vote_1, member=self.mk_2, type='against')
+        VoteAction.objects.create(vote=self.vote_2, member=self.mk_1, type='abstain')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_build_and_read(self):
+        self.assertEqual(build_ballot_matrix(self.path), 2)
+        matrix = BallotMatrix(self.path)
+        self.assertEqual(matrix.vote_ballots(self.vote_1.id),
+                         {self.mk_1.id: BALLOTS['for'],
+                          self.mk_2.id: BALLOTS['against']})
+        self.assertEqual(matrix.ballot(self.vote_2.id, self.mk_2.id), NO_BALLOT)
+        self.assertEqual(matrix.votes_between(), [self.vote_2.id, self.vote_1.id])
+        self.assertEqual(matrix.votes_between(start=date(2011, 6, 1)),
+                         [self.vote_1.id])
+        self.assertEqual(matrix.member_ballots(self.mk_1.id, end=date(2011, 6, 1)),
+                         [(self.vote_2.id, BALLOTS['abstain'])])
+        matrix.close()
+
+    def test_update_appends_and_replaces_votes(self):
+        build_ballot_matrix(self.path)
+        vote_3 = Vote.objects.create(title='vote 3', time=datetime(2010, 1, 1))
+        VoteAction.objects.create(vote=vote_3, member=self.mk_2, type='for')
+        VoteAction.objects.filter(vote=self.vote_1, member=self.mk_1).update(type='against')
+        update_ballot_matrix([vote_3, self.vote_1], self.path)
+
+        matrix = BallotMatrix(self.path)
+        self.assertEqual(len(matrix), 3)
+        self.assertEqual(matrix.votes_between(),
+                         [vote_3.id, self.vote_2.id, self.vote_1.id])
+        self.assertEqual(matrix.ballot(vote_3.id, self.mk_2.id), BALLOTS['for'])
+        self.assertEqual(matrix.ballot(self.vote_1.id, self.mk_1.id), BALLOTS['against'])
+        matrix.close()
+
+    def test_update_rebuilds_for_new_members(self):
+        build_ballot_matrix(self.path)
+        mk_3 = Member.objects.create(name='mk 3')
+        VoteAction.objects.create(vote=self.vote_2, member=mk_3, type='for')
+        update_ballot_matrix([self.vote_2], self.path)
+
+        matrix = BallotMatrix(self.path)
+        self.assertEqual(matrix.ballot(self.vote_2.id, mk_3.id), BALLOTS['for'])
+        matrix.close()
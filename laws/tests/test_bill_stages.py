@@ -0,0 +1,64 @@
+# encoding: utf-8
+#
+from datetime import date, datetime
+
+from django.test import TestCase
+
+from committees.models import Committee, CommitteeMeeting
+from laws.bill_stages import recompute_bill_stages, BillStageQueue
+from laws.enums import BillStages
+from laws.models import Bill, Vote, PrivateProposal, KnessetProposal
+
+
+class BillStagesTest(TestCase):
+    def setUp(self):
+        self.committee = Committee.objects.create(name='c1')
+        self.proposed = Bill.objects.create(stage='1', title='proposed')
+        PrivateProposal.objects.create(bill=self.proposed, title='proposed',
+                                       date=date(2012, 1, 1))
+        self.pre_approved = Bill.objects.create(stage='1', title='pre approved')
+        PrivateProposal.objects.create(bill=self.pre_approved, title='pre approved',
+                                       date=date(2012, 1, 1))
+        self.pre_vote = Vote.objects.create(title='pre vote', time=datetime(2012, 2, 1),
+                                            for_votes_count=10, against_votes_count=2)
+        self.pre_approved.pre_votes.add(self.pre_vote)
+        self.in_committee = Bill.objects.create(stage='1', title='in committee')
+        KnessetProposal.objects.create(bill=self.in_committee, title='in committee',
+                                       date=date(2012, 3, 1))
+        meeting = CommitteeMeeting.objects.create(committee=self.committee,
+                                                  date=date(2012, 4, 1))
+        self.in_committee.first_committee_meetings.add(meeting)
+        self.approved = Bill.objects.create(stage='1', title='approved')
+        self.approved.approval_vote = Vote.objects.create(
+            title='approval', time=datetime(2012, 5, 1), for_votes_count=10)
+        self.approved.save()
+        self.bills = [self.proposed, self.pre_approved, self.in_committee,
+                      self.approved]
+
+    def stages(self):
+        return [(bill.stage, bill.stage_date)
+                for bill in Bill.objects.filter(id__in=[b.id for b in self.bills]).order_by('id')]
+
+    def test_recompute_matches_update_stage(self):
+        changed = recompute_bill_stages([bill.id for bill in self.bills])
+        self.assertEqual(sorted(changed), sorted(bill.id for bill in self.bills))
+        expected = [(BillStages.PROPOSED, date(2012, 1, 1)),
+                    (BillStages.PRE_APPROVED, date(2012, 2, 1)),
+                    (BillStages.IN_COMMITTEE, date(2012, 4, 1)),
+                    (BillStages.APPROVED, date(2012, 5, 1))]
+        self.assertEqual(self.stages(), expected)
+        self.assertEqual(recompute_bill_stages([bill.id for bill in self.bills]), [])
+
+        Bill.objects.update(stage='1', stage_date=None)
+        for bill in Bill.objects.all():
+            bill.update_stage()
+        self.assertEqual(self.stages(), expected)
+
+    def test_queue_coalesces_requests(self):
+        queue = BillStageQueue()
+        queue.request(self.pre_approved)
+        queue.request(self.pre_approved)
+        self.assertEqual(queue.flush(), [self.pre_approved.id])
+        self.assertEqual(queue.flush(), [])
+        self.assertEqual(Bill.objects.get(id=self.pre_approved.id).stage,
+                         BillStages.PRE_APPROVED)
@@ -32,6 +32,19 @@ class BillStreamTest(TestCase):
         s = Action.objects.stream_for_actor(self.bill)
         self.assertEqual(s.count(), 3)
 
+    def testRegenerateKeepsUnchangedActions(self):
+        self.bill.generate_activity_stream()
+        ids = set(Action.objects.stream_for_actor(self.bill).values_list('id', flat=True))
+        self.bill.generate_activity_stream()
+        self.assertEqual(set(Action.objects.stream_for_actor(self.bill).values_list('id', flat=True)), ids)
+
+        self.bill.pre_votes.remove(self.vote_1)
+        self.bill.generate_activity_stream()
+        s = Action.objects.stream_for_actor(self.bill)
+        self.assertEqual(s.count(), 2)
+        self.assertTrue(ids.issuperset(s.values_list('id', flat=True)))
+        self.assertFalse(s.filter(verb='was-pre-voted').exists())
+
     def tearDown(self):
         self.bill.pre_votes.all().delete()
         self.vote_1.delete()
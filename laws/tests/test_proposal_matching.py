@@ -0,0 +1,78 @@
+# encoding: utf-8
+#
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+
+from django.test import TestCase
+
+from committees.models import Committee, CommitteeMeeting
+from knesset.automaton import KeywordAutomaton
+from laws.bill_stages import BillStageQueue
+from laws.models import Bill, Law, Vote, PrivateProposal, KnessetProposal
+from laws.proposal_matching import find_proposals
+
+
+class KeywordAutomatonTest(TestCase):
+    def test_search(self):
+        automaton = KeywordAutomaton([('he', 1), ('she', 2), ('his', 3), ('hers', 4)])
+        self.assertEqual(automaton.search('ushers'), set([1, 2, 4]))
+        self.assertEqual(sorted(automaton.finditer('ushers')), [(4, 1), (4, 2), (6, 4)])
+        self.assertEqual(automaton.search('hi'), set())
+        automaton.add('', 5)
+        self.assertEqual(automaton.search('hi'), set([5]))
+        self.assertEqual(KeywordAutomaton().search('hi'), set())
+
+
+class ProposalMatchingTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.state_path = os.path.join(self.tmp_dir, 'state.json')
+        self.law = Law.objects.create(title=u'חוק הבדיקות')
+        self.bill = Bill.objects.create(stage='1', title=u'תיקון מס 1', law=self.law)
+        self.pp = PrivateProposal.objects.create(title=u'תיקון מס 1', law=self.law,
+                                                 bill=self.bill, date=date(2012, 1, 1))
+        self.committee = Committee.objects.create(name='c1')
+        self.meeting = CommitteeMeeting.objects.create(
+            committee=self.committee, date=date.today() - timedelta(1),
+            protocol_text=u'דיון בחוק הבדיקות (תיקון מס 1) ובנושאים אחרים')
+        self.vote = Vote.objects.create(
+            title=u'הצבעה על חוק הבדיקות (תיקון מס 1)', time=datetime(2012, 2, 1))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def find(self, incremental=False):
+        bill_stages = BillStageQueue()
+        matches = find_proposals(bill_stages, incremental=incremental,
+                                 state_path=self.state_path)
+        return matches, bill_stages.bill_ids
+
+    def test_full_scan(self):
+        (meeting_matches, vote_matches), bill_ids = self.find()
+        self.assertEqual(meeting_matches, set([('private', self.pp.id, self.meeting.id)]))
+        self.assertEqual(vote_matches, set([('private', self.pp.id, self.vote.id)]))
+        self.assertEqual(bill_ids, set([self.bill.id]))
+        self.assertEqual(list(self.pp.committee_meetings.all()), [self.meeting])
+        self.assertEqual(list(self.pp.votes.all()), [self.vote])
+        self.assertEqual(list(self.bill.first_committee_meetings.all()), [self.meeting])
+        self.assertEqual(list(self.bill.pre_votes.all()), [self.vote])
+
+        # the links already exist
+        self.assertEqual(self.find()[1], set())
+
+    def test_incremental_scan(self):
+        self.find(incremental=True)
+        (meeting_matches, vote_matches), _ = self.find(incremental=True)
+        self.assertEqual((meeting_matches, vote_matches), (set(), set()))
+
+        kp = KnessetProposal.objects.create(title=u'תיקון מס 1', law=self.law,
+                                            date=date(2012, 3, 1))
+        vote = Vote.objects.create(title=u'חוק הבדיקות (תיקון מס 1) - הסתייגות',
+                                   time=datetime(2012, 4, 1))
+        (meeting_matches, vote_matches), _ = self.find(incremental=True)
+        self.assertEqual(meeting_matches, set([('knesset', kp.id, self.meeting.id)]))
+        self.assertEqual(vote_matches, set([('knesset', kp.id, self.vote.id),
+                                            ('knesset', kp.id, vote.id),
+                                            ('private', self.pp.id, vote.id)]))
@@ -0,0 +1,67 @@
+# encoding: utf-8
+#
+from datetime import date, datetime
+
+from django.test import TestCase
+
+from laws.models import Vote, VoteAction, Bill
+from laws.vote_properties import VotePropertiesEngine
+from mks.models import (Knesset, Party, Member, Membership,
+                        CoalitionMembership)
+
+
+class VotePropertiesTest(TestCase):
+    def setUp(self):
+        self.knesset = Knesset.objects.create(number=1,
+                                              start_date=date(2010, 1, 1))
+        self.coalition = Party.objects.create(name='coalition', knesset=self.knesset)
+        self.opposition = Party.objects.create(name='opposition', knesset=self.knesset)
+        CoalitionMembership.objects.create(party=self.coalition,
+                                           start_date=date(2010, 1, 1))
+        self.mks = []
+        for i, party in enumerate([self.coalition] * 4 + [self.opposition] * 3):
+            mk = Member.objects.create(name='mk %d' % i, current_party=party)
+            Membership.objects.create(member=mk, party=party,
+                                      start_date=date(2010, 1, 1))
+            self.mks.append(mk)
+        self.vote = Vote.objects.create(title='vote 1',
+                                        time=datetime(2011, 1, 1))
+        self.bill = Bill.objects.create(stage='1', title='bill 1')
+        self.bill.proposers.add(self.mks[3])
+        self.bill.pre_votes.add(self.vote)
+        for mk, vote_type in zip(self.mks, ['for', 'for', 'for', 'against',
+                                            'against', 'against', 'abstain']):
+            VoteAction.objects.create(vote=self.vote, member=mk,
+                                      type=vote_type, party=mk.current_party)
+
+    def test_update_votes(self):
+        changed, failed = VotePropertiesEngine().update_votes(
+            Vote.objects.filter(id=self.vote.id))
+        self.assertEqual((changed, failed), ([self.vote.id], []))
+        vote = Vote.objects.get(id=self.vote.id)
+        self.assertEqual((vote.votes_count, vote.for_votes_count,
+                          vote.against_votes_count, vote.abstain_votes_count,
+                          vote.controversy), (7, 3, 3, 1, 3))
+        self.assertEqual((vote.against_party, vote.against_coalition,
+                          vote.against_opposition, vote.against_own_bill),
+                         (1, 1, 0, 1))
+        rebel = VoteAction.objects.get(vote=self.vote, member=self.mks[3])
+        self.assertTrue(rebel.against_party and rebel.against_coalition and
+                        rebel.against_own_bill)
+        self.assertFalse(rebel.against_opposition)
+
+        # nothing changed since
+        self.assertEqual(VotePropertiesEngine().update_votes(
+            Vote.objects.filter(id=self.vote.id)), ([], []))
+
+    def test_update_vote_properties_matches_batch(self):
+        self.vote.update_vote_properties()
+        self.assertEqual((self.vote.against_party, self.vote.controversy), (1, 3))
+        self.assertEqual(VotePropertiesEngine().update_votes(
+            Vote.objects.filter(id=self.vote.id)), ([], []))
+
+    def test_unknown_party_is_skipped(self):
+        Membership.objects.filter(member=self.mks[0]).delete()
+        changed, failed = VotePropertiesEngine().update_votes(
+            Vote.objects.filter(id=self.vote.id))
+        self.assertEqual((changed, failed), ([], [self.vote.id]))
@@ -2,6 +2,7 @@
 #
 
 
+import json
 import unittest
 from datetime import datetime
 
@@ -12,6 +13,8 @@ from django.core.urlresolvers import reverse
 from django.test import TestCase
 from tagging.models import Tag, TaggedItem
 
+from hashnav.keyset import KeysetPaginator
+from laws.autocomplete import bill_autocomplete, vote_autocomplete
 from laws.models import Vote, Bill
 
 just_id = lambda x: x.id
@@ -46,6 +49,40 @@ class VoteViewsTest(TestCase):
     def teardown(self):
         super(VoteViewsTest, self).tearDown()
 
+    def testAutoComplete(self):
+        def suggested(url, query):
+            res = self.client.get(url, {'query': query})
+            self.assertEqual(res.status_code, 200)
+            result = json.loads(res.content)
+            return zip(result['data'], result['suggestions'])
+
+        # the most recent first
+        self.assertEqual([v for v, _ in suggested('/vote/auto_complete/', 'vote')],
+                         [self.vote_2.id, self.vote_1.id])
+        self.assertEqual(suggested('/vote/auto_complete/', 'vote 1'),
+                         [(self.vote_1.id, '11/09/2001 - vote 1')])
+        self.vote_1.title = 'renamed'
+        self.vote_1.save()
+        self.assertEqual([v for v, _ in suggested('/vote/auto_complete/', 'vote')],
+                         [self.vote_2.id])
+        self.assertEqual(suggested('/bill/auto_complete/', 'ill 2'),
+                         [(self.bill_2.id, 'Bill 2')])
+
+    def testAutoCompleteKeptBySavesKeepingTheTitles(self):
+        vote_index, bill_index = vote_autocomplete.index(), bill_autocomplete.index()
+        self.vote_1.save()
+        self.bill_1.save()
+        self.assertIs(vote_autocomplete.index(), vote_index)
+        self.assertIs(bill_autocomplete.index(), bill_index)
+        self.bill_1.title = 'renamed'
+        self.bill_1.save()
+        self.assertIs(vote_autocomplete.index(), vote_index)
+        self.assertIsNot(bill_autocomplete.index(), bill_index)
+
+    def testDeferredVotesLoadInOneQuery(self):
+        with self.assertNumQueries(1):
+            list(Vote.objects.only('id', 'title'))
+
     def testVoteList(self):
         res = self.client.get(reverse('vote-list'))
         self.assertEqual(res.status_code, 200)
@@ -276,3 +313,64 @@ class VoteViewsTest(TestCase):
         self.vote_2.delete()
         self.tag_1.delete()
         self.ti.delete()
+
+
+class VoteKeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.votes = [Vote.objects.create(time=datetime(2012, 1, i + 1), title='vote %d' % i,
+                                          controversy=controversy)
+                      for i, controversy in enumerate([3, None, 5, 3, None])]
+
+    def walk(self, queryset, per_page=2):
+        paginator = KeysetPaginator(queryset, per_page)
+        ids, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            ids.extend(v.id for v in page.object_list)
+            if not page.has_next():
+                return ids
+            cursor = page.next_cursor
+
+    def test_walks_the_whole_order(self):
+        v = [vote.id for vote in self.votes]
+        self.assertEqual(self.walk(Vote.objects.filter_and_order(order='time')),
+                         [v[4], v[3], v[2], v[1], v[0]])
+        # votes without a controversy come last
+        self.assertEqual(self.walk(Vote.objects.filter_and_order(order='controversy')),
+                         [v[2], v[3], v[0], v[4], v[1]])
+
+    def test_walks_back_the_whole_order(self):
+        for order in ('time', 'controversy'):
+            paginator = KeysetPaginator(Vote.objects.filter_and_order(order=order), 2)
+            pages, page = [], paginator.page()
+            while True:
+                pages.append([v.id for v in page.object_list])
+                if not page.has_next():
+                    break
+                page = paginator.page(page.next_cursor)
+            back = []
+            while page.previous_cursor:
+                page = paginator.page(before=page.previous_cursor)
+                back.insert(0, [v.id for v in page.object_list])
+            self.assertEqual(back, pages[:-1])
+            self.assertFalse(page.has_previous())
+
+    def test_previous_link(self):
+        for i in range(20):
+            Vote.objects.create(time=datetime(2012, 2, i + 1), title='vote %d' % (i + 5))
+        res = self.client.get(reverse('vote-list'))
+        self.assertNotContains(res, 'before=')
+        res = self.client.get(reverse('vote-list'),
+                              {'cursor': res.context['page_obj'].next_cursor})
+        self.assertContains(res, 'before=%s' % res.context['page_obj'].previous_cursor)
+
+    def test_invalid_cursor(self):
+        res = self.client.get(reverse('vote-list'), {'cursor': 'nonsense'})
+        self.assertEqual(res.status_code, 404)
+        res = self.client.get(reverse('vote-list'), {'before': 'nonsense'})
+        self.assertEqual(res.status_code, 404)
+
+    def test_vote_type_filter(self):
+        vote = Vote.objects.create(time=datetime(2012, 2, 1), title=u'הסתייגות לחוק')
+        self.assertEqual(vote.vote_type, 'demurrer')
+        self.assertEqual(list(Vote.objects.filter_and_order(vtype='demurrer')), [vote])
@@ -0,0 +1,97 @@
+# encoding: utf-8
+#
+from datetime import date, datetime
+
+from django.test import TestCase
+
+from laws.models import (Vote, VoteAction, MemberVotingStatistics,
+                         MemberKnessetVotingStatistics)
+from laws.vote_properties import VotePropertiesEngine
+from mks.models import Knesset, Party, Member, Membership
+
+
+class VotingStatisticsTest(TestCase):
+    def setUp(self):
+        self.knesset_1 = Knesset.objects.create(number=1, start_date=date(2009, 1, 1))
+        self.knesset_2 = Knesset.objects.create(number=2, start_date=date(2013, 1, 1))
+        self.party = Party.objects.create(name='party 1', knesset=self.knesset_2)
+        self.mks = []
+        for i in range(3):
+            mk = Member.objects.create(name='mk %d' % i, current_party=self.party)
+            Membership.objects.create(member=mk, party=self.party,
+                                      start_date=date(2009, 1, 1))
+            self.mks.append(mk)
+        self.old_vote = Vote.objects.create(title='old vote', time=datetime(2010, 1, 1))
+        self.vote = Vote.objects.create(title='vote', time=datetime(2014, 1, 1))
+        for vote in (self.old_vote, self.vote):
+            for mk, vote_type in zip(self.mks, ['for', 'for', 'against']):
+                VoteAction.objects.create(vote=vote, member=mk, type=vote_type,
+                                          party=self.party)
+
+    def tearDown(self):
+        Knesset.objects._current_knesset = None
+        Knesset.objects._knesset_starts = None
+
+    def counters(self, statistics):
+        return (statistics.total_votes, statistics.votes_against_party,
+                statistics.votes_against_coalition,
+                statistics.votes_against_opposition)
+
+    def member_counters(self, mk, knesset=None):
+        if knesset:
+            return self.counters(MemberKnessetVotingStatistics.objects.get(
+                member=mk, knesset=knesset))
+        return self.counters(MemberVotingStatistics.objects.get(member=mk))
+
+    def party_counters(self):
+        return self.counters(Party.objects.get(id=self.party.id).voting_statistics)
+
+    def test_vote_actions_are_counted(self):
+        self.assertEqual(self.member_counters(self.mks[2]), (2, 0, 0, 0))
+        self.assertEqual(self.member_counters(self.mks[2], self.knesset_1), (1, 0, 0, 0))
+        self.assertEqual(self.party_counters(), (3, 0, 0, 0))
+
+        action = VoteAction.objects.get(vote=self.vote, member=self.mks[0])
+        action.type = 'no-vote'
+        action.save()
+        self.assertEqual(self.member_counters(self.mks[0]), (1, 0, 0, 0))
+        action.delete()
+        self.assertEqual(self.member_counters(self.mks[0]), (1, 0, 0, 0))
+        VoteAction.objects.get(vote=self.old_vote, member=self.mks[0]).delete()
+        self.assertEqual(self.member_counters(self.mks[0]), (0, 0, 0, 0))
+        self.assertEqual(self.party_counters(), (2, 0, 0, 0))
+
+    def test_vote_properties_are_counted(self):
+        VotePropertiesEngine().update_votes(Vote.objects.all())
+        self.assertEqual(self.member_counters(self.mks[2]), (2, 2, 0, 2))
+        self.assertEqual(self.member_counters(self.mks[2], self.knesset_2), (1, 1, 0, 1))
+        self.assertEqual(self.party_counters(), (3, 1, 0, 1))
+
+        statistics = MemberVotingStatistics.objects.get(member=self.mks[2])
+        self.assertEqual(statistics.votes_count(self.knesset_2.start_date), 1)
+        self.assertEqual(statistics.votes_against_party_count(date(2009, 6, 1)), 2)
+
+    def test_rebuild(self):
+        VotePropertiesEngine().update_votes(Vote.objects.all())
+        counted = ([self.member_counters(mk) for mk in self.mks],
+                   self.member_counters(self.mks[2], self.knesset_1),
+                   self.party_counters())
+        MemberVotingStatistics.objects.update(total_votes=0, votes_against_party=0)
+        MemberKnessetVotingStatistics.objects.all().delete()
+        MemberVotingStatistics.objects.rebuild()
+        self.assertEqual(([self.member_counters(mk) for mk in self.mks],
+                          self.member_counters(self.mks[2], self.knesset_1),
+                          self.party_counters()), counted)
+
+    def test_party_change_moves_counters(self):
+        other_party = Party.objects.create(name='party 2', knesset=self.knesset_2)
+        mk = self.mks[0]
+        mk.current_party = other_party
+        mk.save()
+        self.assertEqual(self.party_counters(), (2, 0, 0, 0))
+        self.assertEqual(self.counters(Party.objects.get(id=other_party.id).voting_statistics),
+                         (1, 0, 0, 0))
+        mk.current_party = None
+        mk.save()
+        self.assertEqual(self.counters(Party.objects.get(id=other_party.id).voting_statistics),
+                         (0, 0, 0, 0))
@@ -13,16 +13,16 @@ from views import (
 import feeds
 
 vote_view = VoteListView(queryset=Vote.objects.all(),
-                         paginate_by=20,
+                         paginate_by=20, keyset=True,
                          extra_context={'votes': True,
                                         'title': ugettext('Votes')})
 bill_list_view = BillListView(
     queryset=Bill.objects.all().filter(
         law__merged_into=None).order_by('-stage_date'),
-    paginate_by=20, extra_context={'title': ugettext('Bills')})
+    paginate_by=20, keyset=True, extra_context={'title': ugettext('Bills')})
 bill_detail_view = BillDetailView.as_view()
 vote_list_view = VoteListView(queryset=Vote.objects.all(),
-                              paginate_by=20,
+                              paginate_by=20, keyset=True,
                               extra_context={'votes': True,
                                              'title': ugettext('Votes')})
 vote_detail_view = VoteDetailView.as_view()
@@ -3,7 +3,6 @@ import datetime
 import json
 import os
 
-import difflib
 import logging
 import tagging
 import voting
@@ -26,9 +25,11 @@ from agendas.models import Agenda, UserSuggestedVote
 from ok_tag.views import BaseTagMemberListView
 from auxiliary.mixins import CsvView
 from forms import VoteSelectForm, BillSelectForm, BudgetEstimateForm
+from autocomplete import bill_autocomplete, vote_autocomplete
 from forms import AttachBillFromVoteForm
 from hashnav import DetailView, ListView as HashnavListView
 from knesset.utils import notify_responsible_adult
+from mks.forms import MemberNameForm
 from mks.models import Member
 from models import Bill, BillBudgetEstimation, Vote, KnessetProposal, VoteAction
 from models import BILL_STAGE_CHOICES
@@ -150,13 +151,11 @@ def bill_auto_complete(request):
     if not 'query' in request.GET:
         raise Http404
 
-    options = Bill.objects.filter(
-            full_title__icontains=request.GET['query'])[:30]
     data = []
     suggestions = []
-    for i in options:
-        data.append(i.id)
-        suggestions.append(i.full_title)
+    for bill_id, full_title in bill_autocomplete.suggest(request.GET['query']):
+        data.append(bill_id)
+        suggestions.append(full_title)
 
     result = {'query': request.GET['query'],
               'suggestions': suggestions,
@@ -774,7 +773,6 @@ class VoteDetailView(DetailView):
             return HttpResponseBadRequest()
         user_input_type = request.POST.get('user_input_type', None)
         vote = get_object_or_404(Vote, pk=object_id)
-        mk_names = Member.objects.values_list('name', flat=True)
         if user_input_type == 'agenda':
             try:
                 agenda_id = int(request.POST.get('agenda'))
@@ -818,8 +816,10 @@ class VoteDetailView(DetailView):
                 return self.get(request, bill_form=form)
 
         else:  # adding an MK (either for or against)
-            mk_name = difflib.get_close_matches(request.POST.get('mk_name'), mk_names)[0]
-            mk = Member.objects.get(name=mk_name)
+            form = MemberNameForm(request.POST)
+            if not form.is_valid():
+                return self.get(request, mk_form=form)
+            mk = form.cleaned_data['member']
             stand = None
             if user_input_type == 'mk-for':
                 stand = 'for'
@@ -855,14 +855,10 @@ def vote_auto_complete(request):
     if not 'query' in request.GET:
         raise Http404
 
-    options = Vote.objects.filter(title__icontains=request.GET['query'])[:30]
-
     data = []
     suggestions = []
-    for i in options:
-        formatted_date = i.time.date().strftime('%d/%m/%Y')
-        title = u'{0} - {1}'.format(formatted_date, i.title)
-        data.append(i.id)
+    for vote_id, title in vote_autocomplete.suggest(request.GET['query']):
+        data.append(vote_id)
         suggestions.append(title)
 
     result = {'query': request.GET['query'],
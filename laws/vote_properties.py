@@ -0,0 +1,230 @@
+'''
+Batch computation of the vote properties.
+
+For each vote: how many members voted against their party, the coalition,
+the opposition or their own bill, the vote counts, its controversy and type.
+VotePropertiesEngine loads the vote actions and bill proposers once per chunk
+of votes, looks the parties up in the membership index, computes the
+properties in memory and writes back only what changed, with bulk UPDATEs.
+'''
+from collections import defaultdict, Counter
+import logging
+
+from django.db import transaction
+
+from laws import constants
+from laws.models import (Vote, VoteAction, Bill, MemberVotingStatistics,
+                         VOTING_COUNTERS, vote_action_counters)
+from mks.memberships import membership_index
+from mks.models import Party
+from mks.sections import bump_member_generation
+
+logger = logging.getLogger(__name__)
+
+# votes computed, and written, at once
+CHUNK_SIZE = 500
+
+VOTE_ACTION_FLAGS = ('against_party', 'against_coalition',
+                     'against_opposition', 'against_own_bill')
+
+VOTE_PROPERTIES = ('against_party', 'against_coalition', 'against_opposition',
+                   'against_own_bill', 'votes_count', 'for_votes_count',
+                   'against_votes_count', 'abstain_votes_count', 'controversy',
+                   'vote_type')
+
+
+class UnknownPartyError(Exception):
+    "A member voted at a date none of his memberships covers"
+
+
+def _stands(votes, total):
+    return float(votes) > constants.STANDS_FOR_THRESHOLD * total
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class VotePropertiesEngine(object):
+
+    def __init__(self):
+        self.party_ids = list(Party.objects.values_list('id', flat=True))
+        self.memberships = membership_index()
+
+    def _proposers(self, vote_ids):
+        "Returns {vote_id: ids of the members that proposed its bills}"
+        vote_bills = defaultdict(set)
+        for vote_id, bill_id in Bill.pre_votes.through.objects.filter(
+                vote__in=vote_ids).values_list('vote_id', 'bill_id'):
+            vote_bills[vote_id].add(bill_id)
+        for field in ('first_vote', 'approval_vote'):
+            for bill_id, vote_id in Bill.objects.filter(
+                    **{field + '__in': vote_ids}).values_list('id', field):
+                vote_bills[vote_id].add(bill_id)
+
+        bill_proposers = defaultdict(set)
+        bill_ids = set().union(*vote_bills.values())
+        if bill_ids:
+            for bill_id, member_id in Bill.proposers.through.objects.filter(
+                    bill__in=bill_ids).values_list('bill_id', 'member_id'):
+                bill_proposers[bill_id].add(member_id)
+        return dict((vote_id, set().union(*[bill_proposers[bill_id]
+                                            for bill_id in bill_ids]))
+                    for vote_id, bill_ids in vote_bills.items())
+
+    def compute(self, votes):
+        """Computes the properties of votes.
+
+        Returns {vote_id: (properties, vote_action_flags)}, where properties
+        is a dict of VOTE_PROPERTIES and vote_action_flags maps the id of
+        each of the vote's actions to its VOTE_ACTION_FLAGS. Votes with a
+        voter whose party is unknown raise UnknownPartyError.
+        """
+        vote_ids = [vote.id for vote in votes]
+        vote_actions = defaultdict(list)
+        for action in VoteAction.objects.filter(vote__in=vote_ids).values_list(
+                'id', 'vote_id', 'member_id', 'type'):
+            vote_actions[action[1]].append(action)
+        proposers = self._proposers(vote_ids)
+
+        results = {}
+        for vote in votes:
+            results[vote.id] = self._compute_vote(vote, vote_actions[vote.id],
+                                                  proposers.get(vote.id, ()))
+        return results
+
+    def _compute_vote(self, vote, actions, proposers):
+        date = vote.time.date()
+        action_parties = {}
+        party_votes = Counter()
+        for action_id, _, member_id, vote_type in actions:
+            party_id = self.memberships.party_id_at(member_id, date)
+            if party_id is None:
+                raise UnknownPartyError(
+                    'could not find which party member %s belonged to during vote %s' % (member_id, vote.id))
+            action_parties[action_id] = party_id
+            party_votes[(party_id, vote_type)] += 1
+
+        party_is_coalition = dict((party_id, self.memberships.is_coalition_at(party_id, date))
+                                  for party_id in self.party_ids)
+        party_stands_for = {}
+        party_stands_against = {}
+        side_votes = Counter()
+        for party_id in self.party_ids:
+            fv = party_votes[(party_id, 'for')]
+            av = party_votes[(party_id, 'against')]
+            party_stands_for[party_id] = _stands(fv, fv + av)
+            party_stands_against[party_id] = _stands(av, fv + av)
+            side = party_is_coalition[party_id]
+            side_votes[(side, 'for')] += fv
+            side_votes[(side, 'against')] += av
+        side_stands_for = {}
+        side_stands_against = {}
+        for side in (True, False):
+            total = side_votes[(side, 'for')] + side_votes[(side, 'against')]
+            side_stands_for[side] = _stands(side_votes[(side, 'for')], total)
+            side_stands_against[side] = _stands(side_votes[(side, 'against')], total)
+
+        flags = {}
+        counts = Counter()
+        for action_id, _, member_id, vote_type in actions:
+            party_id = action_parties[action_id]
+            against_party = (
+                (party_stands_for[party_id] and vote_type == 'against') or
+                (party_stands_against[party_id] and vote_type == 'for'))
+            side = party_is_coalition[party_id]
+            against_side = (
+                (side_stands_for[side] and vote_type == 'against') or
+                (side_stands_against[side] and vote_type == 'for'))
+            against_own_bill = member_id in proposers and vote_type == 'against'
+            flags[action_id] = (against_party, side and against_side,
+                                not side and against_side, against_own_bill)
+            counts.update(flag for flag, value in zip(VOTE_ACTION_FLAGS,
+                                                      flags[action_id]) if value)
+            counts[vote_type] += 1
+
+        properties = dict((flag, counts[flag]) for flag in VOTE_ACTION_FLAGS)
+        properties.update(votes_count=len(actions),
+                          for_votes_count=counts['for'],
+                          against_votes_count=counts['against'],
+                          abstain_votes_count=counts['abstain'],
+                          controversy=min(counts['for'], counts['against']),
+                          vote_type=vote._vote_type())
+        return properties, flags
+
+    def write_vote_actions(self, flags):
+        """Writes {vote_action_id: VOTE_ACTION_FLAGS} with one UPDATE per
+        combination of flags, skipping the actions that didn't change, and
+        applies the changes to the members' voting statistics and to the
+        generations of their votes on their pages, since UPDATEs fire no
+        signals"""
+        by_flags = defaultdict(list)
+        changed_members = set()
+        deltas = defaultdict(lambda: [0] * len(VOTING_COUNTERS))
+        for action_ids in chunks(flags.keys(), CHUNK_SIZE):
+            for action in VoteAction.objects.filter(id__in=action_ids).values_list(
+                    'id', 'member_id', 'type', 'vote__time', *VOTE_ACTION_FLAGS):
+                action_id, member_id, vote_type, time = action[:4]
+                old_flags, new_flags = tuple(action[4:]), flags[action_id]
+                if old_flags != new_flags:
+                    by_flags[new_flags].append(action_id)
+                    changed_members.add(member_id)
+                    old = vote_action_counters(vote_type, *old_flags[:3])
+                    new = vote_action_counters(vote_type, *new_flags[:3])
+                    delta = deltas[(member_id, time)]
+                    for i, (o, n) in enumerate(zip(old, new)):
+                        delta[i] += n - o
+        for action_flags, action_ids in by_flags.items():
+            for action_ids_chunk in chunks(action_ids, CHUNK_SIZE):
+                VoteAction.objects.filter(id__in=action_ids_chunk).update(
+                    **dict(zip(VOTE_ACTION_FLAGS, action_flags)))
+        MemberVotingStatistics.objects.apply_deltas(deltas)
+        for member_id in changed_members:
+            bump_member_generation(member_id, 'votes')
+
+    def update_vote(self, vote):
+        "Computes and saves the properties of a single vote, like it always was"
+        properties, flags = self.compute([vote])[vote.id]
+        self.write_vote_actions(flags)
+        for name, value in properties.items():
+            setattr(vote, name, value)
+        vote.save()
+
+    def update_votes(self, votes, chunk_size=CHUNK_SIZE):
+        """Computes and writes the properties of a votes queryset, a chunk at
+        a time. Votes whose properties didn't change aren't written.
+
+        Returns (ids of the votes that changed, ids of votes that failed).
+        """
+        changed = []
+        failed = []
+        vote_ids = list(votes.order_by('id').values_list('id', flat=True))
+        for vote_ids_chunk in chunks(vote_ids, chunk_size):
+            chunk = list(Vote.objects.filter(id__in=vote_ids_chunk).defer(
+                'full_text', 'summary'))
+            try:
+                results = self.compute(chunk)
+            except UnknownPartyError:
+                # find the failing votes, and compute the rest
+                results = {}
+                for vote in chunk:
+                    try:
+                        results.update(self.compute([vote]))
+                    except UnknownPartyError as e:
+                        logger.error(e)
+                        failed.append(vote.id)
+
+            with transaction.commit_on_success():
+                flags = {}
+                for vote in chunk:
+                    if vote.id not in results:
+                        continue
+                    properties, vote_flags = results[vote.id]
+                    flags.update(vote_flags)
+                    if any(getattr(vote, name) != value
+                           for name, value in properties.items()):
+                        Vote.objects.filter(id=vote.id).update(**properties)
+                        changed.append(vote.id)
+                self.write_vote_actions(flags)
+        return changed, failed
@@ -2,9 +2,9 @@
 Api for the members app
 '''
 import urllib
-import math
 import logging
 from django.core.urlresolvers import reverse
+from django.conf import settings
 from django.core.cache import cache
 from django.db.models.query import EmptyQuerySet
 from tastypie.constants import ALL
@@ -14,8 +14,11 @@ import tastypie.fields as fields
 from tagging.models import Tag
 from tagging.utils import calculate_cloud
 from apis.resources.base import BaseResource, BaseNonModelResource
-from models import Member, Party, Knesset
+from models import Member, Party, Knesset, RANKING_METRICS
+from statistics import member_statistics
+from memberships import memberships_version
 from agendas.models import Agenda
+from agendas.generations import agendas_cache_key
 from video.utils import get_videos_queryset
 from video.api import VideoResource
 from links.models import Link
@@ -128,7 +131,10 @@ class MemberAgendasResource(BaseResource):
 
     def dehydrate_agendas(self, bundle):
         mk = bundle.obj
-        _cache_key = 'api_v2_member_agendas_' + str(mk.pk)
+        # the agendas' scores are versioned by their generations, and the
+        # party's members by the memberships, but not by the members' saves
+        _cache_key = agendas_cache_key('api_v2_member_agendas_%d_m%s' % (
+            mk.pk, memberships_version()))
         agendas = cache.get(_cache_key)
 
         if not agendas:
@@ -228,6 +234,9 @@ class MemberResource(BaseResource):
                                         null=True)
     fields.ToOneField(PartyResource, 'current_party', full=True)
     average_weekly_presence_rank = fields.IntegerField()
+    # the member's value and rank in the ``stat_type`` metric, when given
+    stat_value = fields.FloatField(attribute='stat_value', null=True)
+    stat_rank = fields.IntegerField(attribute='stat_rank', null=True)
 
     def obj_get_list(self, bundle, **kwargs):
         simple = super(MemberResource, self).obj_get_list(bundle, **kwargs)
@@ -244,8 +253,25 @@ class MemberResource(BaseResource):
                 return Member.objects.filter(person__aliases__name=name)
             except PersonAlias.DoesNotExist:
                 return simple
+        stat_type = filters.get('stat_type')
+        if stat_type in dict(RANKING_METRICS):
+            return self._ranked(simple, stat_type)
         return simple
 
+    def _ranked(self, objects, metric):
+        """The members ranked in metric, by rank, with their stat_value and
+        stat_rank"""
+        return objects.filter(rankings__metric=metric).extra(
+            select={'stat_value': 'mks_memberranking.value',
+                    'stat_rank': 'mks_memberranking.rank'}).order_by('stat_rank', 'pk')
+
+    def _get_list_fields(self, request):
+        fields = super(MemberResource, self)._get_list_fields(request)
+        if fields is not None and request.GET.get('stat_type') in dict(RANKING_METRICS):
+            fields['stat_value'] = self.fields['stat_value']
+            fields['stat_rank'] = self.fields['stat_rank']
+        return fields
+
     def dehydrate_committees(self, bundle):
         temp_list = bundle.obj.committee_meetings.exclude(committee__type='plenum')
         temp_list = temp_list.values("committee", "committee__name").annotate(Count("id")).order_by('-id__count')[:5]
@@ -294,31 +320,9 @@ class MemberResource(BaseResource):
         return count
 
     def dehydrate_average_weekly_presence_rank(self, bundle):
-        ''' Calculate the distribution of presence and place the user on a 5 level scale '''
-        SCALE = 5
-        member = bundle.obj
-
-        rel_location = cache.get('average_presence_location_%d' % member.id)
-        if not rel_location:
-
-            presence_list = sorted(map(lambda member: member.average_weekly_presence_hours,
-                                       Member.objects.all()))
-            presence_groups = int(math.ceil(len(presence_list) / float(SCALE)))
-
-            # Generate cache for all members
-            for mk in Member.objects.all():
-                avg = mk.average_weekly_presence_hours
-                if avg:
-                    mk_location = 1 + (presence_list.index(avg) / presence_groups)
-                else:
-                    mk_location = 0
-
-                cache.set('average_presence_location_%d' % mk.id, mk_location, 60 * 60 * 24)
-
-                if mk.id == member.id:
-                    rel_location = mk_location
-
-        return rel_location
+        ''' The member's place on a 5 level scale of the presence distribution '''
+        return member_statistics().bucket('average_weekly_presence_hours',
+                                          bundle.obj.average_weekly_presence_hours, 5)
 
     def build_filters(self, filters=None):
         if filters is None:
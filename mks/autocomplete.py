@@ -0,0 +1,27 @@
+'''
+Autocomplete of the current members, by their names, alternative names and
+aliases. See auxiliary.autocomplete
+'''
+from collections import defaultdict
+
+from auxiliary.autocomplete import Autocomplete
+
+MEMBER_FIELDS = ('name', 'id', 'img_url', 'gender', 'is_current')
+
+
+def member_entries():
+    from mks.models import Member, MemberAltname
+    from persons.models import PersonAlias
+
+    names = defaultdict(list)
+    for member_id, name in MemberAltname.objects.filter(
+            member__is_current=True).values_list('member_id', 'name'):
+        names[member_id].append(name)
+    for member_id, name in PersonAlias.objects.filter(
+            person__mk__is_current=True).values_list('person__mk_id', 'name'):
+        names[member_id].append(name)
+    for member in Member.objects.filter(is_current=True).values(*MEMBER_FIELDS):
+        yield member['id'], [member['name']] + names[member['id']], member
+
+
+member_autocomplete = Autocomplete('members', member_entries)
@@ -0,0 +1,135 @@
+'''
+Pairwise voting correlation of the members.
+
+Two members agree in a vote when they both voted for, or both voted against,
+and disagree when one voted for and the other against. The score of a pair
+is agreements - disagreements, and the normalized score divides it by the
+votes both took a side in, so it goes from -1 to 1.
+
+The counts come from the ballot matrix. Each member's for and against ballots
+over the window are packed into two bitsets (python longs, a bit per vote),
+so a pair's agreements are popcount(F1 & F2) + popcount(A1 & A2) and the
+votes both took a side in popcount((F1 | A1) & (F2 | A2)) - a few ANDs of a
+few KB per pair instead of a pass over the votes.
+'''
+import binascii
+from collections import defaultdict
+
+from django.db import transaction
+
+from laws.ballots import BALLOTS, build_ballot_matrix, shared_ballot_matrix
+from mks.models import Correlation, CorrelationVote, Member
+
+# Correlation rows created at once
+BULK_SIZE = 1000
+
+
+def _popcount(x):
+    return bin(x).count('1')
+
+
+def _bitset(bits):
+    "A bytearray with the lowest bit first, as a long"
+    if not bits:
+        return 0
+    return long(binascii.hexlify(str(bits[::-1])), 16)
+
+
+def ballot_bitsets(matrix, rows):
+    """Returns {member_id: (for bitset, against bitset)} over the matrix
+    rows, for the members that voted for or against in any of them"""
+    n_columns = len(matrix.member_ids)
+    size = (len(rows) + 7) // 8
+    for_bits = [bytearray(size) for _ in xrange(n_columns)]
+    against_bits = [bytearray(size) for _ in xrange(n_columns)]
+    voted = set()
+    for position, row in enumerate(rows):
+        byte, mask = position // 8, 1 << (position % 8)
+        for column, ballot in enumerate(matrix.row(row)):
+            if ballot == BALLOTS['for']:
+                for_bits[column][byte] |= mask
+                voted.add(column)
+            elif ballot == BALLOTS['against']:
+                against_bits[column][byte] |= mask
+                voted.add(column)
+    return dict((matrix.member_ids[column],
+                 (_bitset(for_bits[column]), _bitset(against_bits[column])))
+                for column in voted)
+
+
+def pair_counts(bitsets):
+    """Returns {(m1_id, m2_id): (agreements, disagreements)} for every pair
+    of members, m1_id < m2_id, that both took a side in some vote"""
+    counts = {}
+    member_ids = sorted(bitsets)
+    # the votes each member took a side in
+    sides = dict((member_id, f | a) for member_id, (f, a) in bitsets.items())
+    for i, m1 in enumerate(member_ids):
+        f1, a1 = bitsets[m1]
+        for m2 in member_ids[i + 1:]:
+            shared = _popcount(sides[m1] & sides[m2])
+            if shared:
+                f2, a2 = bitsets[m2]
+                agree = _popcount(f1 & f2) + _popcount(a1 & a2)
+                counts[(m1, m2)] = (agree, shared - agree)
+    return counts
+
+
+def _ballot_matrix():
+    matrix = shared_ballot_matrix()
+    if matrix is None:
+        build_ballot_matrix()
+        matrix = shared_ballot_matrix()
+    return matrix
+
+
+def calculate_correlations(start=None, end=None, vote_ids=None):
+    """Computes the correlations of all the members over the votes held in
+    [start, end), and replaces the Correlation rows with them.
+
+    With vote_ids, only those of the votes that weren't counted yet are
+    counted, and added to the existing Correlation rows - for newly scraped
+    votes. Returns the number of Correlation rows written.
+    """
+    matrix = _ballot_matrix()
+    if vote_ids is None:
+        rows = matrix.rows_between(start, end)
+    else:
+        counted = set(CorrelationVote.objects.filter(
+            vote_id__in=vote_ids).values_list('vote_id', flat=True))
+        rows = sorted(set(matrix.vote_index[vote_id] for vote_id in vote_ids
+                          if vote_id in matrix.vote_index and vote_id not in counted))
+        if not rows:
+            return 0
+    counted_votes = [CorrelationVote(vote_id=matrix.vote_ids[row]) for row in rows]
+    counts = pair_counts(ballot_bitsets(matrix, rows))
+
+    # (score, votes) of both directions of each pair
+    totals = defaultdict(lambda: [0, 0])
+    if vote_ids is not None:
+        for m1, m2, score, votes in Correlation.objects.values_list(
+                'm1_id', 'm2_id', 'score', 'votes'):
+            totals[(m1, m2)] = [score, votes]
+    for (m1, m2), (agree, disagree) in counts.items():
+        for pair in ((m1, m2), (m2, m1)):
+            totals[pair][0] += agree - disagree
+            totals[pair][1] += agree + disagree
+
+    parties = dict(Member.objects.values_list('id', 'current_party_id'))
+    correlations = []
+    for (m1, m2), (score, votes) in totals.items():
+        if m1 not in parties or m2 not in parties:
+            continue
+        p1, p2 = parties[m1], parties[m2]
+        correlations.append(Correlation(
+            m1_id=m1, m2_id=m2, score=score, votes=votes,
+            normalized_score=float(score) / votes if votes else None,
+            not_same_party=p1 != p2 if p1 and p2 else None))
+
+    with transaction.commit_on_success():
+        Correlation.objects.all().delete()
+        Correlation.objects.bulk_create(correlations, batch_size=BULK_SIZE)
+        if vote_ids is None:
+            CorrelationVote.objects.all().delete()
+        CorrelationVote.objects.bulk_create(counted_votes, batch_size=BULK_SIZE)
+    return len(correlations)
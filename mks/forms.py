@@ -0,0 +1,29 @@
+from django import forms
+from django.utils.translation import ugettext_lazy as _
+
+from models import Member
+
+
+class MemberNameForm(forms.Form):
+    """A member by the name the editors typed in name_field. It must be the
+    member's name, or close enough to it, so a typo doesn't change the wrong
+    member"""
+
+    def __init__(self, data, name_field='mk_name'):
+        super(MemberNameForm, self).__init__(data)
+        self.name_field = name_field
+        # required here, so all the errors are the form's, whatever the field
+        self.fields[name_field] = forms.CharField(label=_('MK'), required=False)
+
+    def clean(self):
+        cleaned_data = super(MemberNameForm, self).clean()
+        name = cleaned_data.get(self.name_field)
+        if not name:
+            raise forms.ValidationError(_('Please enter the name of an MK'),
+                                        code='required')
+        cleaned_data['member'] = Member.objects.find_one(name)
+        if cleaned_data['member'] is None:
+            raise forms.ValidationError(
+                _('No MK is named like %(name)s') % {'name': name},
+                code='unknown-mk')
+        return cleaned_data
@@ -1,10 +1,17 @@
 #encoding: utf-8
 from django.db.models.signals import post_save, post_delete
+from django.contrib.contenttypes.models import ContentType
 from planet.models import Feed, Post
 from actstream import action
-from knesset.utils import cannonize, disable_for_loaddata
+from actstream.models import Action, Follow
+from knesset.utils import cannonize, disable_for_loaddata, track_stored_fields
 from links.models import Link, LinkType
-from models import Member, Knesset
+from models import Member, Knesset, Membership, CoalitionMembership, Party, MemberAltname
+from autocomplete import member_autocomplete, MEMBER_FIELDS
+from memberships import reset_membership_index
+from name_index import reset_name_indexes
+from sections import bump_member_generation, bump_shared_generation
+from video.models import Video
 
 import logging
 logger = logging.getLogger("open-knesset.mks.listeners")
@@ -37,8 +44,98 @@ def record_post_action(sender, created, instance, **kwargs):
 post_save.connect(record_post_action, sender=Post)
 
 
+# the fields whose changes some listeners act on
+track_stored_fields(Member, 'current_party', *MEMBER_FIELDS)
+track_stored_fields(Party, 'name')
+
+
 def reset_current_knesset(sender, instance, **kwargs):
-    """Make sure current knesset is cleared upon changes to Knesset"""
+    """Make sure the cached knessets are cleared upon changes to Knesset"""
     Knesset.objects._current_knesset = None
+    Knesset.objects._knesset_starts = None
 post_save.connect(reset_current_knesset, sender=Knesset)
 post_delete.connect(reset_current_knesset, sender=Knesset)
+
+
+def reset_memberships(sender, instance, **kwargs):
+    """Make sure the membership index is reloaded upon changes to the
+    memberships"""
+    reset_membership_index()
+for membership_model in (Membership, CoalitionMembership):
+    post_save.connect(reset_memberships, sender=membership_model)
+    post_delete.connect(reset_memberships, sender=membership_model)
+
+
+def reset_names(sender, instance, **kwargs):
+    """Make sure the name indexes are rebuilt when names change. Saves that
+    keep the stored name, of which there are many, keep the indexes"""
+    stored = getattr(instance, '_stored', None)
+    if stored is None or stored['name'] != instance.name:
+        reset_name_indexes()
+
+
+def reset_name_index(sender, instance, **kwargs):
+    reset_name_indexes()
+for named_model in (Member, Party):
+    post_save.connect(reset_names, sender=named_model)
+    post_delete.connect(reset_name_index, sender=named_model)
+post_save.connect(reset_name_index, sender=MemberAltname)
+post_delete.connect(reset_name_index, sender=MemberAltname)
+
+
+def reset_member_autocomplete(sender, instance, **kwargs):
+    """Make sure the member autocomplete is rebuilt when what it suggests
+    changes"""
+    stored = getattr(instance, '_stored', None)
+    if stored is None or any(stored[field] != getattr(instance, field)
+                             for field in MEMBER_FIELDS):
+        member_autocomplete.reset()
+post_save.connect(reset_member_autocomplete, sender=Member)
+
+
+def reset_member_names_autocomplete(sender, instance, **kwargs):
+    member_autocomplete.reset()
+post_delete.connect(reset_member_names_autocomplete, sender=Member)
+post_save.connect(reset_member_names_autocomplete, sender=MemberAltname)
+post_delete.connect(reset_member_names_autocomplete, sender=MemberAltname)
+
+
+# the listeners below bump the generations of the cached sections of the
+# member page, see mks.sections
+
+def bump_member(sender, instance, **kwargs):
+    bump_member_generation(instance.id, 'member')
+post_save.connect(bump_member, sender=Member)
+
+
+def bump_membership_member(sender, instance, **kwargs):
+    bump_member_generation(instance.member_id, 'member')
+post_save.connect(bump_membership_member, sender=Membership)
+post_delete.connect(bump_membership_member, sender=Membership)
+
+
+def bump_member_followers(sender, instance, **kwargs):
+    if instance.content_type_id == ContentType.objects.get_for_model(Member).id:
+        bump_member_generation(int(instance.object_id), 'followers')
+post_save.connect(bump_member_followers, sender=Follow)
+post_delete.connect(bump_member_followers, sender=Follow)
+
+
+def bump_member_actions(sender, instance, **kwargs):
+    from persons.models import Person
+    actor_type = instance.actor_content_type_id
+    if actor_type == ContentType.objects.get_for_model(Member).id:
+        bump_member_generation(int(instance.actor_object_id), 'actions')
+    elif actor_type == ContentType.objects.get_for_model(Person).id:
+        # annotations of a person's protocol parts are shown on the mk's page
+        for member_id in Person.objects.filter(pk=instance.actor_object_id,
+                                               mk__isnull=False).values_list('mk_id', flat=True):
+            bump_member_generation(member_id, 'actions')
+post_save.connect(bump_member_actions, sender=Action)
+post_delete.connect(bump_member_actions, sender=Action)
+
+
+def bump_videos(sender, instance, **kwargs):
+    bump_shared_generation('videos')
+post_save.connect(bump_videos, sender=Video)
+post_delete.connect(bump_videos, sender=Video)
@@ -0,0 +1,54 @@
+from datetime import datetime
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mks.correlations import calculate_correlations
+from mks.models import Knesset
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_date(value, option):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise CommandError('%s should be given as YYYY-MM-DD' % option)
+
+
+class Command(BaseCommand):
+    help = "Calculate the voting correlations between the members"
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--since', dest='since', default=None,
+            help='Count the votes since this date (YYYY-MM-DD) instead of '
+                 'since the start of the current knesset'
+        ),
+        make_option(
+            '--until', dest='until', default=None,
+            help='Count the votes before this date (YYYY-MM-DD)'
+        ),
+        make_option(
+            '--vote-ids', dest='vote_ids', default=None,
+            help='Add only these newly scraped votes, comma separated, to '
+                 'the existing correlations. Votes already counted are skipped'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if options['vote_ids']:
+            try:
+                vote_ids = [int(x) for x in options['vote_ids'].split(',')]
+            except ValueError:
+                raise CommandError('--vote-ids should be comma separated ids')
+            count = calculate_correlations(vote_ids=vote_ids)
+        else:
+            if options['since']:
+                start = _parse_date(options['since'], '--since')
+            else:
+                start = Knesset.objects.current_knesset().start_date
+            end = _parse_date(options['until'], '--until') if options['until'] else None
+            count = calculate_correlations(start, end)
+        logger.info(u'Wrote {0} correlations'.format(count))
@@ -0,0 +1,14 @@
+from django.core.management.base import NoArgsCommand
+from logging import getLogger
+
+from mks.rankings import refresh_member_rankings
+
+logger = getLogger(__name__)
+
+
+class Command(NoArgsCommand):
+    help = "Recalculates the member rankings of the member list pages and api"
+
+    def handle_noargs(self, **options):
+        count = refresh_member_rankings()
+        logger.info(u'Wrote {0} member rankings'.format(count))
@@ -1,5 +1,6 @@
-import difflib
-from django.core.cache import cache
+import datetime
+import sys
+from bisect import bisect_right
 from django.db import models, connection
 from django.db.models import Q
 
@@ -9,6 +10,7 @@ class KnessetManager(models.Manager):
     def __init__(self):
         super(KnessetManager, self).__init__()
         self._current_knesset = None
+        self._knesset_starts = None
 
     def current_knesset(self):
         if self._current_knesset is None:
@@ -19,31 +21,60 @@ class KnessetManager(models.Manager):
                 return None
         return self._current_knesset
 
+    def knesset_at(self, date):
+        """Returns the number of the knesset that served at date, or None if
+        it's before the first known knesset"""
+        if self._knesset_starts is None:
+            self._knesset_starts = list(self.get_query_set().filter(
+                start_date__isnull=False).order_by('start_date').values_list(
+                    'start_date', 'number'))
+        if isinstance(date, datetime.datetime):
+            date = date.date()
+        i = bisect_right(self._knesset_starts, (date, sys.maxint))
+        return self._knesset_starts[i - 1][1] if i else None
+
 
 class BetterManager(models.Manager):
-    def __init__(self):
-        super(BetterManager, self).__init__()
-        self._names = []
 
-    def find(self, name):
+    def indexed_names(self):
+        "(name, id) of the names find looks in"
+        return self.values_list('name', 'id')
+
+    def find(self, name, cutoff=0.5):
         ''' looks for a member with a name that resembles 'name'
             the returned array is ordered by similiarity
         '''
-        names = cache.get('%s_names' % self.model.__name__)
-        if not names:
-            names = self.values_list('name', flat=True)
-            cache.set('%s_names' % self.model.__name__, names)
-        possible_names = difflib.get_close_matches(
-            name, names, cutoff=0.5, n=5)
-        qs = self.filter(name__in=possible_names)
-        # used to establish size, overwritten later
-        ret = range(qs.count())
-        for m in qs:
+        from mks.name_index import name_index
+        matches = name_index(self).search(name, n=5, cutoff=cutoff)
+        objects = self.in_bulk([object_id for object_id, score in matches])
+        ret = [objects[object_id] for object_id, score in matches
+               if object_id in objects]
+        for m in ret:
             if m.name == name:
                 return [m]
-            ret[possible_names.index(m.name)] = m
         return ret
 
+    def find_one(self, name, cutoff=0.6):
+        ''' the object named 'name', or else the one whose name resembles it
+            the most, if it's at least cutoff alike. None if there's none
+        '''
+        found = self.find(name, cutoff=cutoff)
+        return found[0] if found else None
+
+
+class MemberManager(BetterManager):
+
+    def indexed_names(self):
+        "The names of the members, their alternative names and their aliases"
+        from mks.models import MemberAltname
+        from persons.models import PersonAlias
+        names = list(super(MemberManager, self).indexed_names())
+        names.extend(MemberAltname.objects.values_list('name', 'member_id'))
+        names.extend(PersonAlias.objects.filter(person__mk__isnull=False).values_list(
+            'name', 'person__mk_id'))
+        return names
+
+
 class PartyManager(BetterManager):
     def parties_during_range(self, ranges=None):
         filters_folded = Agenda.generateSummaryFilters(ranges, 'start_date', 'end_date')
@@ -0,0 +1,98 @@
+'''
+Process wide index of the party memberships and coalition periods.
+
+Which party a member was in, and whether a party was in the coalition, are
+asked for every vote action and committee meeting attendance when syncing.
+The index answers both from memory with bisect lookups. It is reset by the
+Membership and CoalitionMembership listeners, and other processes notice the
+change through a version kept in the cache.
+'''
+import datetime
+from bisect import bisect_right
+from collections import defaultdict
+
+from knesset.cache import VersionedSingleton
+
+MEMBERSHIPS_VERSION_KEY = 'mks_memberships_version'
+
+
+def _as_date(d):
+    if isinstance(d, datetime.datetime):
+        return d.date()
+    return d
+
+
+class MembershipIndex(object):
+
+    def __init__(self):
+        from mks.models import Membership, CoalitionMembership
+
+        # member_id -> memberships sorted by start date, as (start, end,
+        # party_id), with a parallel list of the start dates to bisect
+        self.memberships = defaultdict(list)
+        for member_id, party_id, start, end in Membership.objects.values_list(
+                'member_id', 'party_id', 'start_date', 'end_date'):
+            self.memberships[member_id].append(
+                (start or datetime.date.min, end, party_id))
+        self.membership_starts = {}
+        for member_id, memberships in self.memberships.items():
+            memberships.sort()
+            self.membership_starts[member_id] = [m[0] for m in memberships]
+
+        # party_id -> the coalition periods merged into disjoint (start, end)
+        periods = defaultdict(list)
+        for party_id, start, end in CoalitionMembership.objects.values_list(
+                'party_id', 'start_date', 'end_date'):
+            periods[party_id].append((start or datetime.date.min,
+                                      end or datetime.date.max))
+        self.coalition_periods = {}
+        self.coalition_starts = {}
+        for party_id, party_periods in periods.items():
+            merged = []
+            for start, end in sorted(party_periods):
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+                else:
+                    merged.append((start, end))
+            self.coalition_periods[party_id] = merged
+            self.coalition_starts[party_id] = [p[0] for p in merged]
+
+    def party_id_at(self, member_id, date):
+        """Returns the id of the party the member was in at date, or None.
+        Of overlapping memberships, the one that started last is used"""
+        date = _as_date(date)
+        memberships = self.memberships.get(member_id)
+        if not memberships:
+            return None
+        i = bisect_right(self.membership_starts[member_id], date)
+        while i:
+            i -= 1
+            start, end, party_id = memberships[i]
+            if end is None or end >= date:
+                return party_id
+        return None
+
+    def is_coalition_at(self, party_id, date):
+        date = _as_date(date)
+        starts = self.coalition_starts.get(party_id)
+        if not starts:
+            return False
+        i = bisect_right(starts, date)
+        return bool(i) and self.coalition_periods[party_id][i - 1][1] >= date
+
+
+_membership_index = VersionedSingleton(MEMBERSHIPS_VERSION_KEY, MembershipIndex)
+
+
+def membership_index():
+    "The process wide MembershipIndex, reloaded when the memberships changed"
+    return _membership_index.get()
+
+
+def reset_membership_index():
+    _membership_index.reset()
+
+
+def memberships_version():
+    "The version of the memberships, which changes when they're reset"
+    return _membership_index.version()
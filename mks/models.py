@@ -12,8 +12,9 @@ from planet.models import Blog
 from laws.enums import BillStages
 from links.models import Link
 
+from mks.memberships import membership_index
 from mks.managers import (
-    BetterManager, PartyManager, KnessetManager, CurrentKnessetMembersManager,
+    MemberManager, PartyManager, KnessetManager, CurrentKnessetMembersManager,
     CurrentKnessetPartyManager, MembershipManager)
 
 GENDER_CHOICES = (
@@ -28,11 +29,19 @@ class Correlation(models.Model):
     score = models.IntegerField(default=0)
     normalized_score = models.FloatField(null=True)
     not_same_party = models.NullBooleanField()
+    # the votes both members voted for or against in
+    votes = models.IntegerField(default=0)
 
     def __unicode__(self):
         return "%s - %s - %.0f" % (self.m1.name, self.m2.name, self.normalized_score)
 
 
+class CorrelationVote(models.Model):
+    """A vote whose ballots are counted in the Correlation rows, so adding
+    votes to them doesn't count a vote twice"""
+    vote_id = models.IntegerField(primary_key=True)
+
+
 class CoalitionMembership(models.Model):
     party = models.ForeignKey('Party',
                               related_name='coalition_memberships')
@@ -133,12 +142,7 @@ class Party(models.Model):
     def is_coalition_at(self, date):
         """Returns true is this party was a part of the coalition at the given
         date"""
-        memberships = CoalitionMembership.objects.filter(party=self)
-        for membership in memberships:
-            if (not membership.start_date or membership.start_date <= date) and \
-                    (not membership.end_date or membership.end_date >= date):
-                return True
-        return False
+        return membership_index().is_coalition_at(self.id, date)
 
     @models.permalink
     def get_absolute_url(self):
@@ -227,7 +231,7 @@ class Member(models.Model):
 
     backlinks_enabled = models.BooleanField(default=True)
 
-    objects = BetterManager()
+    objects = MemberManager()
     current_knesset = CurrentKnessetMembersManager()
 
     class Meta:
@@ -276,12 +280,10 @@ class Member(models.Model):
     def party_at(self, date):
         """Returns the party this memeber was at given date
         """
-        memberships = Membership.objects.filter(member=self).order_by('-start_date')
-        for membership in memberships:
-            if (not membership.start_date or membership.start_date <= date) and \
-                    (not membership.end_date or membership.end_date >= date):
-                return membership.party
-        return None
+        party_id = membership_index().party_id_at(self.id, date)
+        if party_id is None:
+            return None
+        return Party.objects.get(pk=party_id)
 
     def TotalVotesCount(self):
         return self.votes.exclude(voteaction__type='no-vote').count()
@@ -328,13 +330,13 @@ class Member(models.Model):
                 "%s (%.0f)" % (m.NameWithLink(), 100 * c.normalized_score))
         return ", ".join(strings)
 
-    def service_time(self):
+    def service_time(self, knesset_start=None):
         """returns the number of days this MK has been serving in the current
-           knesset
+           knesset, which started at knesset_start (looked up if not given)
         """
         if not self.start_date:
             return 0
-        d = Knesset.objects.current_knesset().start_date
+        d = knesset_start or Knesset.objects.current_knesset().start_date
         start_date = max(self.start_date, d)
         if self.is_current:
             end_date = date.today()
@@ -516,6 +518,35 @@ class WeeklyPresence(models.Model):
         self.member.recalc_average_weekly_presence_hours()
 
 
+RANKING_METRICS = (
+    ('bills_proposed', _('Bills proposed')),
+    ('bills_pre', _('Bills pre-approved')),
+    ('bills_first', _('Bills first-approved')),
+    ('bills_approved', _('Bills approved')),
+    ('votes', _('Votes per month')),
+    ('presence', _('Average weekly hours of presence')),
+    ('committees', _('Average monthly committee meetings')),
+    ('followers', _('Followers')),
+)
+
+
+class MemberRanking(models.Model):
+    """A member's value in one of the member list metrics, and rank among the
+    members of the current knesset (1 is the highest). Recalculated by the
+    refresh_member_rankings command"""
+    member = models.ForeignKey('Member', related_name='rankings')
+    metric = models.CharField(max_length=20, choices=RANKING_METRICS)
+    value = models.FloatField(null=True)
+    rank = models.IntegerField()
+
+    class Meta:
+        unique_together = (('member', 'metric'),)
+        index_together = [['metric', 'rank']]
+
+    def __unicode__(self):
+        return u"%s - %s - %d" % (self.member.name, self.metric, self.rank)
+
+
 class AwardType(models.Model):
     name = models.CharField(max_length=100)
     valence = models.FloatField(default=0)
@@ -0,0 +1,127 @@
+# encoding: utf-8
+'''
+Process wide trigram indexes of the names of the members and the parties,
+used to find them by names that are spelled a bit differently.
+
+Names are normalized first - niqqud, geresh and punctuation removed, final
+letters replaced by the regular ones - and split into character trigrams.
+The names sharing the most trigrams with the searched name are the
+candidates, and only those few are compared with difflib to rank them, so a
+search doesn't go over all the names.
+
+The indexes are reset by the listeners of the names, and other processes
+notice the change through a version kept in the cache.
+'''
+import difflib
+import re
+from collections import defaultdict
+from threading import Lock
+
+from knesset.cache import VersionedSingleton
+
+NAME_INDEX_VERSION_KEY = 'mks_name_index_version'
+
+FINAL_LETTERS = {
+    u'ך': u'כ',
+    u'ם': u'מ',
+    u'ן': u'נ',
+    u'ף': u'פ',
+    u'ץ': u'צ',
+}
+
+# niqqud and cantillation marks, geresh and gershayim, and quotes
+_REMOVED = re.compile(u'[\u0591-\u05bd\u05bf\u05c1\u05c2\u05c4\u05c5\u05c7'
+                      u'\u05f3\u05f4\'"`\u2018\u2019\u201c\u201d]')
+# maqaf, hyphens and the rest of the punctuation separate words
+_SEPARATORS = re.compile(r'[\W_]+', re.UNICODE)
+
+# candidates, by shared trigrams, that are compared with difflib
+CANDIDATES = 20
+
+
+def normalize_name(name):
+    "The name as it's indexed and searched"
+    if not isinstance(name, unicode):
+        name = name.decode('utf-8')
+    name = _REMOVED.sub(u'', name.lower())
+    name = u''.join(FINAL_LETTERS.get(c, c) for c in name)
+    return _SEPARATORS.sub(u' ', name).strip()
+
+
+def trigrams(normalized):
+    padded = u'  %s ' % normalized
+    return set(padded[i:i + 3] for i in xrange(len(padded) - 2))
+
+
+class NameIndex(object):
+    """Trigram index of names of objects, e.g. a member's name and its
+    alternative names"""
+
+    def __init__(self, names):
+        "names is an iterable of (name, object id)"
+        # normalized name -> object ids
+        self.objects = defaultdict(set)
+        self.name_trigrams = {}
+        self.index = defaultdict(list)
+        for name, object_id in names:
+            if not name or object_id is None:
+                continue
+            normalized = normalize_name(name)
+            if not normalized:
+                continue
+            if normalized not in self.name_trigrams:
+                self.name_trigrams[normalized] = grams = trigrams(normalized)
+                for gram in grams:
+                    self.index[gram].append(normalized)
+            self.objects[normalized].add(object_id)
+
+    def search(self, name, n=5, cutoff=0.5):
+        """Returns up to n (object id, score) of the objects with names like
+        name, best first, where a score of 1 is an exact match (after
+        normalization) and scores under cutoff aren't returned"""
+        normalized = normalize_name(name)
+        if normalized in self.objects:
+            return [(object_id, 1.0) for object_id in sorted(self.objects[normalized])]
+        grams = trigrams(normalized)
+        shared = defaultdict(int)
+        for gram in grams:
+            for candidate in self.index.get(gram, ()):
+                shared[candidate] += 1
+        # dice coefficient of the trigrams
+        candidates = sorted(
+            shared, reverse=True,
+            key=lambda c: 2.0 * shared[c] / (len(grams) + len(self.name_trigrams[c])))[:CANDIDATES]
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(normalized)
+        scores = {}
+        for candidate in candidates:
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            score = matcher.ratio()
+            if score < cutoff:
+                continue
+            for object_id in self.objects[candidate]:
+                scores[object_id] = max(score, scores.get(object_id, 0))
+        return sorted(scores.items(), key=lambda (object_id, score): (-score, object_id))[:n]
+
+
+# model name -> NameIndex, built when it's first searched
+_name_indexes = VersionedSingleton(NAME_INDEX_VERSION_KEY, dict)
+_name_indexes_lock = Lock()
+
+
+def name_index(manager):
+    """The process wide NameIndex of the indexed_names() of the manager's
+    model, rebuilt when the names changed"""
+    key = manager.model._meta.object_name
+    indexes = _name_indexes.get()
+    with _name_indexes_lock:
+        if key not in indexes:
+            indexes[key] = NameIndex(manager.indexed_names())
+        return indexes[key]
+
+
+def reset_name_indexes():
+    _name_indexes.reset()
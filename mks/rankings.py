@@ -0,0 +1,121 @@
+'''
+Materialized member rankings, for the member list stat pages and the
+members api.
+
+Each metric is computed for all the members of the current knesset with a
+query or two, instead of a few queries per member, and stored as a
+MemberRanking row per member - the value and the rank, 1 being the highest.
+Members without a value (e.g. no presence reports) are ranked as 0.
+'''
+from actstream.models import Follow
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from laws.models import MemberVotingStatistics
+from mks.models import Knesset, Member, MemberRanking, RANKING_METRICS
+from mks.statistics import reset_member_statistics
+
+# MemberRanking rows created at once
+BULK_SIZE = 1000
+
+
+def _per_month(counts, service_days, digits=None):
+    "{member_id: count per 30 days of service} of the members"
+    values = {}
+    for member_id, days in service_days.items():
+        value = 30.0 * counts.get(member_id, 0) / days if days else 0
+        values[member_id] = round(value, digits) if digits is not None else value
+    return values
+
+
+def metric_values(members, knesset_start):
+    """Returns {metric: {member_id: value}} of the members, with the same
+    values the Member methods give"""
+    members = list(members)
+    member_ids = [m.id for m in members]
+    values = {}
+    for metric, field in (('bills_proposed', 'bills_stats_proposed'),
+                          ('bills_pre', 'bills_stats_pre'),
+                          ('bills_first', 'bills_stats_first'),
+                          ('bills_approved', 'bills_stats_approved'),
+                          ('presence', 'average_weekly_presence_hours')):
+        values[metric] = dict((m.id, getattr(m, field)) for m in members)
+
+    service_days = dict((m.id, m.service_time(knesset_start)) for m in members)
+
+    votes = dict(MemberVotingStatistics.objects.filter(
+        member__in=member_ids).values_list('member_id', 'total_votes'))
+    values['votes'] = _per_month(votes, service_days)
+
+    meetings = dict(Member.objects.filter(
+        id__in=member_ids, committee_meetings__date__gt=knesset_start).annotate(
+            meetings=Count('committee_meetings')).values_list('id', 'meetings'))
+    values['committees'] = _per_month(meetings, service_days, digits=2)
+
+    followers = dict((m.id, 0) for m in members)
+    for object_id, count in Follow.objects.filter(
+            content_type=ContentType.objects.get_for_model(Member)).values_list(
+                'object_id').annotate(Count('id')):
+        member_id = int(object_id)
+        if member_id in followers:
+            followers[member_id] = count
+    values['followers'] = followers
+    return values
+
+
+def rank_values(values):
+    """Returns {member_id: rank} of {member_id: value}, the highest value
+    ranked 1 and equal values ranked the same"""
+    ranks = {}
+    ordered = sorted(values.items(), key=lambda (member_id, value): value or 0, reverse=True)
+    previous = None
+    for position, (member_id, value) in enumerate(ordered, 1):
+        value = value or 0
+        if value != previous:
+            current, previous = position, value
+        ranks[member_id] = current
+    return ranks
+
+
+def invalidate_member_lists():
+    for metric, _ in RANKING_METRICS:
+        cache.delete('object_list_by_%s' % metric)
+
+
+def refresh_member_rankings():
+    """Recalculates the rankings of the members of the current knesset, and
+    replaces the MemberRanking rows with them. Returns the number of rows
+    written"""
+    knesset = Knesset.objects.current_knesset()
+    if knesset is None:
+        return 0
+    members = Member.current_knesset.all()
+    rankings = []
+    for metric, values in metric_values(members, knesset.start_date).items():
+        ranks = rank_values(values)
+        rankings.extend(MemberRanking(member_id=member_id, metric=metric,
+                                      value=value, rank=ranks[member_id])
+                        for member_id, value in values.items())
+
+    with transaction.commit_on_success():
+        MemberRanking.objects.all().delete()
+        MemberRanking.objects.bulk_create(rankings, batch_size=BULK_SIZE)
+    invalidate_member_lists()
+    reset_member_statistics()
+    return len(rankings)
+
+
+def ranked_members(members, metric):
+    """Returns a list of the members ordered by their rank in metric, with
+    their value in ``extra``. Members that weren't ranked yet come last"""
+    rankings = dict((member_id, (rank, value)) for member_id, rank, value in
+                    MemberRanking.objects.filter(metric=metric).values_list(
+                        'member_id', 'rank', 'value'))
+    members = list(members)
+    unranked = (len(members) + 1, None)
+    for member in members:
+        member.rank, member.extra = rankings.get(member.id, unranked)
+    members.sort(key=lambda m: m.rank)
+    return members
@@ -0,0 +1,38 @@
+'''
+Generations of the data of the cached sections of the member page.
+
+The member page is built of sections - statistics, discipline, actions,
+agendas, etc. - each cached under a key that embeds the generations of the
+data it's made of, some per member (e.g. the member's vote actions) and some
+shared by all the members (e.g. the committee meetings). The listeners of that
+data bump its generation, so only the sections made of it miss, without having
+to know which keys exist. See knesset.generations.
+'''
+from knesset.generations import get_generation, bump_generation
+
+MEMBER_GENERATION_KEY = 'mk_%d_%s_generation'
+SHARED_GENERATION_KEY = 'mks_%s_generation'
+
+
+def member_generation(member_id, source):
+    "generation of a member's data, e.g. 'votes' for the member's vote actions"
+    return get_generation(MEMBER_GENERATION_KEY % (member_id, source))
+
+
+def bump_member_generation(member_id, source):
+    bump_generation(MEMBER_GENERATION_KEY % (member_id, source))
+
+
+def shared_generation(source):
+    "generation of data shown for all the members, e.g. 'committees'"
+    return get_generation(SHARED_GENERATION_KEY % source)
+
+
+def bump_shared_generation(source):
+    bump_generation(SHARED_GENERATION_KEY % source)
+
+
+def section_cache_key(member_id, section, generations):
+    "key of a section of a member page, made of data of these generations"
+    return 'mk_%d_%s_%s' % (member_id, section,
+                            '_'.join(str(g) for g in generations))
@@ -0,0 +1,90 @@
+'''
+Process wide distributions of the member statistics over the current members.
+
+The member page shows where a member stands in the presence and bill
+statistics, and the members api places each member on a presence scale. Both
+are answered from the mean, variance and sorted values of each statistic,
+computed once with a single query. They are reset when the member rankings
+are refreshed, and other processes notice the change through a version kept
+in the cache. They're also recomputed when they get older than MAX_AGE.
+'''
+from bisect import bisect_left
+
+from knesset.cache import VersionedSingleton
+
+from mks.utils import percentile
+
+MEMBER_STATISTICS_VERSION_KEY = 'mks_member_statistics_version'
+
+# the statistics are updated by the syncs and the admin too, not only when
+# the rankings are refreshed
+MAX_AGE = 5 * 60 * 60
+
+STATISTICS_FIELDS = (
+    'average_weekly_presence_hours',
+    'average_monthly_committee_presence',
+    'bills_stats_proposed',
+    'bills_stats_pre',
+    'bills_stats_first',
+    'bills_stats_approved',
+)
+
+
+class Distribution(object):
+    "The distribution of a statistic, members without a value counted as 0"
+
+    def __init__(self, values):
+        self.values = sorted(v or 0 for v in values)
+        count = len(self.values)
+        self.mean = float(sum(self.values)) / count if count else 0
+        self.variance = sum((v - self.mean) ** 2 for v in self.values) / count if count else 0
+
+    def percentile(self, value):
+        """The percentile of value, assuming the statistic is normally
+        distributed. 0 when all the members have the same value"""
+        if not self.variance:
+            return 0
+        return percentile(self.mean, self.variance, value or 0)
+
+    def bucket(self, value, scale):
+        """The place of value on a scale of 1 (lowest) to scale, by the
+        quantiles of the values. 0 for no value. Values above all of them,
+        e.g. of past members, are placed at the top"""
+        if not value or not self.values:
+            return 0
+        group_size = -(-len(self.values) // scale)
+        return min(scale, 1 + bisect_left(self.values, value) // group_size)
+
+
+class MemberStatistics(object):
+
+    def __init__(self):
+        from mks.models import Member
+
+        rows = Member.objects.filter(is_current=True).values_list(*STATISTICS_FIELDS)
+        columns = zip(*rows) or [()] * len(STATISTICS_FIELDS)
+        self.distributions = dict(zip(STATISTICS_FIELDS, map(Distribution, columns)))
+
+    def percentile(self, field, value):
+        return self.distributions[field].percentile(value)
+
+    def bucket(self, field, value, scale):
+        return self.distributions[field].bucket(value, scale)
+
+
+_member_statistics = VersionedSingleton(MEMBER_STATISTICS_VERSION_KEY,
+                                        MemberStatistics, MAX_AGE)
+
+
+def member_statistics():
+    "The process wide MemberStatistics, recomputed when they were reset"
+    return _member_statistics.get()
+
+
+def reset_member_statistics():
+    _member_statistics.reset()
+
+
+def member_statistics_version():
+    "The version of the member statistics, which changes when they're reset"
+    return _member_statistics.version()
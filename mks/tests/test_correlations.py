@@ -0,0 +1,72 @@
+# encoding: utf-8
+#
+import os
+import shutil
+import tempfile
+from datetime import date, datetime
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from laws.ballots import build_ballot_matrix, update_ballot_matrix
+from laws.models import Vote, VoteAction
+from mks.correlations import calculate_correlations
+from mks.models import Correlation, Member, Party
+
+
+class CorrelationsTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            BALLOT_MATRIX_PATH=os.path.join(self.tmp_dir, 'ballots.bin'))
+        self.settings_override.enable()
+        self.party_1 = Party.objects.create(name='party 1')
+        self.party_2 = Party.objects.create(name='party 2')
+        self.mk_1 = Member.objects.create(name='mk 1', current_party=self.party_1)
+        self.mk_2 = Member.objects.create(name='mk 2', current_party=self.party_1)
+        self.mk_3 = Member.objects.create(name='mk 3', current_party=self.party_2)
+        self.votes = []
+        for i, ballots in enumerate([('for', 'for', 'against'),
+                                     ('against', 'against', 'for'),
+                                     ('for', 'against', 'abstain')]):
+            vote = Vote.objects.create(title='vote %d' % i,
+                                       time=datetime(2012, 1, i + 1))
+            for mk, ballot in zip([self.mk_1, self.mk_2, self.mk_3], ballots):
+                VoteAction.objects.create(vote=vote, member=mk, type=ballot)
+            self.votes.append(vote)
+        build_ballot_matrix()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp_dir)
+
+    def correlation(self, m1, m2):
+        c = Correlation.objects.get(m1=m1, m2=m2)
+        return c.score, c.votes, c.normalized_score, c.not_same_party
+
+    def test_calculate_correlations(self):
+        self.assertEqual(calculate_correlations(), 6)
+        self.assertEqual(self.correlation(self.mk_1, self.mk_2), (1, 3, 1 / 3.0, False))
+        self.assertEqual(self.correlation(self.mk_2, self.mk_1), (1, 3, 1 / 3.0, False))
+        self.assertEqual(self.correlation(self.mk_1, self.mk_3), (-2, 2, -1.0, True))
+        self.assertEqual(self.mk_3.HighestCorrelations().count(), 2)
+
+        calculate_correlations(start=date(2012, 1, 2))
+        self.assertEqual(self.correlation(self.mk_1, self.mk_2), (0, 2, 0.0, False))
+
+    def test_incremental(self):
+        calculate_correlations(end=date(2012, 1, 3))
+        self.assertEqual(self.correlation(self.mk_1, self.mk_2), (2, 2, 1.0, False))
+        vote = Vote.objects.create(title='vote 4', time=datetime(2012, 1, 4))
+        VoteAction.objects.create(vote=vote, member=self.mk_1, type='for')
+        VoteAction.objects.create(vote=vote, member=self.mk_2, type='against')
+        update_ballot_matrix([vote])
+
+        calculate_correlations(vote_ids=[vote.id])
+        self.assertEqual(self.correlation(self.mk_2, self.mk_1), (1, 3, 1 / 3.0, False))
+        self.assertEqual(self.correlation(self.mk_1, self.mk_3), (-2, 2, -1.0, True))
+
+        # votes already counted, by a full pass or an earlier run, are skipped
+        self.assertEqual(calculate_correlations(vote_ids=[vote.id]), 0)
+        self.assertEqual(calculate_correlations(vote_ids=[self.votes[0].id]), 0)
+        self.assertEqual(self.correlation(self.mk_2, self.mk_1), (1, 3, 1 / 3.0, False))
@@ -1,10 +1,15 @@
+# encoding: utf-8
 import datetime
 
 from django.test import TestCase
 
 from laws.enums import BillStages
 from laws.models import Bill
-from mks.models import Knesset, Party, Member, Membership, MemberAltname
+from mks.models import (Knesset, Party, Member, Membership, MemberAltname,
+                        CoalitionMembership)
+from mks.name_index import name_index
+from mks.statistics import member_statistics, reset_member_statistics
+from persons.models import Person, PersonAlias
 from mks.tests.base import ten_days_ago, two_days_ago
 
 
@@ -44,6 +49,19 @@ class TestMember(TestCase):
         party_at = self.member.party_at(today.date())
         self.assertEqual(party_at, self.current_party)
 
+    def test_party_at_follows_membership_changes(self):
+        today = datetime.datetime.today()
+        Membership.objects.filter(member=self.member, party=self.current_party).delete()
+        self.assertEqual(self.member.party_at(today.date()), self.previous_party)
+
+    def test_is_coalition_at_follows_coalition_memberships(self):
+        today = datetime.date.today()
+        self.assertFalse(self.current_party.is_coalition_at(today))
+        CoalitionMembership.objects.create(party=self.current_party,
+                                           start_date=two_days_ago.date())
+        self.assertTrue(self.current_party.is_coalition_at(today))
+        self.assertFalse(self.current_party.is_coalition_at(ten_days_ago.date()))
+
     def test_member_names_includes_alt_names(self):
         m = Member(name='test member')
         self.assertEqual(m.names, ['test member'])
@@ -129,6 +147,45 @@ class TestMember(TestCase):
         self.assertEqual(self.member.bills_stats_first, 0)
         self.assertEqual(self.member.bills_stats_approved, 0)
 
+    def test_member_statistics_percentiles_and_buckets(self):
+        for hours in (10, 20, 30, 40):
+            Member.objects.create(name='member %d' % hours, average_weekly_presence_hours=hours)
+        reset_member_statistics()
+        statistics = member_statistics()
+
+        # member_1 has no presence, which counts as 0
+        self.assertEqual(statistics.percentile('average_weekly_presence_hours', 20), 50)
+        self.assertGreater(statistics.percentile('average_weekly_presence_hours', 40), 90)
+        self.assertEqual(statistics.percentile('bills_stats_proposed', 0), 0)
+        self.assertEqual([statistics.bucket('average_weekly_presence_hours', hours, 5)
+                          for hours in (None, 10, 25, 40, 50)], [0, 2, 4, 5, 5])
+
+    def test_find_member_by_similar_names(self):
+        member = Member.objects.create(name=u'ציפי לבני')
+        self.assertEqual(Member.objects.find(u'ציפי לבני'), [member])
+        # niqqud and final letters
+        self.assertEqual(Member.objects.find(u'צִיפִּי לִבְנִי'), [member])
+        self.assertEqual(Member.objects.find(u'ציפי לבנ'), [member])
+
+        MemberAltname.objects.create(member=member, name=u'ציפורה מלכה לבני')
+        PersonAlias.objects.create(name=u'לבני ציפי', person=Person.objects.get(mk=member))
+        self.assertEqual(Member.objects.find(u'ציפורה מלכה לבני'), [member])
+        self.assertEqual(Member.objects.find(u'לבני ציפי'), [member])
+
+        member.name = u'ציפי חוטובלי'
+        member.save()
+        self.assertEqual(Member.objects.find(u'ציפי חוטובלי'), [member])
+        self.assertEqual(Member.objects.find(u'xyz'), [])
+
+    def test_name_index_kept_by_saves_keeping_the_name(self):
+        index = name_index(Member.objects)
+        self.member.save()
+        self.current_party.save()
+        self.assertIs(name_index(Member.objects), index)
+        self.member.name = 'member_2'
+        self.member.save()
+        self.assertIsNot(name_index(Member.objects), index)
+
     def given_party_exists_in_knesset(self, party_name, knesset):
         party, create = Party.objects.get_or_create(name='{0}_{1}'.format(party_name, knesset.number),
                                                     knesset=knesset,
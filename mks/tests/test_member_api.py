@@ -5,6 +5,7 @@ from tastypie.test import ResourceTestCase
 
 from mks.managers import KnessetManager
 from mks.models import Knesset, Party, Member
+from mks.rankings import refresh_member_rankings
 from mmm.models import Document
 from persons.models import PersonAlias, Person
 
@@ -83,6 +84,19 @@ class MemberAPITestCase(ResourceTestCase):
         self.assertEqual(rmks['bills_stats_proposed'], 5)
         self.assertEqual(rmks['average_weekly_presence_hours'], 3.141)
 
+    def testMemberListByStatType(self):
+        mk_2 = Member.objects.create(name='mk_2', start_date=datetime.date(2010, 1, 1),
+                                     current_party=self.party_1, bills_stats_proposed=7)
+        refresh_member_rankings()
+
+        res = self.api_client.get('/api/v2/member/', data={'stat_type': 'bills_proposed'},
+                                  format='json')
+        self.assertValidJSONResponse(res)
+        objects = self.deserialize(res)['objects']
+        self.assertEqual([(x['id'], x['stat_value'], x['stat_rank']) for x in objects],
+                         [(mk_2.id, 7, 1), (self.mk_1.id, 5, 2)])
+        self.assertEqual([x['average_weekly_presence_rank'] for x in objects], [0, 2])
+
     def tearDown(self):
         super(MemberAPITestCase, self).tearDown()
         for mmm_doc in self.mmm_docs:
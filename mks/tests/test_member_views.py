@@ -1,4 +1,5 @@
 import datetime
+import json
 
 import feedparser
 from actstream import follow
@@ -6,10 +7,14 @@ from django.contrib.auth.models import User
 from django.contrib.sites.models import Site
 from django.core.urlresolvers import reverse
 from django.test import TestCase
+from django.test.utils import override_settings
 
 from committees.models import Committee
 from laws.models import Law, PrivateProposal, Bill, Vote, VoteAction
-from mks.models import Knesset, Party, Member
+from mks.models import Knesset, Party, Member, MemberAltname
+from persons.models import Person, PersonAlias
+from mks.rankings import refresh_member_rankings
+from agendas.models import Agenda
 from mks.tests.base import just_id
 
 
@@ -75,6 +80,22 @@ class MemberViewsTestCase(TestCase):
         object_list = res.context['object_list']
         self.assertItemsEqual(map(just_id, object_list), [self.mk_1.id, self.mk_2.id])
 
+    def testMemberListByRankings(self):
+        follow(self.jacob, self.mk_2)
+        refresh_member_rankings()
+
+        res = self.client.get(reverse('member-stats', kwargs={'stat_type': 'committees'}))
+        object_list = res.context['object_list']
+        self.assertEqual(map(just_id, object_list), [self.mk_1.id, self.mk_2.id])
+        self.assertEqual([x.extra for x in object_list], [6.0, 0])
+        self.assertEqual(res.context['max_current'], 6.0)
+        self.assertIn('stat_type=committees', res.context['csv_path'])
+
+        res = self.client.get(reverse('member-stats', kwargs={'stat_type': 'followers'}))
+        object_list = res.context['object_list']
+        self.assertEqual(map(just_id, object_list), [self.mk_2.id, self.mk_1.id])
+        self.assertEqual([x.extra for x in object_list], [1, 0])
+
     def testMemberDetail(self):
         res = self.client.get(reverse('member-detail', args=[self.mk_1.id]))
         self.assertTemplateUsed(res,
@@ -120,6 +141,55 @@ class MemberViewsTestCase(TestCase):
         res = self.client.get(mk_1_url)
         self.assertTrue(res.context['watched_member'])
 
+    def testMemberDetailEditorAgendas(self):
+        public = Agenda.objects.create(name='public agenda', public_owner_name='owner',
+                                       is_public=True)
+        private = Agenda.objects.create(name='private agenda', public_owner_name='owner')
+        private.editors.add(self.jacob)
+        mk_1_url = self.mk_1.get_absolute_url()
+        res = self.client.get(mk_1_url)
+        self.assertEqual([a.id for a in res.context['agendas']], [public.id])
+        self.assertTrue(self.client.login(username='jacob', password='JKM'))
+        res = self.client.get(mk_1_url)
+        self.assertEqual(set(a.id for a in res.context['agendas']), set([public.id, private.id]))
+
+    # the test settings use a dummy cache, which never keeps generations
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'member_sections'}})
+    def testMemberDetailSectionsFollowDataChanges(self):
+        mk_1_url = self.mk_1.get_absolute_url()
+        mk_2_url = self.mk_2.get_absolute_url()
+        mk_1_version = self.client.get(mk_1_url).context['sections_version']
+        mk_2_version = self.client.get(mk_2_url).context['sections_version']
+        self.assertEqual(self.client.get(mk_1_url).context['sections_version'], mk_1_version)
+
+        vote = Vote.objects.create(title='vote 2', time=datetime.datetime.now())
+        VoteAction.objects.create(member=self.mk_1, vote=vote, type='against',
+                                  party=self.party_1, against_party=True)
+        res = self.client.get(mk_1_url)
+        self.assertNotEqual(res.context['sections_version'], mk_1_version)
+        self.assertEqual(len(res.context['factional_discipline']), 1)
+        self.assertEqual(self.client.get(mk_2_url).context['sections_version'], mk_2_version)
+
+    def testMemberAutoComplete(self):
+        def suggested(query):
+            res = self.client.get(reverse('member-auto-complete'), {'query': query})
+            self.assertEqual(res.status_code, 200)
+            return [s['data']['id'] for s in json.loads(res.content)['suggestions']]
+
+        self.assertEqual(suggested('mk'), [self.mk_1.id, self.mk_2.id])
+        self.assertEqual(suggested('_2'), [self.mk_2.id])
+        MemberAltname.objects.create(member=self.mk_2, name='second mk')
+        PersonAlias.objects.create(name='another', person=Person.objects.get(mk=self.mk_1))
+        # prefixes first
+        self.assertEqual(suggested('mk'), [self.mk_1.id, self.mk_2.id])
+        self.assertEqual(suggested('second'), [self.mk_2.id])
+        self.assertEqual(suggested('anoth'), [self.mk_1.id])
+        self.mk_1.is_current = False
+        self.mk_1.save()
+        self.assertEqual(suggested('mk'), [self.mk_2.id])
+
     def testMemberActivityFeed(self):
         res = self.client.get(reverse('member-activity-feed',
                                       args=[self.mk_1.id]))
@@ -1,5 +1,6 @@
 import urllib
 import json
+import hashlib
 from operator import attrgetter
 from itertools import chain
 
@@ -10,7 +11,6 @@ from django.utils.translation import ugettext as _
 from django.http import HttpResponse, HttpResponseRedirect, Http404
 from django.views.generic import ListView, TemplateView, RedirectView
 from django.views.decorators.csrf import ensure_csrf_cookie
-from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.utils.decorators import method_decorator
 from django.contrib.contenttypes.models import ContentType
@@ -19,13 +19,18 @@ from backlinks.pingback.server import default_server
 from actstream import actor_stream
 from actstream.models import Follow
 from hashnav.detail import DetailView
+from knesset.cache import cache
 from laws.enums import BillStages
 from laws.enums import BillStages
 from laws.vote_choices import BILL_AGRR_STAGES
-from models import Member, Party, Knesset
-from utils import percentile
-from laws.models import MemberVotingStatistics, Bill, VoteAction
-from agendas.models import Agenda
+from models import Member, Party, Knesset, RANKING_METRICS
+from rankings import ranked_members
+from statistics import member_statistics, member_statistics_version
+from sections import member_generation, shared_generation, section_cache_key
+from autocomplete import member_autocomplete
+from laws.models import Bill, VoteAction
+from agendas.models import Agenda, get_top_bottom
+from agendas.generations import agendas_generation
 
 from persons.models import PersonAlias, Person
 
@@ -61,6 +66,8 @@ class MemberListView(ListView):
         ('followers', _('By number of followers')),
         ('graph', _('Graphical view'))
     ]
+    # the pages of the metrics in the member rankings
+    ranked_pages = dict(RANKING_METRICS)
 
     def get_queryset(self):
         return Member.current_knesset.all()
@@ -91,29 +98,15 @@ class MemberListView(ListView):
         context['title'] = dict(self.pages)[info]
         context[
             'csv_path'] = self._resolve_csv_export_request()
-        context['past_mks'] = Member.current_knesset.filter(is_current=False)
+        context['past_mks'] = Member.current_knesset.filter(
+            is_current=False).select_related('current_party')
 
         # We make sure qs are lists so that the template can get min/max
-        if info == 'abc':
-            pass
-        elif info == 'bills_proposed':
-            qs = self._get_by_bills_proposed(context, qs)
-        elif info == 'bills_pre':
-            qs = self._get_by_bills_pre(context, qs)
-        elif info == 'bills_first':
-            qs = self._get_by_bills_first(context, qs)
-        elif info == 'bills_approved':
-            qs = self._get_by_bills_approved(context, qs)
-        elif info == 'votes':
-            qs = self._get_by_votes(context, qs)
-        elif info == 'presence':
-            qs = self._get_by_presence(context, qs)
-        elif info == 'committees':
-            qs = self._get_by_committees(context, qs)
-        elif info == 'followers':
-            qs = self._get_by_followers(context, qs)
-        elif info == 'graph':
-            pass
+        if info in self.ranked_pages:
+            qs = ranked_members(qs, info)
+            context['past_mks'] = ranked_members(context['past_mks'], info)
+            if info.startswith('bills_'):
+                context['bill_stage'] = info[len('bills_'):]
 
         context['object_list'] = qs
 
@@ -127,118 +120,11 @@ class MemberListView(ListView):
         original_context.update(context)
         return original_context
 
-    def _get_by_followers(self, context, qs):
-        mct = ContentType.objects.get_for_model(Member)
-        mk_follows = Follow.objects.filter(content_type=mct).values_list(
-            'object_id', flat=True)
-        mk_follows_dict = {}
-        for mf in mk_follows:
-            mk_follows_dict[mf] = mk_follows_dict.get(mf, 0) + 1
-        qs = list(qs)
-        for x in qs:
-            x.extra = mk_follows_dict.get(x.id, 0)
-        qs.sort(key=lambda x: x.extra or 0, reverse=True)
-        context['past_mks'] = list(context['past_mks'])
-        for x in context['past_mks']:
-            x.extra = mk_follows_dict.get(x.id, 0)
-        context['past_mks'].sort(key=lambda x: x.extra or 0, reverse=True)
-        return qs
-
-    def _get_by_committees(self, context, qs):
-        qs = list(qs)
-        for x in qs:
-            x.extra = x.committee_meetings_per_month()
-        qs.sort(key=lambda x: x.extra or 0, reverse=True)
-        context['past_mks'] = list(context['past_mks'])
-        for x in context['past_mks']:
-            x.extra = x.committee_meetings_per_month()
-        context['past_mks'].sort(key=lambda x: x.extra or 0, reverse=True)
-        return qs
-
-    def _get_by_presence(self, context, qs):
-        qs = qs.extra(select={'extra': 'average_weekly_presence_hours'}
-                      ).order_by('-extra')
-        context['past_mks'] = context['past_mks'].extra(
-            select={'extra': 'average_weekly_presence_hours'}).order_by(
-            '-extra')
-        # sort again because db sort freaks when some values are None.
-        qs = list(qs)
-        qs.sort(key=lambda x: x.extra or 0, reverse=True)
-        context['past_mks'] = list(context['past_mks'])
-        context['past_mks'].sort(key=lambda x: x.extra or 0, reverse=True)
-        return qs
-
-    def _get_by_votes(self, context, qs):
-        qs = list(qs)
-        vs = list(MemberVotingStatistics.objects.all())
-        vs = dict(zip([x.member_id for x in vs], vs))
-        for x in qs:
-            x.extra = vs[x.id].average_votes_per_month()
-        qs.sort(key=lambda x: x.extra, reverse=True)
-        context['past_mks'] = list(context['past_mks'])
-        for x in context['past_mks']:
-            x.extra = x.voting_statistics.average_votes_per_month()
-        context['past_mks'].sort(key=lambda x: x.extra, reverse=True)
-        return qs
-
     def _resolve_csv_export_request(self):
-        return 'api/v2/member' + '?' + self.request.GET.urlencode() + '&format=csv&limit=0'
-
-    def _get_by_bills_proposed(self, context, qs):
-        qs = list(
-            qs.order_by('-bills_stats_proposed')
-                .select_related('current_party')
-                .extra(select={'extra': 'bills_stats_proposed'})
-        )
-        context['past_mks'] = list(
-            context['past_mks'].order_by('-bills_stats_proposed')
-                .select_related('current_party')
-                .extra(select={'extra': 'bills_stats_proposed'})
-        )
-        context['bill_stage'] = 'proposed'
-        return qs
-
-    def _get_by_bills_approved(self, context, qs):
-        qs = list(
-            qs.order_by('-bills_stats_approved')
-                .select_related('current_party')
-                .extra(select={'extra': 'bills_stats_approved'})
-        )
-        context['past_mks'] = list(
-            context['past_mks'].order_by('-bills_stats_approved')
-                .select_related('current_party')
-                .extra(select={'extra': 'bills_stats_approved'})
-        )
-        context['bill_stage'] = 'approved'
-        return qs
-
-    def _get_by_bills_first(self, context, qs):
-        qs = list(
-            qs.order_by('-bills_stats_first')
-                .select_related('current_party')
-                .extra(select={'extra': 'bills_stats_first'})
-        )
-        context['past_mks'] = list(
-            context['past_mks'].order_by('-bills_stats_first')
-                .select_related('current_party')
-                .extra(select={'extra': 'bills_stats_first'})
-        )
-        context['bill_stage'] = 'first'
-        return qs
-
-    def _get_by_bills_pre(self, context, qs):
-        qs = list(
-            qs.order_by('-bills_stats_pre')
-                .select_related('current_party')
-                .extra(select={'extra': 'bills_stats_pre'})
-        )
-        context['past_mks'] = list(
-            context['past_mks'].order_by('-bills_stats_pre')
-                .select_related('current_party')
-                .extra(select={'extra': 'bills_stats_pre'})
-        )
-        context['bill_stage'] = 'pre'
-        return qs
+        params = self.request.GET.copy()
+        if self.kwargs['stat_type'] in self.ranked_pages:
+            params['stat_type'] = self.kwargs['stat_type']
+        return 'api/v2/member' + '?' + params.urlencode() + '&format=csv&limit=0'
 
 
 class MemberCsvView(CsvView):
@@ -271,30 +157,9 @@ class MemberDetailView(DetailView):
         return super(MemberDetailView, self).dispatch(*args, **kwargs)
 
     def calc_percentile(self, member, outdict, inprop, outvalprop, outpercentileprop):
-        # store in instance var if needed, no need to access cache for each
-        # call.
-        #
-        # If not found in the instance, than try to get from cache (and set if
-        # not found), plus setting it as an instance var. Also removes default
-        # ordering by name (we don't need it)
-        all_members = getattr(self, '_all_members', None)
-
-        if not all_members:
-            all_members = cache.get('all_members', None)
-            if not all_members:
-                self._all_members = all_members = list(
-                    Member.objects.filter(is_current=True).order_by().values())
-                cache.set('all_members', all_members, settings.LONG_CACHE_TIME)
-
-        member_count = float(len(all_members))
         member_val = getattr(member, inprop) or 0
-
-        avg = sum(x[inprop] or 0 for x in all_members) / member_count
-
-        var = sum(((x[inprop] or 0) - avg) ** 2 for x in all_members) / member_count
-
         outdict[outvalprop] = member_val
-        outdict[outpercentileprop] = percentile(avg, var, member_val) if var != 0 else 0
+        outdict[outpercentileprop] = member_statistics().percentile(inprop, member_val)
 
     def calc_bill_stats(self, member, bills_statistics, stattype):
         self.calc_percentile(member,
@@ -304,198 +169,268 @@ class MemberDetailView(DetailView):
                              '%s_percentile' % stattype)
 
     def get_agenda_data(self, member):
-        if self.request.user.is_authenticated():
-            agendas = Agenda.objects.get_selected_for_instance(
-                member, user=self.request.user, top=3, bottom=3)
-        else:
-            agendas = Agenda.objects.get_selected_for_instance(
-                member, user=None, top=3, bottom=3)
+        "The agendas of the member, as anonymous users see them"
+        agendas = Agenda.objects.get_selected_for_instance(
+            member, user=None, top=3, bottom=3)
         agendas = agendas['top'] + agendas['bottom']
         for agenda in agendas:
             agenda.watched = False
             agenda.totals = agenda.get_mks_totals(member)
-        if self.request.user.is_authenticated():
-            watched_agendas = self.request.user.profiles.get().agendas
-            for watched_agenda in watched_agendas:
-                if watched_agenda in agendas:
-                    agendas[agendas.index(watched_agenda)].watched = True
-                else:
-                    watched_agenda.score = watched_agenda.member_score(
-                        member)
-                    watched_agenda.watched = True
-                    agendas.append(watched_agenda)
         agendas.sort(key=attrgetter('score'), reverse=True)
         return agendas
 
+    def watch_agendas(self, member, agendas, user, watched_agendas):
+        """Adds the user's bits to the public agendas of the member: the non
+        public agendas the user edits are selected among them like
+        get_selected_for_instance does, the agendas the user watches are
+        marked, and the watched agendas that aren't among them added"""
+        editable = list(Agenda.objects.get_relevant_for_user(user).filter(is_public=False))
+        if editable:
+            scores = Agenda.objects.scores_for_instances(editable, [member])
+            for agenda in editable:
+                agenda.score = scores[agenda.id][member.id]
+                agenda.significance = agenda.score * agenda.num_followers
+                agenda.watched = False
+                agenda.totals = agenda.get_mks_totals(member)
+            # the public agendas left out of the section can't be selected
+            # among more agendas either
+            selected = get_top_bottom(sorted(agendas + editable, key=attrgetter('significance')), 3, 3)
+            agendas = selected['top'] + selected['bottom']
+        for watched_agenda in watched_agendas:
+            if watched_agenda in agendas:
+                agendas[agendas.index(watched_agenda)].watched = True
+            else:
+                watched_agenda.score = watched_agenda.member_score(
+                    member)
+                watched_agenda.watched = True
+                agendas.append(watched_agenda)
+        agendas.sort(key=attrgetter('score'), reverse=True)
+        return agendas
+
+    def get_sections(self, member):
+        """The cached sections of the page, as (name, generations of the data
+        it's made of, function building its context from the member)"""
+        member_id = member.id
+        return [
+            ('profile', (member_generation(member_id, 'member'), member_statistics_version()),
+             self.get_profile_section),
+            ('discipline', (member_generation(member_id, 'member'), member_generation(member_id, 'votes')),
+             self.get_discipline_section),
+            ('agendas', (agendas_generation(), member_generation(member_id, 'votes')),
+             self.get_agendas_section),
+            ('videos', (shared_generation('videos'),),
+             self.get_videos_section),
+            ('actions', (member_generation(member_id, 'actions'),),
+             self.get_actions_section),
+            ('committees', (shared_generation('committees'),),
+             self.get_committees_section),
+            ('mmm', (shared_generation('mmm'),),
+             self.get_mmm_section),
+            ('followers', (member_generation(member_id, 'followers'),),
+             self.get_followers_section),
+        ]
+
+    def get_profile_section(self, member):
+        presence = {}
+        self.calc_percentile(member, presence,
+                             'average_weekly_presence_hours',
+                             'average_weekly_presence_hours',
+                             'average_weekly_presence_hours_percentile')
+        self.calc_percentile(member, presence,
+                             'average_monthly_committee_presence',
+                             'average_monthly_committee_presence',
+                             'average_monthly_committee_presence_percentile')
+
+        bills_statistics = {}
+        self.calc_bill_stats(member, bills_statistics, 'proposed')
+        self.calc_bill_stats(member, bills_statistics, 'pre')
+        self.calc_bill_stats(member, bills_statistics, 'first')
+        self.calc_bill_stats(member, bills_statistics, 'approved')
+
+        # since parties are prefetch_releated, will list and slice them
+        previous_parties = list(member.parties.all())[1:]
+        return {
+            'bills_statistics': bills_statistics,
+            'presence': presence,
+            'previous_parties': previous_parties,
+        }
+
+    def get_discipline_section(self, member):
+        d = Knesset.objects.current_knesset().start_date
+        factional_discipline = VoteAction.objects.select_related(
+            'vote').filter(member=member,
+                           against_party=True,
+                           vote__time__gt=d)
+
+        votes_against_own_bills = VoteAction.objects.select_related(
+            'vote').filter(member=member,
+                           against_own_bill=True,
+                           vote__time__gt=d)
+
+        general_discipline_params = {'member': member, 'vote__time__gt': d}
+        is_coalition = member.current_party.is_coalition
+        if is_coalition:
+            general_discipline_params['against_coalition'] = True
+        else:
+            general_discipline_params['against_opposition'] = True
+        general_discipline = VoteAction.objects.filter(
+            **general_discipline_params).select_related('vote')
+        return {
+            'factional_discipline': list(factional_discipline),
+            'votes_against_own_bills': list(votes_against_own_bills),
+            'general_discipline': list(general_discipline),
+        }
+
+    def get_agendas_section(self, member):
+        return {'agendas': self.get_agenda_data(member)}
+
+    def get_videos_section(self, member):
+        about_videos = get_videos_queryset(member, group='about')[:1]
+        if len(about_videos):
+            about_video = about_videos[0]
+            about_video_embed_link = about_video.embed_link
+            about_video_image_link = about_video.image_link
+        else:
+            about_video_embed_link = ''
+            about_video_image_link = ''
+
+        related_videos = get_videos_queryset(member, group='related')
+        related_videos = list(related_videos.filter(
+            Q(published__gt=date.today() - timedelta(days=30))
+            | Q(sticky=True)
+        ).order_by('sticky').order_by('-published')[:5])
+        return {
+            'about_video_embed_link': about_video_embed_link,
+            'about_video_image_link': about_video_image_link,
+            'related_videos': related_videos,
+            'num_related_videos': len(related_videos),
+        }
+
+    def get_actions_section(self, member):
+        actions = actor_stream(member)
+
+        legislation_actions = actor_stream(member).filter(
+            verb__in=('proposed', 'joined'))
+
+        # this ugly code groups all the committee actions according to plenum and committee
+        # it stop iterating when both committee and plenum actions reach the maximum (MEMBER_INITIAL_DATA)
+        # it also stops iterating when reaching 20 iterations
+        committee_actions_more = {'committee': False, 'plenum': False}
+        committee_actions = {'committee': [], 'plenum': []}
+        i = 0
+        for action in actor_stream(member).filter(verb='attended'):
+            i = i + 1
+            if i == 20:
+                break
+            committee_type = (action and action.target and
+                              action.target.committee and
+                              action.target.committee.type)
+            if committee_type in ['plenum', 'committee']:
+                if len(committee_actions[committee_type]) == self.MEMBER_INITIAL_DATA:
+                    committee_actions_more[committee_type] = True
+                    if committee_actions_more['plenum'] == True and committee_actions_more[
+                        'committee'] == True:
+                        break
+                else:
+                    committee_actions[committee_type].append(action)
+
+        protocol_part_annotation_actions = Action.objects.filter(
+            actor_content_type=ContentType.objects.get_for_model(Person),
+            actor_object_id__in=member.person.values_list('pk', flat=True),
+            verb='got annotation for protocol part'
+        )
+
+        initial_actions = list(actions[:self.MEMBER_INITIAL_DATA])
+        for a in initial_actions:
+            a.actor = member
+        return {
+            'actions_more': actions.count() > self.MEMBER_INITIAL_DATA,
+            'actions': initial_actions,
+            'legislation_actions_more': legislation_actions.count() > self.MEMBER_INITIAL_DATA,
+            'legislation_actions': list(legislation_actions[:self.MEMBER_INITIAL_DATA]),
+            'committee_actions_more': committee_actions_more['committee'],
+            'committee_actions': committee_actions['committee'],
+            'plenum_actions_more': committee_actions_more['plenum'],
+            'plenum_actions': committee_actions['plenum'],
+            'protocol_part_annotation_actions': list(protocol_part_annotation_actions),
+        }
+
+    def get_committees_section(self, member):
+        committees_presence = []
+        has_protocols_not_published = False
+        committees = chain(member.committees.all(),
+                           member.chaired_committees.all(),
+                           )
+        for committee in committees:
+            committee_member = committee.members_by_presence(ids=[member.id])[0]
+            committees_presence.append({"committee": committee,
+                                        "presence": committee_member.meetings_percentage})
+            if committee.protocol_not_published:
+                has_protocols_not_published = True
+
+        committees_presence.sort(cmp=lambda x, y: y["presence"] - x["presence"])
+        return {
+            'committees_presence': committees_presence,
+            'has_protocols_not_published': has_protocols_not_published,
+        }
+
+    def get_mmm_section(self, member):
+        mmm_documents = member.mmm_documents.order_by('-publication_date')
+        return {
+            'mmm_documents_more': mmm_documents.count() > self.MEMBER_INITIAL_DATA,
+            'mmm_documents': list(mmm_documents[:self.MEMBER_INITIAL_DATA]),
+        }
+
+    def get_followers_section(self, member):
+        content_type = ContentType.objects.get_for_model(Member)
+        num_followers = Follow.objects.filter(
+            object_id=member.pk,
+            content_type=content_type).count()
+        return {'num_followers': num_followers}
+
     def get_context_data(self, **kwargs):
         context = super(MemberDetailView, self).get_context_data(**kwargs)
         member = context['object']
-        d = Knesset.objects.current_knesset().start_date
+
+        # the sections are shared by all the users, each cached for the
+        # current generations of its data
+        versions = []
+        for section, generations, build in self.get_sections(member):
+            key = section_cache_key(member.id, section, generations)
+            section_context = cache.get(key)
+            if section_context is None:
+                section_context = build(member)
+                cache.set(key, section_context, settings.LONG_CACHE_TIME)
+            context.update(section_context)
+            versions.append(key)
+
+        context.update({
+            'current_knesset_start_date': date(2009, 2, 24),
+            'INITIAL_DATA': self.MEMBER_INITIAL_DATA,
+            'watched_member': False,
+            # the template caches the page by these
+            'sections_version': hashlib.md5('|'.join(versions)).hexdigest(),
+            'agendas_user_key': 0,
+        })
+
+        # and the user's bits are added on top of them
         if self.request.user.is_authenticated():
             p = self.request.user.profiles.get()
-            watched = member in p.members
-            cached_context = None
-        else:
-            watched = False
-            cached_context = cache.get('mk_%d' % member.id)
-
-        if cached_context is None:
-            presence = {}
-            self.calc_percentile(member, presence,
-                                 'average_weekly_presence_hours',
-                                 'average_weekly_presence_hours',
-                                 'average_weekly_presence_hours_percentile')
-            self.calc_percentile(member, presence,
-                                 'average_monthly_committee_presence',
-                                 'average_monthly_committee_presence',
-                                 'average_monthly_committee_presence_percentile')
-
-            bills_statistics = {}
-            self.calc_bill_stats(member, bills_statistics, 'proposed')
-            self.calc_bill_stats(member, bills_statistics, 'pre')
-            self.calc_bill_stats(member, bills_statistics, 'first')
-            self.calc_bill_stats(member, bills_statistics, 'approved')
-
-            agendas = self.get_agenda_data(member)
-
-            factional_discipline = VoteAction.objects.select_related(
-                'vote').filter(member=member,
-                               against_party=True,
-                               vote__time__gt=d)
-
-            votes_against_own_bills = VoteAction.objects.select_related(
-                'vote').filter(member=member,
-                               against_own_bill=True,
-                               vote__time__gt=d)
-
-            general_discipline_params = {'member': member, 'vote__time__gt': d}
-            is_coalition = member.current_party.is_coalition
-            if is_coalition:
-                general_discipline_params['against_coalition'] = True
-            else:
-                general_discipline_params['against_opposition'] = True
-            general_discipline = VoteAction.objects.filter(
-                **general_discipline_params).select_related('vote')
-
-            about_videos = get_videos_queryset(member, group='about')[:1]
-            if len(about_videos):
-                about_video = about_videos[0]
-                about_video_embed_link = about_video.embed_link
-                about_video_image_link = about_video.image_link
-            else:
-                about_video_embed_link = ''
-                about_video_image_link = ''
-
-            related_videos = get_videos_queryset(member, group='related')
-            related_videos = related_videos.filter(
-                Q(published__gt=date.today() - timedelta(days=30))
-                | Q(sticky=True)
-            ).order_by('sticky').order_by('-published')[:5]
-
-            actions = actor_stream(member)
-
-            for a in actions:
-                a.actor = member
-
-            legislation_actions = actor_stream(member).filter(
-                verb__in=('proposed', 'joined'))
-
-            # this ugly code groups all the committee actions according to plenum and committee
-            # it stop iterating when both committee and plenum actions reach the maximum (MEMBER_INITIAL_DATA)
-            # it also stops iterating when reaching 20 iterations
-            committee_actions_more = {'committee': False, 'plenum': False}
-            committee_actions = {'committee': [], 'plenum': []}
-            i = 0
-            for action in actor_stream(member).filter(verb='attended'):
-                i = i + 1
-                if i == 20:
-                    break
-                committee_type = (action and action.target and
-                                  action.target.committee and
-                                  action.target.committee.type)
-                if committee_type in ['plenum', 'committee']:
-                    if len(committee_actions[committee_type]) == self.MEMBER_INITIAL_DATA:
-                        committee_actions_more[committee_type] = True
-                        if committee_actions_more['plenum'] == True and committee_actions_more[
-                            'committee'] == True:
-                            break
-                    else:
-                        committee_actions[committee_type].append(action)
-
-            committees_presence = []
-            has_protocols_not_published = False
-            committees = chain(member.committees.all(),
-                               member.chaired_committees.all(),
-                               )
-            for committee in committees:
-                committee_member = committee.members_by_presence(ids=[member.id])[0]
-                committees_presence.append({"committee": committee,
-                                            "presence": committee_member.meetings_percentage})
-                if committee.protocol_not_published:
-                    has_protocols_not_published = True
-
-            committees_presence.sort(cmp=lambda x, y: y["presence"] - x["presence"])
-
-            mmm_documents = member.mmm_documents.order_by('-publication_date')
-
-            content_type = ContentType.objects.get_for_model(Member)
-            num_followers = Follow.objects.filter(
-                object_id=member.pk,
-                content_type=content_type).count()
-
-            protocol_part_annotation_actions = Action.objects.filter(
-                actor_content_type=ContentType.objects.get_for_model(Person),
-                actor_object_id__in=member.person.values_list('pk', flat=True),
-                verb='got annotation for protocol part'
-            )
-
-            # since parties are prefetch_releated, will list and slice them
-            previous_parties = list(member.parties.all())[1:]
-            cached_context = {
-                'watched_member': watched,
-                'num_followers': num_followers,
-                'actions_more': actions.count() > self.MEMBER_INITIAL_DATA,
-                'actions': actions[:self.MEMBER_INITIAL_DATA],
-                'legislation_actions_more': legislation_actions.count() > self.MEMBER_INITIAL_DATA,
-                'legislation_actions': legislation_actions[:self.MEMBER_INITIAL_DATA],
-                'committee_actions_more': committee_actions_more['committee'],
-                'committee_actions': committee_actions['committee'],
-                'plenum_actions_more': committee_actions_more['plenum'],
-                'plenum_actions': committee_actions['plenum'],
-                'mmm_documents_more': mmm_documents.count() > self.MEMBER_INITIAL_DATA,
-                'mmm_documents': mmm_documents[:self.MEMBER_INITIAL_DATA],
-                'bills_statistics': bills_statistics,
-                'agendas': agendas,
-                'presence': presence,
-                'current_knesset_start_date': date(2009, 2, 24),
-                'factional_discipline': factional_discipline,
-                'votes_against_own_bills': votes_against_own_bills,
-                'general_discipline': general_discipline,
-                'about_video_embed_link': about_video_embed_link,
-                'about_video_image_link': about_video_image_link,
-                'related_videos': related_videos,
-                'num_related_videos': related_videos.count(),
-                'INITIAL_DATA': self.MEMBER_INITIAL_DATA,
-                'previous_parties': previous_parties,
-                'committees_presence': committees_presence,
-                'protocol_part_annotation_actions': protocol_part_annotation_actions,
-                'has_protocols_not_published': has_protocols_not_published,
-            }
-
-            if not self.request.user.is_authenticated():
-                cache.set('mk_%d' % member.id, cached_context,
-                          settings.LONG_CACHE_TIME)
-
-        context.update(cached_context)
+            context['watched_member'] = member in p.members
+            if 'agendas' in context:
+                context['agendas'] = self.watch_agendas(member, context['agendas'],
+                                                        self.request.user, p.agendas)
+                context['agendas_user_key'] = self.request.user.id
         return context
 
 
 class MemberEmbedView(MemberDetailView):
     template_name = 'mks/member_embed.html'
 
-    def get_agenda_data(self, member):
-        ''' we don't need this data is too speed things up we return nothing '''
-        return {}
+    def get_sections(self, member):
+        ''' we don't need the agendas, to speed things up we skip them '''
+        return [section for section in super(MemberEmbedView, self).get_sections(member)
+                if section[0] != 'agendas']
 
 
 class PartyRedirectView(RedirectView):
@@ -533,8 +468,8 @@ class PartyListView(ListView):
 
         info = self.kwargs['stat_type']
 
-        context['coalition'] = qs.filter(is_coalition=True)
-        context['opposition'] = qs.filter(is_coalition=False)
+        context['coalition'] = qs.filter(is_coalition=True).select_related('voting_statistics')
+        context['opposition'] = qs.filter(is_coalition=False).select_related('voting_statistics')
 
         context['friend_pages'] = self.pages
         context['stat_type'] = info
@@ -794,14 +729,8 @@ def member_auto_complete(request):
     if not 'query' in request.GET:
         raise Http404
 
-    _suggestions = list(Member.objects.values('name', 'id', 'img_url', 'gender', 'is_current').filter(
-        name__icontains=request.GET['query'], is_current=True)[:30])
-
-    def _add_value(serialized_member):
-        result = {'value': serialized_member['name'], 'data': serialized_member}
-        return result
-
-    suggestions = map(lambda x: _add_value(x), _suggestions)
+    suggestions = [{'value': member['name'], 'data': member}
+                   for _, member in member_autocomplete.suggest(request.GET['query'])]
     result = {'query': request.GET['query'], 'suggestions': suggestions}
 
     return HttpResponse(json.dumps(result), mimetype='application/json')
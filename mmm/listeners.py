@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from mks.sections import bump_shared_generation
+from models import Document
+
+
+def bump_mmm_documents(sender, **kwargs):
+    "The member page shows the member's latest documents"
+    bump_shared_generation('mmm')
+post_save.connect(bump_mmm_documents, sender=Document)
+post_delete.connect(bump_mmm_documents, sender=Document)
+m2m_changed.connect(bump_mmm_documents, sender=Document.req_mks.through)
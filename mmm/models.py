@@ -118,3 +118,5 @@ class Document(models.Model):
         return self.title
 
 
+# force signal connections
+from listeners import *
@@ -0,0 +1,43 @@
+'''
+Process wide automaton of the tag keyphrases, used to tag votes by their
+titles.
+
+It's reset by the TagKeyphrase listeners, and other processes notice the
+change through a version kept in the cache.
+'''
+import re
+
+from auxiliary.models import TagKeyphrase
+from knesset.automaton import KeywordAutomaton
+from knesset.cache import VersionedSingleton
+from knesset.utils import trans_clean
+
+KEYPHRASES_VERSION_KEY = 'ok_tag_keyphrases_version'
+
+
+def clean_vote_title(title):
+    "The vote title as keyphrases are matched against it"
+    t = title.translate(trans_clean)
+    t = re.sub(' . ', ' ', t)  # remove single char 'words'
+    return re.sub(' +', ' ', t)  # unify blocks of spaces
+
+
+def build_keyphrase_automaton(keyphrases=None):
+    """Returns a KeywordAutomaton of the phrases of keyphrases (all of them
+    by default) to their tag ids"""
+    if keyphrases is None:
+        keyphrases = TagKeyphrase.objects.all()
+    return KeywordAutomaton(keyphrases.values_list('phrase', 'tag_id'))
+
+
+_keyphrase_automaton = VersionedSingleton(KEYPHRASES_VERSION_KEY,
+                                          build_keyphrase_automaton)
+
+
+def keyphrase_automaton():
+    "The process wide keyphrase automaton, rebuilt when the keyphrases changed"
+    return _keyphrase_automaton.get()
+
+
+def reset_keyphrase_automaton():
+    _keyphrase_automaton.reset()
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from optparse import make_option
+
+from auxiliary.models import TagKeyphrase
+from laws.models import Vote
+from ok_tag.models import tag_votes
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Tag all the votes by the keyphrases found in their titles"
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--keyphrase-ids', dest='keyphrase_ids', default=None,
+            help='Tag only by these keyphrases, comma separated'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        keyphrases = None
+        if options['keyphrase_ids']:
+            try:
+                keyphrase_ids = [int(x) for x in options['keyphrase_ids'].split(',')]
+            except ValueError:
+                raise CommandError('--keyphrase-ids should be comma separated ids')
+            keyphrases = TagKeyphrase.objects.filter(id__in=keyphrase_ids)
+        added = tag_votes(Vote.objects.all(), keyphrases=keyphrases)
+        logger.info(u'Added {0} vote tags'.format(added))
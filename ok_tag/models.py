@@ -1,12 +1,150 @@
-import re
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import local
 
 from django.contrib.contenttypes.models import ContentType
 from django.db.models.signals import post_save, post_delete
-from tagging.models import TaggedItem, Tag
+from tagging.models import TaggedItem
 
 from auxiliary.models import TagKeyphrase
-from committees.models import CommitteeMeeting
-from knesset.utils import trans_clean
+from knesset.utils import disable_for_loaddata
+from keyphrases import keyphrase_automaton, build_keyphrase_automaton, \
+    clean_vote_title, reset_keyphrase_automaton
+
+
+def _add_tagged_items(ctype, pairs):
+    """Inserts the (tag id, object id) tagged items of ctype that don't exist
+    yet, and returns how many were added"""
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    existing = set(TaggedItem.objects.filter(
+        content_type=ctype,
+        object_id__in=set(object_id for _, object_id in pairs)).values_list('tag', 'object_id'))
+    new = pairs - existing
+    TaggedItem.objects.bulk_create([TaggedItem(tag_id=tag_id, content_type=ctype, object_id=object_id)
+                                    for tag_id, object_id in new])
+    return len(new)
+
+
+def _remove_tagged_items(ctype, pairs):
+    """Deletes the (tag id, object id) tagged items of ctype, and returns how
+    many were deleted"""
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    ids = [ti_id for ti_id, tag_id, object_id in TaggedItem.objects.filter(
+        content_type=ctype,
+        object_id__in=set(object_id for _, object_id in pairs)).values_list('id', 'tag', 'object_id')
+        if (tag_id, object_id) in pairs]
+    TaggedItem.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+# the bill fields whose objects get the tags of the bill
+BILL_RELATED_FIELDS = (('pre_votes', ('laws', 'vote')),
+                       ('first_vote', ('laws', 'vote')),
+                       ('approval_vote', ('laws', 'vote')),
+                       ('first_committee_meetings', ('committees', 'committeemeeting')),
+                       ('second_committee_meetings', ('committees', 'committeemeeting')))
+
+# bills are looked up in chunks of this size when propagating their tags
+BILLS_CHUNK_SIZE = 500
+
+
+def bill_related_objects(bill_ids):
+    """Returns {bill id: set of (content type, object id)} of the votes and
+    committee meetings related to the bills"""
+    bills = ContentType.objects.get_by_natural_key('laws', 'bill').model_class().objects.filter(
+        id__in=bill_ids)
+    related = defaultdict(set)
+    for field, natural_key in BILL_RELATED_FIELDS:
+        ctype = ContentType.objects.get_by_natural_key(*natural_key)
+        for bill_id, object_id in bills.values_list('id', field):
+            if object_id is not None:
+                related[bill_id].add((ctype, object_id))
+    return related
+
+
+def _bill_tags_to_related_objects(pairs):
+    """Yields {content type: set of (tag id, object id)} of the tagged items
+    that follow the (tag id, bill id) pairs, a chunk of bills at a time"""
+    bill_tags = defaultdict(set)
+    for tag_id, bill_id in pairs:
+        bill_tags[bill_id].add(tag_id)
+    bill_ids = sorted(bill_tags)
+    for i in range(0, len(bill_ids), BILLS_CHUNK_SIZE):
+        items = defaultdict(set)
+        related = bill_related_objects(bill_ids[i:i + BILLS_CHUNK_SIZE])
+        for bill_id, objects in related.items():
+            for ctype, object_id in objects:
+                items[ctype].update((tag_id, object_id) for tag_id in bill_tags[bill_id])
+        yield items
+
+
+def propagate_bill_tags(pairs):
+    """Tags the votes and committee meetings related to bills with the tags
+    of the (tag id, bill id) pairs"""
+    for items in _bill_tags_to_related_objects(pairs):
+        for ctype, ctype_items in items.items():
+            _add_tagged_items(ctype, ctype_items)
+
+
+def unpropagate_bill_tags(pairs):
+    """Untags the votes and committee meetings related to bills from the tags
+    of the (tag id, bill id) pairs"""
+    for items in _bill_tags_to_related_objects(pairs):
+        for ctype, ctype_items in items.items():
+            _remove_tagged_items(ctype, ctype_items)
+
+
+class BillTagPropagation(local):
+    """Propagates the tags added to and removed from bills to their related
+    objects, either right away or, inside defer(), once at its end.
+
+    Deferring is per thread, so a bulk import doesn't hold back the
+    propagation of tags added elsewhere meanwhile.
+    """
+
+    def __init__(self):
+        self.added = set()
+        self.removed = set()
+        self.deferred = 0
+
+    def add(self, pairs):
+        "pairs - (tag id, bill id) of the tags added to bills"
+        if not self.deferred:
+            return propagate_bill_tags(pairs)
+        for pair in pairs:
+            self.removed.discard(pair)
+            self.added.add(pair)
+
+    def remove(self, pairs):
+        "pairs - (tag id, bill id) of the tags removed from bills"
+        if not self.deferred:
+            return unpropagate_bill_tags(pairs)
+        for pair in pairs:
+            self.added.discard(pair)
+            self.removed.add(pair)
+
+    @contextmanager
+    def defer(self):
+        self.deferred += 1
+        try:
+            yield self
+        finally:
+            self.deferred -= 1
+            if not self.deferred:
+                self.flush()
+
+    def flush(self):
+        added, self.added = self.added, set()
+        removed, self.removed = self.removed, set()
+        unpropagate_bill_tags(removed)
+        propagate_bill_tags(added)
+
+
+bill_tag_propagation = BillTagPropagation()
 
 
 def add_tags_to_related_objects(sender, instance, **kwargs):
@@ -17,115 +155,44 @@ def add_tags_to_related_objects(sender, instance, **kwargs):
     tag related votes and related committee meetings.
 
     """
-    obj = instance.object
-    tag = instance.tag
-    bill_ctype = ContentType.objects.get(app_label='laws', model='bill')
-    if type(obj) is bill_ctype.model_class():
-        vote_ctype = ContentType.objects.get(app_label='laws', model='vote')
-        # tag related votes
-        for v in obj.pre_votes.all():
-            (ti, created) = TaggedItem._default_manager.get_or_create(
-                tag=tag,
-                content_type=vote_ctype,
-                object_id=v.id)
-        v = obj.first_vote
-        if v:
-            (ti, created) = TaggedItem._default_manager.get_or_create(
-                tag=tag,
-                content_type=vote_ctype,
-                object_id=v.id)
-        v = obj.approval_vote
-        if v:
-            (ti, created) = TaggedItem._default_manager.get_or_create(
-                tag=tag,
-                content_type=vote_ctype,
-                object_id=v.id)
-
-        cm_ctype = ContentType.objects.get_for_model(CommitteeMeeting)
-        for cm in obj.first_committee_meetings.all():
-            (ti, created) = TaggedItem._default_manager.get_or_create(
-                tag=tag,
-                content_type=cm_ctype,
-                object_id=cm.id)
-        for cm in obj.second_committee_meetings.all():
-            (ti, created) = TaggedItem._default_manager.get_or_create(
-                tag=tag,
-                content_type=cm_ctype,
-                object_id=cm.id)
+    if instance.content_type_id == ContentType.objects.get_by_natural_key('laws', 'bill').id:
+        bill_tag_propagation.add([(instance.tag_id, instance.object_id)])
 
 
 def remove_tags_from_related_objects(sender, instance, **kwargs):
-    obj = instance.object
-    try:
-        tag = instance.tag
-    except Tag.DoesNotExist:  # the tag itself was deleted,
-        return  # so we have nothing to do.
-    bill_ctype = ContentType.objects.get(app_label='laws', model='bill')
-    if type(obj) is bill_ctype.model_class():
-        vote_ctype = ContentType.objects.get(app_label='laws', model='vote')
-        # untag related votes
-        for v in obj.pre_votes.all():
-            try:
-                ti = TaggedItem._default_manager.get(
-                    tag=tag,
-                    content_type=vote_ctype,
-                    object_id=v.id)
-                ti.delete()
-            except TaggedItem.DoesNotExist:
-                pass
-        v = obj.first_vote
-        if v:
-            try:
-                ti = TaggedItem._default_manager.get(
-                    tag=tag,
-                    content_type=vote_ctype,
-                    object_id=v.id)
-                ti.delete()
-            except TaggedItem.DoesNotExist:
-                pass
-        v = obj.approval_vote
-        if v:
-            try:
-                ti = TaggedItem._default_manager.get(
-                    tag=tag,
-                    content_type=vote_ctype,
-                    object_id=v.id)
-                ti.delete()
-            except TaggedItem.DoesNotExist:
-                pass
-
-        # untag related committee meetings
-        cm_ctype = ContentType.objects.get_for_model(CommitteeMeeting)
-        for cm in obj.first_committee_meetings.all():
-            try:
-                ti = TaggedItem._default_manager.get(
-                    tag=tag,
-                    content_type=cm_ctype,
-                    object_id=cm.id)
-                ti.delete()
-            except TaggedItem.DoesNotExist:
-                pass
-        for cm in obj.second_committee_meetings.all():
-            try:
-                ti = TaggedItem._default_manager.get(
-                    tag=tag,
-                    content_type=cm_ctype,
-                    object_id=cm.id)
-                ti.delete()
-            except TaggedItem.DoesNotExist:
-                pass
+    if instance.content_type_id == ContentType.objects.get_by_natural_key('laws', 'bill').id:
+        bill_tag_propagation.remove([(instance.tag_id, instance.object_id)])
 
 
 def tag_vote(vote):
-    vote_ctype = ContentType.objects.get(app_label='laws', model='vote')
-    t = vote.title.translate(trans_clean)
-    t = re.sub(' . ', ' ', t)
-    t = re.sub(' +', ' ', t)
-    for tag_phrase in TagKeyphrase.objects.select_related('tag').all():
-        if tag_phrase.phrase in t:
-            TaggedItem.objects.get_or_create(tag=tag_phrase.tag,
-                                             content_type=vote_ctype,
-                                             object_id=vote.id)
+    vote_ctype = ContentType.objects.get_by_natural_key('laws', 'vote')
+    tag_ids = keyphrase_automaton().search(clean_vote_title(vote.title))
+    _add_tagged_items(vote_ctype, [(tag_id, vote.id) for tag_id in tag_ids])
+
+
+def tag_votes(votes, keyphrases=None, chunk_size=500):
+    """Tags the votes of a queryset by the keyphrases found in their titles,
+    chunk_size votes at a time. keyphrases is a TagKeyphrase queryset to tag
+    by, instead of all of them. Returns the number of tagged items added"""
+    if keyphrases is None:
+        automaton = keyphrase_automaton()
+    else:
+        automaton = build_keyphrase_automaton(keyphrases)
+    vote_ctype = ContentType.objects.get_by_natural_key('laws', 'vote')
+    votes = votes.order_by('id').values_list('id', 'title')
+    added = 0
+    last_id = 0
+    while True:
+        chunk = list(votes.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        pairs = []
+        for vote_id, title in chunk:
+            pairs.extend((tag_id, vote_id)
+                         for tag_id in automaton.search(clean_vote_title(title)))
+        added += _add_tagged_items(vote_ctype, pairs)
+    return added
 
 
 # def tagged_votes_titles(tags):
@@ -148,3 +215,12 @@ def tag_vote(vote):
 post_save.connect(add_tags_to_related_objects, sender=TaggedItem)
 
 post_delete.connect(remove_tags_from_related_objects, sender=TaggedItem)
+
+
+@disable_for_loaddata
+def reset_keyphrases(sender, instance, **kwargs):
+    """Make sure the keyphrase automaton is rebuilt upon changes to the
+    keyphrases"""
+    reset_keyphrase_automaton()
+post_save.connect(reset_keyphrases, sender=TagKeyphrase)
+post_delete.connect(reset_keyphrases, sender=TagKeyphrase)
@@ -8,9 +8,11 @@ from django.core.urlresolvers import reverse
 from django.test import TestCase
 from tagging.models import Tag, TaggedItem
 
+from auxiliary.models import TagKeyphrase
 from committees.models import Committee, CommitteeMeeting
 from laws.models import Vote, Bill, Law
 from mks.models import Knesset, Member
+from ok_tag.models import tag_vote, tag_votes, bill_tag_propagation
 
 
 class TagDetailViewTest(TestCase):
@@ -455,3 +457,69 @@ class TagResourceTest(TestCase):
         self.assertEqual(len(res_json), 2)
         received_tags = set(Tag.objects.get(pk=x) for x in (res_json[0]['id'], res_json[1]['id']))
         self.assertEqual(received_tags, set([self.tags[0], self.tags[2]]))
+
+
+class TagVotesTest(TestCase):
+    def setUp(self):
+        self.tag_1 = Tag.objects.create(name='tag1')
+        self.tag_2 = Tag.objects.create(name='tag2')
+        TagKeyphrase.objects.create(tag=self.tag_1, phrase='budget law')
+        TagKeyphrase.objects.create(tag=self.tag_2, phrase='education')
+        self.vote_1 = Vote.objects.create(title='vote on the budget law', time=datetime.datetime.now())
+        self.vote_2 = Vote.objects.create(title='budget law - education', time=datetime.datetime.now())
+        self.vote_3 = Vote.objects.create(title='unrelated', time=datetime.datetime.now())
+
+    def vote_tags(self, vote):
+        return set(Tag.objects.get_for_object(vote))
+
+    def test_tag_votes(self):
+        self.assertEqual(tag_votes(Vote.objects.all(), chunk_size=2), 3)
+        self.assertEqual(self.vote_tags(self.vote_1), set([self.tag_1]))
+        self.assertEqual(self.vote_tags(self.vote_2), set([self.tag_1, self.tag_2]))
+        self.assertEqual(self.vote_tags(self.vote_3), set())
+        self.assertEqual(tag_votes(Vote.objects.all()), 0)
+
+    def test_tag_vote_sees_new_keyphrases(self):
+        tag_vote(self.vote_3)
+        self.assertEqual(self.vote_tags(self.vote_3), set())
+        TagKeyphrase.objects.create(tag=self.tag_2, phrase='unrelated')
+        tag_vote(self.vote_3)
+        self.assertEqual(self.vote_tags(self.vote_3), set([self.tag_2]))
+
+
+    def test_tag_votes_without_keyphrases(self):
+        self.assertEqual(tag_votes(Vote.objects.all(), TagKeyphrase.objects.none()), 0)
+        TagKeyphrase.objects.all().delete()
+        tag_vote(self.vote_1)
+        self.assertEqual(self.vote_tags(self.vote_1), set())
+        self.assertEqual(tag_votes(Vote.objects.all()), 0)
+
+class BillTagPropagationTest(TestCase):
+    def setUp(self):
+        self.bill = Bill.objects.create(stage='1', title='bill 1')
+        self.vote = Vote.objects.create(title='vote 1', time=datetime.datetime.now())
+        self.committee = Committee.objects.create(name='c1')
+        self.meeting = CommitteeMeeting.objects.create(committee=self.committee,
+                                                       date=datetime.date.today())
+        self.bill.pre_votes.add(self.vote)
+        self.bill.first_committee_meetings.add(self.meeting)
+
+    def tag_names(self, obj):
+        return set(tag.name for tag in Tag.objects.get_for_object(obj))
+
+    def test_propagation(self):
+        Tag.objects.add_tag(self.bill, 'tag1')
+        self.assertEqual(self.tag_names(self.vote), set(['tag1']))
+        self.assertEqual(self.tag_names(self.meeting), set(['tag1']))
+        Tag.objects.update_tags(self.bill, '')
+        self.assertEqual(self.tag_names(self.vote), set())
+        self.assertEqual(self.tag_names(self.meeting), set())
+
+    def test_deferred_propagation(self):
+        with bill_tag_propagation.defer():
+            Tag.objects.add_tag(self.bill, 'tag1')
+            Tag.objects.add_tag(self.bill, 'tag2')
+            Tag.objects.update_tags(self.bill, 'tag1')
+            self.assertEqual(self.tag_names(self.vote), set())
+        self.assertEqual(self.tag_names(self.vote), set(['tag1']))
+        self.assertEqual(self.tag_names(self.meeting), set(['tag1']))
@@ -4,9 +4,11 @@ from django.utils.translation import ugettext_lazy as _
 from django.core.exceptions import ValidationError
 from django.forms.fields import IntegerField
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 
 from mks.models import Member, GENDER_CHOICES
+from mks.name_index import reset_name_indexes
+from auxiliary.autocomplete import reset_autocomplete
 from links.models import Link
 from .managers import PersonManager
 
@@ -176,6 +178,14 @@ def member_post_save(sender, **kwargs):
     person.save()
 
 
+@receiver(post_save, sender=PersonAlias)
+@receiver(post_delete, sender=PersonAlias)
+def reset_member_names(sender, **kwargs):
+    "Members are found and suggested by their aliases too"
+    reset_name_indexes()
+    reset_autocomplete('members')
+
+
 class Role(models.Model):
     start_date  = models.DateField(null=True)
     end_date  = models.DateField(blank=True, null=True)
@@ -46,11 +46,13 @@ class CandidateListDetailView(DetailView):
             context['candidates'] = [x.person for x in candidates]
             agendas = []
             if cl.member_ids:
-                for a in Agenda.objects.filter(is_public=True).order_by('-num_followers'):
+                public_agendas = list(Agenda.objects.filter(is_public=True).order_by('-num_followers'))
+                scores = Agenda.objects.scores_for_candidate_lists(public_agendas, [cl])
+                for a in public_agendas:
                     agendas.append({'id': a.id,
                                     'name': a.name,
                                     'url': a.get_absolute_url(),
-                                    'score': a.candidate_list_score(cl)})
+                                    'score': scores[a.id][cl.id]})
                 context['agendas'] = agendas
             cache.set(cache_key, context, settings.LONG_CACHE_TIME)
         return context
@@ -12,7 +12,12 @@ from django.db.models import Max,Count
 
 from okscraper_django.management.base_commands import NoArgsDbLogCommand
 
+from laws.ballots import build_ballot_matrix
+from laws.bill_stages import BillStageQueue
+from laws.proposal_matching import find_proposals
+from mks.correlations import calculate_correlations
 from mks.models import Member, Party, Membership, WeeklyPresence, Knesset
+from mks.rankings import refresh_member_rankings
 from persons.models import Person,PersonAlias
 from laws.models import (Vote, VoteAction, Bill, Law, PrivateProposal,
      KnessetProposal, GovProposal, GovLegislationCommitteeDecision)
@@ -20,6 +25,7 @@ from links.models import Link
 from committees.models import Committee,CommitteeMeeting
 from knesset.utils import cannonize
 from mks.utils import get_all_mk_names
+from ok_tag.models import bill_tag_propagation
 
 import mk_info_html_parser as mk_parser
 import parse_presence, parse_laws, mk_roles_parser, parse_remote
@@ -642,6 +648,21 @@ class Command(NoArgsDbLogCommand):
             v.importance = float(v.votes.filter(voteaction__type='for').count() + v.votes.filter(voteaction__type='against').count()) / 120
             v.save()
 
+    def calculate_correlations(self):
+        """
+        Calculates the voting correlations between the members, over the votes of the current knesset.
+        The ballot matrix is rebuilt first, as the votes loaded from files didn't update it.
+        """
+        build_ballot_matrix()
+        calculate_correlations(Knesset.objects.current_knesset().start_date)
+
+    def refresh_member_rankings(self):
+        """
+        Recalculates the member rankings the member list pages are served from.
+        """
+        count = refresh_member_rankings()
+        logger.info('wrote %d member rankings', count)
+
     def read_votes_page(self,voteId, retry=0):
         """
         Gets a votes page from the knesset website.
@@ -1337,112 +1358,17 @@ class Command(NoArgsDbLogCommand):
         proposals = parse_laws.ParseGovLaws(last_booklet)
         proposals.parse_gov_laws()
 
-    def find_proposals_in_other_data(self):
-        """
-        Find proposals in other data (committee meetings, votes).
-        Calculates the cannonical names and then calls specific functions to do the actual work
-        """
-        gps = GovProposal.objects.values('id','title','law__title')
-        for gp in gps:
-            gp['t1'] = gp['law__title'] + ' ' + gp['title']
-            gp['c1'] = cannonize(gp['law__title'] + gp['title'])
-            gp['c2'] = cannonize(gp['title'] + gp['law__title'])
-
-        kps = KnessetProposal.objects.values('id','title', 'law__title')
-        for kp in kps:
-            kp['t1'] = kp['law__title'] + ' ' + kp['title']
-            kp['c1'] = cannonize(kp['law__title'] + kp['title'])
-            kp['c2'] = cannonize(kp['title'] + kp['law__title'])
-
-        pps = PrivateProposal.objects.values('id','title', 'law__title')
-        for pp in pps:
-            if pp['title']=='חוק חדש'.decode('utf8'):
-                pp['c1'] = cannonize(pp['law__title'])
-                pp['t1'] = pp['law__title']
-            else:
-                pp['c1'] = cannonize(pp['law__title'] + pp['title'])
-                pp['t1'] = pp['law__title'] + ' ' + pp['title']
-            pp['c2'] = cannonize(pp['title'] + pp['law__title'])
-
-        self.find_proposals_in_committee_meetings(gps,kps,pps)
-        self.find_proposals_in_votes(gps,kps,pps)
-
-    def find_proposals_in_committee_meetings(self, gps, kps, pps):
-        """
-        Find Private proposals and Knesset proposals in committee meetings. update bills that are connected.
-        kps and pps are dicts computed by find_proposals_in_other_data with canonical names.
-        """
-
-        d = datetime.date.today()-datetime.timedelta(60) # only look through cms in last 60 days.
-        for cm in CommitteeMeeting.objects.filter(date__gt=d,committee__type='committee').exclude(protocol_text=None):
-            c = cannonize(cm.protocol_text)
-            for gp in gps:
-                if c.find(gp['c1'])>=0 or c.find(gp['c2'])>=0:
-                    p = GovProposal.objects.get(pk=gp['id'])
-                    if cm not in p.committee_meetings.all():
-                        p.committee_meetings.add(cm)
-                        if p.bill:
-                            p.bill.second_committee_meetings.add(cm)
-                            p.bill.update_stage()
-                        logger.debug('gov proposal %d found in cm %d' % (p.id,cm.id))
-            for kp in kps:
-                if c.find(kp['c1'])>=0 or c.find(kp['c2'])>=0:
-                    p = KnessetProposal.objects.get(pk=kp['id'])
-                    if cm not in p.committee_meetings.all():
-                        p.committee_meetings.add(cm)
-                        if p.bill:
-                            p.bill.second_committee_meetings.add(cm)
-                            p.bill.update_stage()
-                        #print "add KP %d to CM %d" % (kp['id'], cm.id)
-            for pp in pps:
-                if c.find(pp['c1'])>=0 or c.find(pp['c2'])>=0:
-                    p = PrivateProposal.objects.get(pk=pp['id'])
-                    if cm not in p.committee_meetings.all():
-                        p.committee_meetings.add(cm)
-                        if p.bill:
-                            p.bill.first_committee_meetings.add(cm)
-                            p.bill.update_stage()
-                        #print "add PP %d to CM %d" % (pp['id'], cm.id)
-
-    def find_proposals_in_votes(self,gps,kps,pps):
+    def find_proposals_in_other_data(self, incremental=True):
         """
-        Find Private proposals and Knesset proposals in votes. update bills that are connected.
-        kps and pps are dicts computed by find_proposals_in_other_data with canonical names.
+        Find proposals in other data (committee meetings, votes), and update the bills that are connected.
+        incremental - only look in the meetings and votes added since the last run, and only for
+        the proposals added since in the rest. see laws.proposal_matching
         """
-        votes = Vote.objects.filter(title__contains='חוק').values('id','title')
-
-        for v in votes:
-            v['c'] = cannonize(v['title'])
-
-            for gp in gps:
-                if v['c'].find(gp['c1'])>=0:
-                    p = GovProposal.objects.get(pk=gp['id'])
-                    this_v = Vote.objects.get(pk=v['id'])
-                    if this_v not in p.votes.all():
-                        p.votes.add(this_v)
-                        if p.bill:
-                            p.bill.update_votes()
-                        logger.debug('gov proposal %d found in vote %s' % (p.id,this_v.title))
-
-            for kp in kps:
-                if v['c'].find(kp['c1'])>=0:
-                    p = KnessetProposal.objects.get(pk=kp['id'])
-                    this_v = Vote.objects.get(pk=v['id'])
-                    if this_v not in p.votes.all():
-                        p.votes.add(this_v)
-                        #print "add KP %d to Vote %d" % (kp['id'], this_v.id)
-                        if p.bill:
-                            p.bill.update_votes()
-
-            for pp in pps:
-                if v['c'].find(pp['c1'])>=0:
-                    p = PrivateProposal.objects.get(pk=pp['id'])
-                    this_v = Vote.objects.get(pk=v['id'])
-                    if this_v not in p.votes.all():
-                        p.votes.add(this_v)
-                        #print "add PP %d to Vote %d" % (pp['id'], this_v.id)
-                        if p.bill:
-                            p.bill.update_votes()
+        bill_stages = BillStageQueue()
+        meeting_matches, vote_matches = find_proposals(bill_stages, incremental=incremental)
+        logger.info('found proposals %d times in committee meetings and %d times in votes' % (
+            len(meeting_matches), len(vote_matches)))
+        bill_stages.flush()
 
     def merge_duplicate_laws(self):
         """Find and merge duplicate laws, and identical bills of each law"""
@@ -1476,6 +1402,7 @@ class Command(NoArgsDbLogCommand):
 
             """
         logger.debug("correct_votes_matching")
+        bill_stages = BillStageQueue()
         for v in Vote.objects.filter(title__contains="אישור החוק"):
             if v.bills_pre_votes.count() == 1:
                 logger.info("vote %d is approval but linked as pre. trying to fix" % v.id)
@@ -1494,7 +1421,8 @@ class Command(NoArgsDbLogCommand):
                 bill_pre_voted.approval_vote = v
                 v.bills_pre_votes.remove(bill_pre_voted)
                 bill_pre_voted.save()
-                bill_pre_voted.update_stage()
+                bill_stages.request(bill_pre_voted)
+        bill_stages.flush()
 
 
 
@@ -1608,13 +1536,15 @@ class Command(NoArgsDbLogCommand):
         if process:
             logger.info("beginning process phase")
             self.calculate_votes_importances()
-            #self.calculate_correlations()
+            self.calculate_correlations()
+            self.refresh_member_rankings()
 
         if laws:
-            self.parse_laws()
-            self.find_proposals_in_other_data()
-            self.merge_duplicate_laws()
-            self.correct_votes_matching()
+            with bill_tag_propagation.defer():
+                self.parse_laws()
+                self.find_proposals_in_other_data(incremental=False)
+                self.merge_duplicate_laws()
+                self.correct_votes_matching()
 
         if dump_to_file:
             logger.info("writing votes to tsv file")
@@ -1629,29 +1559,32 @@ class Command(NoArgsDbLogCommand):
                     logger.error("Error in syncdata update:" + e)
             else:
                 update_run_only = None
-            for func in ['update_votes',
-                         'update_laws_data',
-                         'update_presence',
-                         # 'get_protocols', - handled by the new okscraper
-                         'parse_laws',
-                         'find_proposals_in_other_data',
-                         'merge_duplicate_laws',
-                         'update_mk_role_descriptions',
-                         'update_mks_is_current',
-                         'update_gov_law_decisions',
-                         'correct_votes_matching']:
-                # in case update_run_only is none, we run all stages
-                if (update_run_only is None) or (func in update_run_only):
-                    try:
-                        logger.info('update: running %s', func)
-                        self.__getattribute__(func).__call__()
-                    except:
-                        exceptionType, exceptionValue, exceptionTraceback = sys.exc_info()
-                        logger.error("Caught execption in syncdata update phase %s\n%s",
-                                     func,
-                                     ''.join(traceback.format_exception(exceptionType,
-                                                                        exceptionValue,
-                                                                        exceptionTraceback)))
+            # the bills' tags are propagated to their votes and meetings once, at the end
+            with bill_tag_propagation.defer():
+                for func in ['update_votes',
+                             'update_laws_data',
+                             'update_presence',
+                             # 'get_protocols', - handled by the new okscraper
+                             'parse_laws',
+                             'find_proposals_in_other_data',
+                             'merge_duplicate_laws',
+                             'update_mk_role_descriptions',
+                             'update_mks_is_current',
+                             'update_gov_law_decisions',
+                             'correct_votes_matching',
+                             'refresh_member_rankings']:
+                    # in case update_run_only is none, we run all stages
+                    if (update_run_only is None) or (func in update_run_only):
+                        try:
+                            logger.info('update: running %s', func)
+                            self.__getattribute__(func).__call__()
+                        except:
+                            exceptionType, exceptionValue, exceptionTraceback = sys.exc_info()
+                            logger.error("Caught execption in syncdata update phase %s\n%s",
+                                         func,
+                                         ''.join(traceback.format_exception(exceptionType,
+                                                                            exceptionValue,
+                                                                            exceptionTraceback)))
             logger.info('finished update')
 
         if committees: